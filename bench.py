@@ -0,0 +1,331 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+import pandas as pd
+import dmoxml
+import data_processing as dp
+import rules_engine as re
+
+BENCH_DIR = os.path.join("data", "bench")
+
+MONTHS = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+# Default suite: universe sizes x maturity grid sizes, skipping pairs above MAX_WORK
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+GRIDS = [1, 10, 100]
+MAX_WORK = {"get_icma_benchmark": 2_000_000, "apply_rules": 2_000_000, "get_icma_benchmarks": 10 ** 9}
+SHOW_GILTS_MAX = 1_000  # one bar and table column per gilt, so larger universes are not drawable
+
+
+# ---- Synthetic Universes ----
+def synthetic_universe(n, seed=0, close_of_business_date="2025-01-31"):
+    """
+    Generate a D1A-shaped DataFrame (as returned by dmoxml.load_df_from_csv) of n gilts.
+
+    Redemption dates cluster around popular maturities and fall on the usual gilt coupon
+    days, so many gilts share a year and month; about 40% of the amounts sit near the
+    £10bn benchmark threshold and the rest are spread well above it. A quarter of the
+    gilts are index-linked.
+
+    Parameters:
+        n (int): Number of gilts.
+        seed (int): Seed for the random number generator.
+        close_of_business_date (str): CLOSE_OF_BUSINESS_DATE of the report.
+
+    Returns:
+        pd.DataFrame: The synthetic universe.
+    """
+    rng = np.random.default_rng(seed)
+    cob = np.datetime64(close_of_business_date, "D")
+
+    # Clustered maturities, snapped to the 7th/22nd/26th of the month
+    centres = cob + rng.integers(30, 365 * 55, max(1, n // 25))
+    around = centres[rng.integers(0, len(centres), n)] + rng.normal(0, 150, n).astype(np.int64)
+    months = np.maximum(around, cob + 31).astype("datetime64[M]")
+    redemption = months.astype("datetime64[D]") + rng.choice([6, 21, 25], n)
+
+    index_linked = rng.random(n) < 0.25
+    amounts = np.where(rng.random(n) < 0.4, rng.normal(10_000, 2_500, n), rng.lognormal(np.log(25_000), 0.5, n))
+    amounts = np.round(np.clip(amounts, 100, None), 3)
+    years_to_maturity = (redemption - cob).astype(np.int64) / 365.25
+    first_issue = np.minimum(redemption - (rng.integers(5, 50, n) * 365.25).astype(np.int64), cob - 1)
+    coupons = rng.integers(1, 24, n) / 4
+
+    month_number = months.astype(np.int64) % 12
+    years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    day = (redemption - months.astype("datetime64[D]")).astype(np.int64) + 1
+    kind = np.where(index_linked, "Index-linked Treasury Gilt", "Treasury Gilt")
+    names = [f"{c:g}% {k} {y}" for c, k, y in zip(coupons, kind, years)]
+    dividend_dates = [f"{d} {MONTHS[min(m, (m + 6) % 12)]}/{MONTHS[max(m, (m + 6) % 12)]}"
+                      for d, m in zip(day, month_number)]
+
+    return pd.DataFrame({
+        "CLOSE_OF_BUSINESS_DATE": np.full(n, cob).astype("datetime64[s]"),
+        "INSTRUMENT_TYPE": np.where(index_linked, "Index-linked", "Conventional ").astype(object),
+        "MATURITY_BRACKET": pd.cut(years_to_maturity, [-np.inf, 3, 7, 15, np.inf],
+                                   labels=["Ultra-Short", "Short", "Medium", "Long"]).astype(object),
+        "INSTRUMENT_NAME": np.array(names, dtype=object),
+        "ISIN_CODE": np.array([f"GB00{i:08d}" for i in range(n)], dtype=object),
+        "REDEMPTION_DATE": redemption.astype("datetime64[s]"),
+        "FIRST_ISSUE_DATE": first_issue.astype("datetime64[s]"),
+        "DIVIDEND_DATES": np.array(dividend_dates, dtype=object),
+        "CURRENT_EX_DIV_DATE": (cob + rng.integers(1, 180, n)).astype("datetime64[s]"),
+        "TOTAL_AMOUNT_IN_ISSUE": amounts,
+        "BASE_RPI_87": np.where(index_linked, np.round(rng.uniform(100, 300, n), 1), np.nan),
+        "TOTAL_AMOUNT_INCLUDING_IL_UPLIFT": np.where(index_linked, np.round(amounts * rng.uniform(1.1, 2.2, n), 3),
+                                                     amounts),
+    })
+
+
+def write_d1a_xml(df, xml_file_path):
+    """
+    Write a D1A-shaped DataFrame as a DMO XmlDataReport file (missing values are omitted).
+
+    Parameters:
+        df (pd.DataFrame): Gilts, e.g. from synthetic_universe().
+        xml_file_path (str): Where to write the XML.
+    """
+    rows = pd.Series("", index=df.index)
+    for col in dmoxml.D1A_COLUMNS:
+        values = df[col]
+        if pd.api.types.is_datetime64_dtype(values):
+            text = values.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        else:
+            text = values.astype(str)
+        rows += (f' {col}="' + text + '"').where(values.notna(), "")
+
+    with open(xml_file_path, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n<Data>\n')
+        file.write("".join("  <View_GILTS_IN_ISSUE" + rows + " />\n"))
+        file.write("</Data>")
+
+
+def maturity_grid(df, size, seed=0):
+    """size new issue maturities spread over the range of the universe's redemption dates."""
+    rng = np.random.default_rng(seed)
+    low, high = df["REDEMPTION_DATE"].min(), df["REDEMPTION_DATE"].max()
+    days = rng.integers(0, max((high - low).days, 1), size)
+    return [(low + pd.Timedelta(days=int(d))).strftime("%Y-%m-%d") for d in days]
+
+
+# ---- Timing ----
+@contextlib.contextmanager
+def _quiet():
+    """Silence the progress prints of the functions being timed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def _data_dir(path):
+    """Point dmoxml at a scratch data directory, so the real dmo_data.csv is left alone."""
+    previous, dmoxml.data_dir = dmoxml.data_dir, path
+    try:
+        yield
+    finally:
+        dmoxml.data_dir = previous
+
+
+@contextlib.contextmanager
+def _working_dir(path):
+    """Run in a scratch directory, so show_gilts does not overwrite figures/plot.svg."""
+    previous = os.getcwd()
+    os.makedirs(os.path.join(path, "figures"), exist_ok=True)
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _time(fn, repeat):
+    """Best of repeat wall-clock timings of fn(), in seconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with _quiet():
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_suite(sizes=SIZES, grids=GRIDS, repeat=3, seed=0, log=print):
+    """
+    Time the main entry points over synthetic universes and maturity grids.
+
+    Parameters:
+        sizes (list of int): Universe sizes (number of gilts, all instrument types).
+        grids (list of int): Number of maturities looked up per timing.
+        repeat (int): Timings per metric; the best is kept.
+        seed (int): Seed for the synthetic universes and grids.
+        log (callable): Called with a progress line per metric.
+
+    Returns:
+        dict: Metric name ('function/n=.../grid=...') -> seconds.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import visualisation as vis
+
+    results = {}
+
+    def record(name, fn, repeats=repeat):
+        results[name] = _time(fn, repeats)
+        log(f"{name:<45} {results[name]:10.4f}s")
+
+    for module in IMPORT_MODULES:
+        results[f"import/{module}"] = import_time(module, repeat)[0]
+        log(f"{'import/' + module:<45} {results['import/' + module]:10.4f}s")
+
+    for n in sizes:
+        full = synthetic_universe(n, seed)
+        df = dp.filter_conventional_gilts(full).reset_index(drop=True)
+
+        with tempfile.TemporaryDirectory() as tmp, _data_dir(tmp):
+            xml_file_path = os.path.join(tmp, "dmo_data.xml")
+            write_d1a_xml(full, xml_file_path)
+            record(f"process_dmo_xml/n={n}", lambda: dmoxml.process_dmo_xml(xml_file_path))
+            record(f"load_df_from_csv/n={n}", lambda: dmoxml.load_df_from_csv())
+
+        for grid in grids:
+            maturities = maturity_grid(df, grid, seed)
+            for name, fn in [("get_icma_benchmark", lambda m: [re.get_icma_benchmark(df, x) for x in m]),
+                             ("apply_rules", lambda m: [re.apply_rules(df, x) for x in m]),
+                             ("get_icma_benchmarks", lambda m: re.get_icma_benchmarks(df, m))]:
+                if n * grid <= MAX_WORK[name]:
+                    record(f"{name}/n={n}/grid={grid}", lambda: fn(maturities))
+
+        if n <= SHOW_GILTS_MAX:
+            nim = maturity_grid(df, 1, seed)[0]
+            with _quiet():
+                ruled = re.apply_rules(df, nim)
+            with tempfile.TemporaryDirectory() as tmp, _working_dir(tmp):
+                record(f"show_gilts/n={n}", lambda: (vis.show_gilts(ruled, nim), plt.close("all")), 1)
+
+    return results
+
+
+# ---- Import Budget ----
+CORE_MODULE = "lookup"  # benchmark resolution from a cached universe
+HEAVY_MODULES = ["pandas", "matplotlib", "requests"]  # must not be imported by the core
+IMPORT_BUDGET = 0.25  # seconds for `import lookup` in a fresh interpreter
+IMPORT_MODULES = [CORE_MODULE, "rules_engine", "main", "visualisation"]
+
+
+def import_time(module, repeat=3):
+    """
+    Time `import module` in fresh interpreters with python -X importtime.
+
+    Returns:
+        tuple: (best cumulative import time in seconds, sorted top-level packages it imported).
+    """
+    best, packages = np.inf, set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, check=True)
+        lines = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+        rows = [(name.strip(), cumulative) for _, cumulative, name in lines[1:]]  # skip the header
+        packages = {name.split(".")[0] for name, _ in rows}
+        best = min(best, int(rows[-1][1]) / 1e6)
+    return best, sorted(packages)
+
+
+def check_import_budget(budget=IMPORT_BUDGET):
+    """
+    Returns:
+        list of str: Problems with the core's startup: over budget, or importing a heavy module.
+    """
+    seconds, packages = import_time(CORE_MODULE)
+    problems = [f"import {CORE_MODULE} took {seconds:.3f}s, budget {budget:.3f}s"] if seconds > budget else []
+    problems += [f"import {CORE_MODULE} imports {name}" for name in HEAVY_MODULES if name in packages]
+    return problems
+
+
+# ---- Regression Check ----
+def save_results(results, json_file_path):
+    """Write results, with the environment they were measured in, as JSON."""
+    os.makedirs(os.path.dirname(json_file_path) or ".", exist_ok=True)
+    report = {
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(json_file_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+def load_results(json_file_path):
+    """
+    Returns:
+        dict: Metric name -> seconds, or None if the file does not exist.
+    """
+    if not os.path.exists(json_file_path):
+        return None
+    with open(json_file_path, "r", encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def find_regressions(results, baseline, threshold=0.25, min_seconds=0.005):
+    """
+    Compare results with a baseline. A metric regresses when it is more than threshold
+    (as a fraction) slower than the baseline and by more than min_seconds, so that noise on
+    very fast metrics is not reported. Metrics missing from either side are ignored.
+
+    Returns:
+        list of tuple: (metric, baseline seconds, new seconds) for each regression.
+    """
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is not None and seconds > base * (1 + threshold) and seconds - base > min_seconds:
+            regressions.append((name, base, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the benchmark engine on synthetic gilt universes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--grids", type=int, nargs="+", default=GRIDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"))
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown as a fraction.")
+    parser.add_argument("--update-baseline", action="store_true", help="Save these results as the new baseline.")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET,
+                        help=f"Allowed seconds for `import {CORE_MODULE}`.")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.grids, args.repeat)
+    save_results(results, args.output)
+    print(f"Results saved to {args.output}")
+
+    problems = check_import_budget(args.import_budget)
+    for problem in problems:
+        print(f"IMPORT BUDGET {problem}")
+
+    baseline = load_results(args.baseline)
+    if args.update_baseline or baseline is None:
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 1 if problems else 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, base, seconds in regressions:
+        print(f"REGRESSION {name}: {base:.4f}s -> {seconds:.4f}s ({seconds / base - 1:+.0%})")
+    return 1 if regressions or problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+import numpy as np
+
+# Only numpy is imported here, so one-shot lookups start fast; pandas is imported by the
+# functions that take or return DataFrames and Timestamps, or parse non-ISO dates.
+
+# ---- Rules ----
+# The rule codes and R7.3 criteria live in ruleset; they are re-exported here for convenience.
+from ruleset import (NO_BENCHMARK, R7_4_A, R7_4_B, R7_4_C_I, R7_4_C_II, R7_4_C_III, RULE_NAMES,  # noqa: F401
+                     Bounds, get_ruleset)
+
+
+def _to_day(value):
+    """Convert a date string, Timestamp or datetime64 to a numpy datetime64[D]."""
+    if not isinstance(value, str) or len(value) <= 10:  # times and time zones are left to pandas
+        try:
+            return np.datetime64(value, 'D')  # 'YYYY-MM-DD', datetime64 and datetime.date
+        except (ValueError, TypeError):
+            pass
+    import pandas as pd
+    return np.datetime64(pd.to_datetime(value), 'D')
+
+
+def _to_days(values):
+    """Convert an array-like of dates to a flat numpy datetime64[D] array (unparseable/None -> NaT)."""
+    values = np.asarray(values).ravel()
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]')
+    if values.dtype.kind == 'U' and values.dtype.itemsize <= 40:  # at most 10 characters
+        try:
+            return values.astype('datetime64[D]')  # 'YYYY-MM-DD' strings
+        except ValueError:
+            pass
+    import pandas as pd
+    return np.asarray(pd.to_datetime(values)).astype('datetime64[D]')
+
+
+class BenchmarkIndex:
+    """
+    Precompiled lookup structure for the ICMA R7.4 benchmark selection.
+
+    The appropriate benchmarks (ABs) are filtered once and their redemption dates
+    held as a sorted datetime64[D] array, together with a table of month offsets
+    into that array. Every R7.4 branch then reduces to a few integer lookups and
+    one searchsorted, so a query costs microseconds instead of a DataFrame filter.
+    The branches are evaluated in the order of the ruleset's compiled DecisionTable.
+
+    Results are identical to rules_engine.get_icma_benchmark().
+    """
+
+    def __init__(self, redemption_dates, isins=None, ruleset=None):
+        """
+        Parameters:
+            redemption_dates (array-like): Redemption dates of the appropriate benchmarks.
+            isins (array-like): Optional ISIN codes aligned with redemption_dates.
+            ruleset (Ruleset): R7.4 branches to apply; defaults to DEFAULT_RULESET. The ABs are
+                assumed to be filtered already (see from_dataframe).
+        """
+        dates = np.asarray(redemption_dates, dtype='datetime64[D]')
+        if isins is None:
+            isins = np.full(len(dates), '', dtype=object)
+        isins = np.asarray(isins, dtype=object)
+
+        # NaT redemption dates can never satisfy a date rule, so drop them up front
+        valid = ~np.isnat(dates)
+        dates, isins = dates[valid], isins[valid]
+
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.isins = isins[order]
+        self.ruleset = get_ruleset(ruleset)
+        self._decision = self.ruleset.compile()
+        self._table = None
+        self._build_month_offsets()
+
+    @classmethod
+    def from_dataframe(cls, df, ruleset=None):
+        """
+        Build the index from a D1A DataFrame (as returned by dmoxml.load_df_from_csv).
+
+        Parameters:
+            df (pd.DataFrame): DataFrame containing 'REDEMPTION_DATE', 'TOTAL_AMOUNT_IN_ISSUE' and 'ISIN_CODE'.
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+        Returns:
+            BenchmarkIndex: Index over the appropriate benchmarks in df.
+        """
+        # R7.3 Only consider appropriate benchmarks (same filter as get_icma_benchmark)
+        ruleset = get_ruleset(ruleset).for_data(df)
+        isins = df['ISIN_CODE'].to_numpy(dtype=object)
+        is_ab = ruleset.is_benchmark(df['TOTAL_AMOUNT_IN_ISSUE']) & ruleset.is_appropriate(isins)
+        return cls(df['REDEMPTION_DATE'].values[is_ab], isins[is_ab], ruleset)
+
+    def _build_month_offsets(self):
+        """
+        Precompute, for every month spanning the AB calendar years, the position of
+        the first AB maturing on or after the start of that month.
+        """
+        if len(self.dates) == 0:
+            self._first_month = 0
+            self._month_offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        months = self.dates.astype('datetime64[M]').astype(np.int64)
+        self._first_month = (months[0] // 12) * 12  # January of the first AB year
+        last_month = (months[-1] // 12) * 12 + 12  # January after the last AB year
+        month_starts = np.arange(self._first_month, last_month + 1).astype('datetime64[M]')
+        self._month_offsets = np.searchsorted(self.dates, month_starts.astype('datetime64[D]'), side='left')
+
+    def _offset(self, month):
+        """Position of the first AB maturing on or after the start of month (int months since epoch)."""
+        i = np.clip(month - self._first_month, 0, len(self._month_offsets) - 1)
+        return self._month_offsets[i]
+
+    def __len__(self):
+        return len(self.dates)
+
+    # ---- Updates ----
+    def insert(self, redemption_date, isin=''):
+        """
+        Add an AB in place. The sorted arrays are spliced and only the month offsets after its
+        month shift (the table is rebuilt only if the AB years change); the day table is dropped.
+        Among ABs redeeming on the same day it goes in isin order, so an index whose ids are row
+        numbers ends up as a fresh build would order it.
+
+        Parameters:
+            redemption_date (np.datetime64): Its redemption date (not NaT).
+            isin (object): Its ISIN (or other id, as passed to the constructor).
+        """
+        date = np.datetime64(redemption_date, 'D')
+        lo, hi = np.searchsorted(self.dates, date, side='left'), np.searchsorted(self.dates, date, side='right')
+        position = lo + np.searchsorted(self.isins[lo:hi], isin, side='right')
+        self.dates = np.insert(self.dates, position, date)
+        self.isins = np.insert(self.isins, position, None)
+        self.isins[position] = isin
+        self._shift_month_offsets(date, 1)
+
+    def remove(self, redemption_date, isin):
+        """Remove the AB with this redemption date and ISIN in place (see insert)."""
+        date = np.datetime64(redemption_date, 'D')
+        lo, hi = np.searchsorted(self.dates, date, side='left'), np.searchsorted(self.dates, date, side='right')
+        matches = np.flatnonzero(self.isins[lo:hi] == isin)
+        if not len(matches):
+            raise ValueError(f"No AB {isin} redeeming on {date} in the index")
+        self.dates = np.delete(self.dates, lo + matches[0])
+        self.isins = np.delete(self.isins, lo + matches[0])
+        self._shift_month_offsets(date, -1)
+
+    def _shift_month_offsets(self, date, change):
+        """Keep the month offsets right after change (+1 or -1) ABs were inserted or removed on date."""
+        self._table = None
+        if len(self.dates):
+            months = self.dates[[0, -1]].astype('datetime64[M]').astype(np.int64)
+            first_month, last_month = (months // 12) * 12
+            if first_month == self._first_month and last_month + 13 - first_month == len(self._month_offsets):
+                # Months starting after date are the ones with date before them
+                month = date.astype('datetime64[M]').astype(np.int64)
+                self._month_offsets[month - self._first_month + 1:] += change
+                return
+        self._build_month_offsets()
+
+    def resolve(self, maturity):
+        """
+        Apply the R7.4 selection rules for a single maturity.
+
+        Parameters:
+            maturity (str | pd.Timestamp | np.datetime64): The new issue maturity date.
+
+        Returns:
+            tuple: (position in self.dates or -1, rule code).
+        """
+        return self._decision.select(self._bounds(_to_day(maturity)))
+
+    def _bounds(self, m):
+        """Bounds of a datetime64[D] maturity (or array of them) among self.dates."""
+        month = m.astype('datetime64[M]').astype(np.int64)
+        year_month = month - month % 12
+        return Bounds(self._offset(year_month), self._offset(year_month + 12),
+                      self._offset(month), self._offset(month + 1),
+                      np.searchsorted(self.dates, m, side='left'),  # ABs strictly before m
+                      np.searchsorted(self.dates, m, side='right'))  # First AB strictly after m
+
+    def lookup(self, maturity):
+        """
+        Return the redemption date of the ICMA benchmark for a new issue maturity.
+
+        Parameters:
+            maturity (str | pd.Timestamp | np.datetime64): The new issue maturity date.
+
+        Returns:
+            pd.Timestamp or None: The Redemption_Date of the ICMA Benchmark, if found.
+        """
+        import pandas as pd
+
+        pos, _ = self.resolve(maturity)
+        if pos < 0:
+            return None
+        return pd.Timestamp(self.dates[pos])
+
+    def _resolve_days(self, m):
+        """
+        Apply the R7.4 selection rules to a datetime64[D] array (no NaT) with array operations.
+
+        Every branch is evaluated for every date and the first one that applies is picked
+        with np.select, mirroring resolve().
+        """
+        return self._decision.select_many(self._bounds(m))
+
+    def _day_table(self):
+        """
+        Lazily resolve every day from the end of the year before the first AB year to
+        1 January after the last AB year. Outside that span the answer cannot change
+        (no benchmark before it, R7.4(b) on the last AB after it), so any maturity
+        resolves with a clipped table lookup.
+        """
+        if self._table is None:
+            if len(self.dates):
+                first_year = self.dates[0].astype('datetime64[Y]')
+                last_year = self.dates[-1].astype('datetime64[Y]')
+                start = first_year.astype('datetime64[D]') - 1
+                stop = (last_year + 1).astype('datetime64[D]')
+            else:
+                start = stop = np.datetime64(0, 'D')
+            days = np.arange(start, stop + 1, dtype='datetime64[D]')
+            positions, rules = self._resolve_days(days)
+            self._table = (start, positions, rules)
+        return self._table
+
+    def resolve_many(self, maturities):
+        """
+        Apply the R7.4 selection rules to an array of maturities in one call.
+
+        The rules are evaluated once per calendar day over the span of the ABs, after
+        which each maturity costs one array lookup, so there is no Python loop per date.
+
+        Parameters:
+            maturities (array-like): New issue maturity dates (NaT is allowed).
+
+        Returns:
+            tuple: (np.ndarray of positions in self.dates or -1, np.ndarray of rule codes).
+        """
+        m = _to_days(maturities)
+        start, table_positions, table_rules = self._day_table()
+
+        i = (m - start).astype(np.int64)
+        np.clip(i, 0, len(table_positions) - 1, out=i)
+        positions, rules = table_positions[i], table_rules[i]
+
+        nat = np.isnat(m)
+        if nat.any():
+            positions[nat] = -1
+            rules[nat] = NO_BENCHMARK
+        return positions, rules
+
+    def lookup_many(self, maturities):
+        """
+        Return the ICMA benchmark for every maturity as a columnar DataFrame.
+
+        Parameters:
+            maturities (array-like): New issue maturity dates.
+
+        Returns:
+            pd.DataFrame: One row per maturity with columns 'MATURITY', 'BENCHMARK_REDEMPTION_DATE',
+            'BENCHMARK_ISIN' (categorical) and 'RULE' (categorical R7.4 branch, 'None' if no benchmark found).
+        """
+        import pandas as pd
+
+        m = _to_days(maturities)
+        positions, rules = self.resolve_many(m)
+
+        # A trailing NaT/-1 sentinel means position -1 maps straight to "not found"
+        dates = np.append(self.dates, np.datetime64('NaT', 'D'))
+        isin_categories, isin_codes = np.unique(self.isins.astype(str), return_inverse=True)
+        isin_codes = np.append(isin_codes, -1)
+
+        # pandas has no day resolution, so hand it second-resolution arrays to avoid a slow conversion
+        return pd.DataFrame({
+            'MATURITY': m.astype('datetime64[s]'),
+            'BENCHMARK_REDEMPTION_DATE': dates[positions].astype('datetime64[s]'),
+            'BENCHMARK_ISIN': pd.Categorical.from_codes(isin_codes[positions], isin_categories),
+            'RULE': pd.Categorical.from_codes(rules, RULE_NAMES),
+        })
+
+    def cliff_edges(self):
+        """
+        Derive the piecewise-constant map of maturity -> benchmark.
+
+        The answer for a maturity can only change at an AB redemption date (or the day
+        after), at the start of an AB's month or the following month, or at the start of
+        an AB's calendar year or the following year. Evaluating the rules at those O(k)
+        candidate dates and merging equal neighbours gives the exact intervals.
+
+        Returns:
+            CliffEdgeMap: The maturity intervals and the benchmark/rule for each.
+        """
+        d = self.dates
+        months = d.astype('datetime64[M]')
+        years = d.astype('datetime64[Y]')
+        candidates = np.unique(np.concatenate([
+            d, d + 1,
+            months.astype('datetime64[D]'), (months + 1).astype('datetime64[D]'),
+            years.astype('datetime64[D]'), (years + 1).astype('datetime64[D]'),
+        ]))
+        positions, rules = self._resolve_days(candidates)
+
+        # Only keep candidates where the benchmark or the responsible rule changes
+        changed = np.ones(len(candidates), dtype=bool)
+        changed[1:] = (positions[1:] != positions[:-1]) | (rules[1:] != rules[:-1])
+        return CliffEdgeMap(self, candidates[changed], positions[changed], rules[changed])
+
+
+class CliffEdgeMap:
+    """
+    Maturity intervals over which the ICMA benchmark is constant.
+
+    Interval i covers maturities from starts[i] up to the day before starts[i + 1]
+    (the last interval is open-ended). Maturities before starts[0] have no benchmark.
+    Built by BenchmarkIndex.cliff_edges().
+    """
+
+    def __init__(self, index, starts, positions, rules):
+        self.index = index
+        self.starts = starts
+        self.positions = positions
+        self.rules = rules
+
+    def __len__(self):
+        return len(self.starts)
+
+    def resolve_many(self, maturities):
+        """
+        Look up the interval for each maturity with a single bisect.
+
+        Parameters:
+            maturities (array-like): New issue maturity dates.
+
+        Returns:
+            tuple: (np.ndarray of positions in index.dates or -1, np.ndarray of rule codes).
+        """
+        m = _to_days(maturities)
+        i = np.searchsorted(self.starts, m, side='right') - 1
+        i[np.isnat(m)] = -1
+
+        # Index -1 lands on a trailing "no benchmark" sentinel
+        positions = np.append(self.positions, -1)[i]
+        rules = np.append(self.rules, NO_BENCHMARK).astype(np.int8)[i]
+        return positions, rules
+
+    def lookup(self, maturity):
+        """
+        Return the redemption date of the ICMA benchmark for a new issue maturity.
+
+        Parameters:
+            maturity (str | pd.Timestamp | np.datetime64): The new issue maturity date.
+
+        Returns:
+            pd.Timestamp or None: The Redemption_Date of the ICMA Benchmark, if found.
+        """
+        import pandas as pd
+
+        positions, _ = self.resolve_many([_to_day(maturity)])
+        if positions[0] < 0:
+            return None
+        return pd.Timestamp(self.index.dates[positions[0]])
+
+    def to_frame(self):
+        """
+        Export the breakpoints as a table.
+
+        Returns:
+            pd.DataFrame: One row per interval with columns 'START', 'END' (inclusive, NaT if
+            open-ended), 'BENCHMARK_REDEMPTION_DATE', 'BENCHMARK_ISIN' and 'RULE'.
+        """
+        import pandas as pd
+
+        ends = np.empty_like(self.starts)
+        ends[:-1] = self.starts[1:] - 1
+        ends[-1:] = np.datetime64('NaT', 'D')
+        dates = np.append(self.index.dates, np.datetime64('NaT', 'D'))
+        isins = np.append(self.index.isins, None)
+
+        return pd.DataFrame({
+            'START': self.starts.astype('datetime64[s]'),
+            'END': ends.astype('datetime64[s]'),
+            'BENCHMARK_REDEMPTION_DATE': dates[self.positions].astype('datetime64[s]'),
+            'BENCHMARK_ISIN': isins[self.positions],
+            'RULE': pd.Categorical.from_codes(self.rules, RULE_NAMES),
+        })
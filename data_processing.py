@@ -1,8 +1,16 @@
 import os
+import tempfile
+import numpy as np
 import pandas as pd
 import dmoxml  # handles XML fetching and conversion to DataFrame and CSV
+from lookup import _file_hash  # the numpy-only core keeps the one copy
+from universe import instrument_types
 
 DATA_DIR = "data"
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# Bump whenever parsing/typing changes, so caches written by older code are not reused
+PARSER_VERSION = 1
 
 def scrape_data():
     """
@@ -15,17 +23,138 @@ def scrape_data():
     return df
 
 
-def load_data():
+def load_data(xml_file_path=None, use_cache=True):
     """
     Loads the XML from directory, processes the XML data,
     saves it as a CSV and returns a DataFrame.
+
+    The typed DataFrame is cached under data/cache, keyed on the XML content hash
+    and PARSER_VERSION, so later calls with an unchanged XML skip parsing entirely.
+
+    Parameters:
+        xml_file_path (str): Optional path to the XML file. Defaults to the standard location.
+        use_cache (bool): Set False to always re-parse the XML.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the DMO data.
+    """
+    return _cached_frame(xml_file_path, "all", _parse_data, use_cache)
+
+
+def load_conventional_gilts(xml_file_path=None, use_cache=True):
+    """
+    Same as filter_conventional_gilts(load_data()), with the filtered universe cached too.
+
+    Parameters:
+        xml_file_path (str): Optional path to the XML file. Defaults to the standard location.
+        use_cache (bool): Set False to always re-parse the XML.
+
+    Returns:
+        pd.DataFrame: Conventional gilts only.
+    """
+    def parse(path):
+        df = _parse_data(path)
+        return None if df is None else filter_conventional_gilts(df).reset_index(drop=True)
+
+    return _cached_frame(xml_file_path, "conventional", parse, use_cache)
+
+
+def _parse_data(xml_file_path):
+    """
+    Parse one XML file into the D1A DataFrame (the uncached path). The standard XML makes the
+    usual XML -> CSV -> DataFrame round trip; any other file is stream-parsed on its own, typed
+    as load_df_from_csv would, so the shared data/dmo_data.csv is left alone.
+
+    Returns:
+        pd.DataFrame or None: None if the file is missing or cannot be parsed.
     """
     os.makedirs(DATA_DIR, exist_ok=True)
-    df = dmoxml.process_dmo_xml()
-    df = dmoxml.load_df_from_csv()
+    if os.path.abspath(xml_file_path) == os.path.abspath(os.path.join(dmoxml.data_dir, "dmo_data.xml")):
+        if dmoxml.process_dmo_xml(xml_file_path) is None:
+            return None
+        return dmoxml.load_df_from_csv()
+
+    if not os.path.exists(xml_file_path):
+        print(f"XML file not found at {xml_file_path}. Please fetch or manually download the file.")
+        return None
+    try:
+        batches = list(dmoxml.iter_dmo_xml(xml_file_path))
+    except Exception as e:
+        print(f"Error processing XML file: {e}")
+        return None
+    if not batches:
+        print(f"No gilts found in {xml_file_path}.")
+        return None
+    df = pd.concat(batches, ignore_index=True)
+    for col in df.columns:
+        if col not in dmoxml.DATE_COLUMNS and col not in dmoxml.FLOAT_COLUMNS:
+            df[col] = df[col].astype("str")
+    return df
+
+
+# ---- Binary Cache ----
+def _cached_frame(xml_file_path, variant, parse, use_cache):
+    """Return parse(xml_file_path), reading/writing a .npz cache keyed on the XML content."""
+    if xml_file_path is None:
+        xml_file_path = os.path.join(DATA_DIR, "dmo_data.xml")
+    if not use_cache or not os.path.exists(xml_file_path):
+        return parse(xml_file_path)
+
+    cache_path = os.path.join(CACHE_DIR, f"{variant}-{_file_hash(xml_file_path)[:32]}-v{PARSER_VERSION}.npz")
+    if os.path.exists(cache_path):
+        try:
+            return _load_frame(cache_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable cache file {cache_path}: {e}")
+
+    df = parse(xml_file_path)
+    if df is not None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _save_frame(df, cache_path)
     return df
 
 
+def _save_frame(df, cache_path):
+    """
+    Save a DataFrame as a .npz of column arrays. Text columns are stored as fixed-width
+    unicode arrays with a separate null mask, so no pickling is needed to load them.
+    """
+    arrays = {"columns": np.array(df.columns, dtype=str)}
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_dtype(series):
+            arrays[f"values_{i}"] = series.to_numpy()
+        else:
+            nulls = series.isna().to_numpy()
+            arrays[f"values_{i}"] = np.where(nulls, "", series.astype(object)).astype(str)
+            arrays[f"nulls_{i}"] = nulls
+
+    # Write to a temporary file of this writer's own first, so readers never see a partial cache
+    # and processes caching the same file at once do not write into each other's
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _load_frame(cache_path):
+    """Inverse of _save_frame."""
+    with np.load(cache_path) as arrays:
+        data = {}
+        for i, col in enumerate(arrays["columns"]):
+            values = arrays[f"values_{i}"]
+            if f"nulls_{i}" in arrays:
+                values = values.astype(object)
+                values[arrays[f"nulls_{i}"]] = np.nan
+                values = pd.Series(values.tolist())
+            data[str(col)] = values
+    return pd.DataFrame(data)
+
+
 def filter_conventional_gilts(df):
     """
     Filters out non-Conventional Gilts.
@@ -36,5 +165,4 @@ def filter_conventional_gilts(df):
     Returns:
         pd.DataFrame: Filtered DataFrame containing only conventional gilts.
     """
-    # .strip() is required since DMO leaves a ' ' (space) after Conventional in raw data!
-    return df[df['INSTRUMENT_TYPE'].str.strip() == 'Conventional']
\ No newline at end of file
+    return df[instrument_types(df['INSTRUMENT_TYPE']) == 'Conventional']
\ No newline at end of file
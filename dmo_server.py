@@ -0,0 +1,167 @@
+import os
+import time
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+class StandInDMOServer:
+    """
+    Local stand-in for the DMO XmlDataReport endpoint, for testing and benchmarking the
+    fetch path offline. Serves reports from memory with ETag/Last-Modified validators,
+    answers conditional requests with 304, and can inject failures and latency.
+
+    Use as a context manager:
+        with StandInDMOServer({"D1A": "data/XmlDataReport.xml"}) as server:
+            dmoxml.fetch_dmo_xml(base_url=server.base_url)
+    """
+
+    def __init__(self, reports=None, host="127.0.0.1", port=0, chunk_size=1 << 16):
+        """
+        Parameters:
+            reports (dict): Report code -> XML file path or bytes.
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+            chunk_size (int): Bytes per write when sending a body.
+        """
+        self.chunk_size = chunk_size
+        self.delay = 0.0
+        self.requests = []  # (report code, status) per request served
+        self._reports = {}
+        self._failures = []
+        self._lock = threading.Lock()
+        for report_code, body in (reports or {}).items():
+            self.set_report(report_code, body)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_report(self, report_code, body, last_modified=None):
+        """
+        Publish (or replace) a report. A new body gets a new ETag.
+
+        Parameters:
+            report_code (str): DMO report code.
+            body (str | bytes): XML file path or the XML itself.
+            last_modified (float): Modification time (seconds since the epoch); defaults to now.
+        """
+        if isinstance(body, str):
+            with open(body, "rb") as file:
+                body = file.read()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        with self._lock:
+            self._reports[report_code] = (body, etag, int(last_modified or time.time()))
+
+    def fail_next(self, count=1, status=503, retry_after=None):
+        """Answer the next count requests with status (and an optional Retry-After header)."""
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _handle(self, handler):
+        if self.delay:
+            time.sleep(self.delay)
+        report_code = parse_qs(urlsplit(handler.path).query).get("reportCode", [None])[0]
+
+        with self._lock:
+            failure = self._failures.pop(0) if self._failures else None
+            report = self._reports.get(report_code)
+
+        if failure is not None:
+            status, retry_after = failure
+            headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+            return self._respond(handler, report_code, status, headers)
+        if report is None:
+            return self._respond(handler, report_code, 404)
+
+        body, etag, last_modified = report
+        headers = {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True)}
+        if self._not_modified(handler.headers, etag, last_modified):
+            return self._respond(handler, report_code, 304, headers)
+        self._respond(handler, report_code, 200, headers, body)
+
+    @staticmethod
+    def _not_modified(request_headers, etag, last_modified):
+        if "If-None-Match" in request_headers:
+            return request_headers["If-None-Match"] == etag
+        if "If-Modified-Since" in request_headers:
+            try:
+                return parsedate_to_datetime(request_headers["If-Modified-Since"]).timestamp() >= last_modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _respond(self, handler, report_code, status, headers=None, body=b""):
+        with self._lock:
+            self.requests.append((report_code, status))
+        handler.send_response(status)
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        if status != 304:
+            handler.send_header("Content-Type", "text/xml; charset=utf-8")
+            handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        for start in range(0, len(body), self.chunk_size):
+            handler.wfile.write(body[start:start + self.chunk_size])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Offline check and timing of the fetch path against the stand-in server
+    import asyncio
+    import tempfile
+    import dmoxml
+
+    source = os.path.join(dmoxml.data_dir, "XmlDataReport.xml")
+    with StandInDMOServer({"D1A": source, "D1B": source}) as server, tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dmo_data.xml")
+        for label in ["full download", "not modified"]:
+            start = time.perf_counter()
+            dmoxml.fetch_dmo_xml(xml_file_path=path, base_url=server.base_url)
+            print(f"{label}: {time.perf_counter() - start:.4f}s")
+
+        server.fail_next(2)
+        os.remove(dmoxml._validators_path(path))
+        start = time.perf_counter()
+        dmoxml.fetch_dmo_xml(xml_file_path=path, base_url=server.base_url, backoff=0.05)
+        print(f"two failures then download: {time.perf_counter() - start:.4f}s")
+
+        rows = sum(len(batch) for batch in dmoxml.stream_dmo_xml(xml_file_path=path + ".streamed",
+                                                               base_url=server.base_url))
+        print(f"streamed {rows} gilts")
+        print(asyncio.run(dmoxml.fetch_dmo_xml_async(["D1A", "D1B"], tmp, base_url=server.base_url)))
+        print(server.requests)
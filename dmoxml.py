@@ -1,45 +1,253 @@
 import os
+import re
+import json
 import time
+import codecs
+import asyncio
 import random
-import requests
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 
-data_dir = "data"
-os.makedirs(data_dir, exist_ok=True)
+data_dir = "data"  # created on first download, not at import
 
 
-def fetch_dmo_xml():
-    url = "https://www.dmo.gov.uk/data/XmlDataReport?reportCode=D1A"
-    xml_file_path = os.path.join(data_dir, "dmo_data.xml")
+# ---- Fetching ----
+DMO_BASE_URL = "https://www.dmo.gov.uk"
+REPORT_PATH = "/data/XmlDataReport?reportCode={report_code}"
 
-    headers = {
-        "User-Agent": random.choice([
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0) Gecko/20100101 Firefox/92.0"
-        ]),
-        "Referer": "https://www.dmo.gov.uk/",
-        "Accept-Language": "en-US,en;q=0.9",
-        "DNT": "1",
-        "Connection": "keep-alive"
-    }
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0) Gecko/20100101 Firefox/92.0"
+]
 
-    session = requests.Session()
-    session.headers.update(headers)
+# Responses worth retrying; anything else is reported straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-    time.sleep(random.uniform(1, 3))  # Simulate human browsing
+_session = None
+
+
+def get_session():
+    """
+    Returns:
+        requests.Session: The shared session, so repeated fetches reuse pooled connections.
+    """
+    global _session
+    if _session is None:
+        import requests  # only needed for fetching, so imported on first use
+
+        _session = requests.Session()
+        _session.headers.update({
+            "User-Agent": random.choice(USER_AGENTS),
+            "Referer": "https://www.dmo.gov.uk/",
+            "Accept-Language": "en-US,en;q=0.9",
+            "DNT": "1",
+            "Connection": "keep-alive"
+        })
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def _report_file_path(report_code, directory=None):
+    directory = directory or data_dir
+    if report_code == "D1A":
+        return os.path.join(directory, "dmo_data.xml")
+    return os.path.join(directory, f"dmo_{report_code}.xml")
+
+
+def _validators_path(xml_file_path):
+    """Sidecar file holding the ETag/Last-Modified of the copy saved at xml_file_path."""
+    return xml_file_path + ".http.json"
+
+
+def _conditional_headers(xml_file_path):
+    if not (os.path.exists(xml_file_path) and os.path.exists(_validators_path(xml_file_path))):
+        return {}
+    with open(_validators_path(xml_file_path), "r", encoding="utf-8") as file:
+        validators = json.load(file)
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _save_validators(xml_file_path, response):
+    validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    with open(_validators_path(xml_file_path), "w", encoding="utf-8") as file:
+        json.dump(validators, file)
+
+
+def _get_with_retry(session, url, headers, retries, backoff, timeout):
+    """
+    GET url (streamed), retrying connection errors and RETRY_STATUSES up to retries times
+    with exponential backoff and jitter. A numeric Retry-After header is honoured, capped at
+    the longest backoff (backoff * 2 ** retries) so a server cannot stall the fetch.
+
+    Returns:
+        requests.Response: The last response (possibly an error status).
+    """
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, headers=headers, timeout=timeout, stream=True)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt + random.uniform(0, backoff))
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        retry_after = response.headers.get("Retry-After", "")
+        response.close()
+        delay = min(float(retry_after), backoff * 2 ** retries) if retry_after.isdigit() \
+            else backoff * 2 ** attempt + random.uniform(0, backoff)
+        time.sleep(delay)
+
+
+def _open_report(report_code, xml_file_path, base_url, session, retries, backoff, timeout):
+    """Issue the conditional GET for a report. Returns (response, xml_file_path), response None on failure."""
+    import requests
+
+    if xml_file_path is None:
+        xml_file_path = _report_file_path(report_code)
+    url = base_url + REPORT_PATH.format(report_code=report_code)
+    session = session or get_session()
 
     try:
-        response = session.get(url, timeout=10)
-        if response.status_code == 200:
-            with open(xml_file_path, "w", encoding="utf-8") as file:
-                file.write(response.text)
-            print(f"XML data saved to {xml_file_path}")
-        else:
-            print(f"Failed to fetch data: {response.status_code}")
+        response = _get_with_retry(session, url, _conditional_headers(xml_file_path), retries, backoff, timeout)
     except requests.exceptions.RequestException as e:
         print(f"Request failed: {e}")
+        return None, xml_file_path
+
+    if response.status_code not in (200, 304):
+        print(f"Failed to fetch data: {response.status_code}")
+        response.close()
+        return None, xml_file_path
+    return response, xml_file_path
+
+
+def _stream_to_file(response, xml_file_path, chunk_size):
+    """
+    Yield the response body in chunks while writing it to xml_file_path. The file (and its
+    validators) only replace the previous copy once the whole body has arrived.
+    """
+    part_path = xml_file_path + ".part"
+    os.makedirs(os.path.dirname(xml_file_path) or ".", exist_ok=True)
+    try:
+        with open(part_path, "wb") as file:
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+                yield chunk
+        os.replace(part_path, xml_file_path)
+        _save_validators(xml_file_path, response)
+    finally:
+        response.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def fetch_dmo_xml(report_code="D1A", xml_file_path=None, base_url=DMO_BASE_URL, session=None,
+                  retries=3, backoff=1.0, timeout=10, chunk_size=1 << 16):
+    """
+    Download a DMO XML report, streaming it to disk.
+
+    The ETag/Last-Modified of the saved copy are sent back as If-None-Match/If-Modified-Since,
+    so an unchanged report costs a single 304 and the file is left as it is.
+
+    Parameters:
+        report_code (str): DMO report code.
+        xml_file_path (str): Where to save the report. Defaults to the standard location.
+        base_url (str): Server to fetch from (e.g. a dmo_server.StandInDMOServer for offline use).
+        session (requests.Session): Session to use; defaults to the shared get_session().
+        retries (int): Retries after a connection error or 429/5xx response.
+        backoff (float): Base backoff in seconds, doubled on each retry.
+        timeout (float): Connect/read timeout in seconds.
+        chunk_size (int): Bytes written at a time.
+
+    Returns:
+        str: Path of the saved report (also when it was not modified), or None if the fetch failed.
+    """
+    import requests
+
+    response, xml_file_path = _open_report(report_code, xml_file_path, base_url, session, retries, backoff, timeout)
+    if response is None:
+        return None
+    if response.status_code == 304:
+        response.close()
+        print(f"XML data at {xml_file_path} is up to date")
+        return xml_file_path
+
+    try:
+        for _ in _stream_to_file(response, xml_file_path, chunk_size):
+            pass
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"Request failed: {e}")
+        return None
+    print(f"XML data saved to {xml_file_path}")
+    return xml_file_path
+
+
+def stream_dmo_xml(report_code="D1A", xml_file_path=None, base_url=DMO_BASE_URL, session=None,
+                   retries=3, backoff=1.0, timeout=10, batch_size=100_000, chunk_size=1 << 16):
+    """
+    Fetch a DMO XML report and parse it as it downloads, saving a copy to disk on the way.
+    If the report is not modified, the saved copy is parsed instead.
+
+    Retries only cover establishing the response: a connection lost mid-body stops the
+    stream (after the batches already yielded) and leaves the previous copy in place.
+
+    Parameters:
+        As fetch_dmo_xml(), plus batch_size as for iter_dmo_xml().
+
+    Yields:
+        pd.DataFrame: Typed batches, as from iter_dmo_xml().
+    """
+    response, xml_file_path = _open_report(report_code, xml_file_path, base_url, session, retries, backoff, timeout)
+    if response is None:
+        return
+    if response.status_code == 304:
+        response.close()
+        yield from iter_dmo_xml(xml_file_path, batch_size)
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pieces = (decoder.decode(chunk) for chunk in _stream_to_file(response, xml_file_path, chunk_size))
+    yield from _parse_batches(pieces, batch_size)
+
+
+async def fetch_dmo_xml_async(report_codes, xml_dir=None, max_concurrency=4, **kwargs):
+    """
+    Fetch several reports concurrently over the shared connection pool.
+
+    requests is blocking, so each fetch runs in a worker thread; this keeps the I/O layer
+    free of an extra async HTTP dependency while still overlapping the downloads.
+
+    Parameters:
+        report_codes (list of str): DMO report codes.
+        xml_dir (str): Directory to save the reports in. Defaults to the standard location.
+        max_concurrency (int): Maximum fetches in flight.
+        **kwargs: Passed to fetch_dmo_xml().
+
+    Returns:
+        dict: Report code -> saved path (None where the fetch failed).
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    kwargs.setdefault("session", get_session())
+
+    async def fetch(report_code):
+        async with semaphore:
+            xml_file_path = _report_file_path(report_code, xml_dir)
+            return await asyncio.to_thread(fetch_dmo_xml, report_code, xml_file_path, **kwargs)
+
+    paths = await asyncio.gather(*(fetch(code) for code in report_codes))
+    return dict(zip(report_codes, paths))
 
 
 def process_dmo_xml(xml_file_path=None):
@@ -72,6 +280,120 @@ def process_dmo_xml(xml_file_path=None):
         print(f"Error processing XML file: {e}")
         return None
 
+# ---- Streaming Ingestion ----
+D1A_COLUMNS = ["CLOSE_OF_BUSINESS_DATE", "INSTRUMENT_TYPE", "MATURITY_BRACKET", "INSTRUMENT_NAME", "ISIN_CODE",
+               "REDEMPTION_DATE", "FIRST_ISSUE_DATE", "DIVIDEND_DATES", "CURRENT_EX_DIV_DATE",
+               "TOTAL_AMOUNT_IN_ISSUE", "TOTAL_AMOUNT_INCLUDING_IL_UPLIFT", "BASE_RPI_87"]
+DATE_COLUMNS = ["CLOSE_OF_BUSINESS_DATE", "REDEMPTION_DATE", "FIRST_ISSUE_DATE", "CURRENT_EX_DIV_DATE"]
+FLOAT_COLUMNS = ["TOTAL_AMOUNT_IN_ISSUE", "TOTAL_AMOUNT_INCLUDING_IL_UPLIFT", "BASE_RPI_87"]
+CATEGORY_COLUMNS = ["INSTRUMENT_TYPE", "MATURITY_BRACKET", "ISIN_CODE"]
+
+XML_DECLARATION = re.compile(r"<\?xml[^>]*\?>")
+
+
+def _xml_chunks(pieces):
+    """
+    Re-chunk the text of an XML file (or several D1A reports concatenated into one file),
+    wrapped in a single synthetic root so that the reports parse as one document.
+    """
+    yield "<archive>"
+    pending = ""
+    for piece in pieces:
+        text = pending + piece
+        # Hold back an unterminated tag so a declaration is never split across chunks
+        cut = text.rfind("<")
+        if cut >= 0 and text.find(">", cut) < 0:
+            text, pending = text[:cut], text[cut:]
+        else:
+            pending = ""
+        yield XML_DECLARATION.sub("", text)
+    yield XML_DECLARATION.sub("", pending)
+    yield "</archive>"
+
+
+def _read_chunks(xml_file_path, chunk_size):
+    with open(xml_file_path, "r", encoding="utf-8") as file:
+        yield from iter(lambda: file.read(chunk_size), "")
+
+
+def _batch_to_df(buffers):
+    """Convert per-column lists of attribute strings into a typed DataFrame."""
+    data = {}
+    for col in D1A_COLUMNS:
+        values = buffers[col]
+        if col in DATE_COLUMNS:
+            data[col] = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+        elif col in FLOAT_COLUMNS:
+            data[col] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(np.float64)
+        elif col in CATEGORY_COLUMNS:
+            data[col] = pd.Categorical(values)
+        else:
+            data[col] = pd.Series(values, dtype=object)
+    return pd.DataFrame(data)
+
+
+def iter_dmo_xml(xml_file_path=None, batch_size=100_000, chunk_size=1 << 20):
+    """
+    Stream a D1A XML file, or an archive of concatenated D1A reports, as typed DataFrame batches.
+
+    Records are parsed incrementally and discarded as soon as their attributes are
+    copied into the column buffers, so peak memory depends on batch_size and not on
+    the size of the file.
+
+    Parameters:
+        xml_file_path (str): Path to the XML file. Defaults to the standard location.
+        batch_size (int): Maximum number of gilts per batch.
+        chunk_size (int): Number of characters read from the file at a time.
+
+    Yields:
+        pd.DataFrame: Batches with the D1A columns; dates as datetime64, amounts as
+        float64 and ISIN_CODE/INSTRUMENT_TYPE/MATURITY_BRACKET as categoricals.
+    """
+    if xml_file_path is None:
+        xml_file_path = os.path.join(data_dir, "dmo_data.xml")
+
+    if not os.path.exists(xml_file_path):
+        print(f"XML file not found at {xml_file_path}. Please fetch or manually download the file.")
+        return
+
+    yield from _parse_batches(_read_chunks(xml_file_path, chunk_size), batch_size)
+
+
+def _parse_batches(pieces, batch_size):
+    """Parse D1A records from pieces of XML text into typed DataFrame batches."""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    buffers = {col: [] for col in D1A_COLUMNS}
+    count = 0
+    parents = []
+
+    for text in _xml_chunks(pieces):
+        parser.feed(text)
+        for event, elem in parser.read_events():
+            if event == "start":
+                parents.append(elem)
+                continue
+
+            parents.pop()
+            if elem.tag == "View_GILTS_IN_ISSUE":
+                attrib = elem.attrib
+                for col in D1A_COLUMNS:
+                    buffers[col].append(attrib.get(col))
+                count += 1
+
+            # Drop every parsed element so the tree never grows
+            if parents:
+                parents[-1].remove(elem)
+
+            if count == batch_size:
+                yield _batch_to_df(buffers)
+                buffers = {col: [] for col in D1A_COLUMNS}
+                count = 0
+    parser.close()
+
+    if count:
+        yield _batch_to_df(buffers)
+
+
 def load_df_from_csv(csv_file_path=None):
     """
     Loads the cleaned DMO CSV file and returns a pandas DataFrame.
@@ -0,0 +1,684 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import tempfile
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, replace
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import dmoxml
+import rules_engine as re
+from bench import write_d1a_xml
+from benchmark_index import BenchmarkIndex, RULE_NAMES
+from incremental import IncrementalBenchmarks
+from result_cache import ResultCache
+from ruleset import BRANCHES, DEFAULT_RULESET, Exclusion, Ruleset
+from scenarios import BaseUniverse
+from service import BenchmarkService
+from sweep import SweepExecutor
+from universe import GiltUniverse
+
+# Differential fuzzing: random adversarial gilt universes are resolved over dense maturity
+# grids by every engine and compared with a plain-Python reference that reads the ruleset
+# literally, one maturity and one gilt at a time. Failures are shrunk to a minimal case.
+
+FUZZ_DIR = os.path.join("data", "fuzz")
+
+MAX_GILTS = 12
+AS_OF = "2025-01-01"  # Fixed evaluation date of generated exclusions, so runs are reproducible
+
+
+# ---- Reference Engine ----
+def reference_benchmark(gilts, maturity, ruleset=DEFAULT_RULESET, unique=False):
+    """
+    The ICMA benchmark for one maturity, straight from the Handbook wording.
+
+    Parameters:
+        gilts (list of tuple): (isin, redemption datetime.date or None, amount) per gilt.
+        maturity (datetime.date | None): New issue maturity.
+        ruleset (Ruleset): The rules to read.
+        unique (bool): Read the nearest-benchmark branches as find_ICMA_benchmark does: a branch only
+            picks a benchmark when a single AB has the selected redemption date. Otherwise the
+            nearest date is taken whatever the ties, as get_icma_benchmark does.
+
+    Returns:
+        tuple: (redemption date of the benchmark or None, rule name).
+    """
+    if maturity is None:
+        return None, 'None'
+    excluded = set(ruleset.excluded_isins())
+
+    # R7.3 Appropriate benchmarks: benchmark size and not excluded
+    abs_ = [date for isin, date, amount in gilts
+            if date is not None and amount >= ruleset.benchmark_size and isin not in excluded]
+    same_year = [d for d in abs_ if d.year == maturity.year]
+    same_month = [d for d in same_year if d.month == maturity.month]
+    shorter = [d for d in abs_ if d < maturity]
+    shorter_in_year = [d for d in same_year if d < maturity]
+    longer_in_year = [d for d in same_year if d > maturity]
+
+    def nearest(candidates, pick):
+        """The nearest candidate (None if there is none, or with unique=True if it is tied)."""
+        if not candidates:
+            return None
+        date = pick(candidates)
+        if unique and candidates.count(date) > 1:
+            return None
+        return date
+
+    # R7.4 Branches in the ruleset's order; the first that applies decides
+    for rule in ruleset.branches:
+        if rule == 'R7.4(a)':
+            if len(same_year) == 1:
+                return same_year[0], rule
+        elif rule == 'R7.4(b)':
+            if not same_year:
+                date = nearest(shorter, max)
+                return (date, rule) if date is not None else (None, 'None')
+        elif rule == 'R7.4(c)(i)':
+            if len(same_month) == 1:
+                return same_month[0], rule
+        elif rule == 'R7.4(c)(ii)':
+            date = nearest(shorter_in_year, max)
+            if date is not None:
+                return date, rule
+        elif rule == 'R7.4(c)(iii)':
+            date = nearest(longer_in_year, min)
+            if date is not None:
+                return date, rule
+    return None, 'None'
+
+
+# ---- Adversarial Universes ----
+@dataclass(frozen=True)
+class Case:
+    """One fuzz case: a small universe of conventional gilts and the ruleset to apply."""
+    isins: tuple
+    dates: tuple  # ISO redemption dates, None for a missing date
+    amounts: tuple
+    ruleset: Ruleset = DEFAULT_RULESET
+
+    def __len__(self):
+        return len(self.isins)
+
+    def gilts(self):
+        """The gilts as reference_benchmark takes them."""
+        return [(isin, None if date is None else datetime.date.fromisoformat(date), amount)
+                for isin, date, amount in zip(self.isins, self.dates, self.amounts)]
+
+    def to_frame(self):
+        """The gilts as a D1A-shaped DataFrame (only the columns the engines need)."""
+        return pd.DataFrame({
+            'INSTRUMENT_TYPE': pd.Series(['Conventional'] * len(self), dtype=object),
+            'ISIN_CODE': pd.Series(self.isins, dtype=object),
+            'REDEMPTION_DATE': pd.to_datetime(pd.Series(self.dates, dtype=object)),
+            'TOTAL_AMOUNT_IN_ISSUE': pd.Series(self.amounts, dtype=np.float64),
+        })
+
+    def to_dict(self):
+        return {'isins': list(self.isins), 'dates': list(self.dates), 'amounts': list(self.amounts),
+                'ruleset': self.ruleset.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(tuple(data['isins']), tuple(data['dates']), tuple(data['amounts']),
+                   Ruleset.from_dict(data['ruleset']))
+
+
+def random_case(rng, max_gilts=MAX_GILTS):
+    """
+    Draw an adversarial case: few gilts packed into a few calendar years, with same-day and
+    same-month redemptions, dates on year boundaries and 29 February, missing dates, and
+    amounts exactly at, just either side of, or far from the benchmark size. About a third
+    of the cases use a random ruleset (threshold, dated exclusions, branch subset and order).
+
+    Parameters:
+        rng (np.random.Generator): Source of randomness.
+        max_gilts (int): Largest universe to draw.
+
+    Returns:
+        Case
+    """
+    ruleset = DEFAULT_RULESET
+    if rng.random() < 0.35:
+        branches = list(BRANCHES)
+        if rng.random() < 0.5:
+            branches = list(rng.permutation(branches)[:rng.integers(1, len(branches) + 1)])
+        ruleset = Ruleset('fuzz', 'fuzz', benchmark_size=float(rng.choice([5_000, 10_000, 15_000])),
+                          branches=branches, as_of=AS_OF)
+    size = ruleset.benchmark_size
+
+    n = int(rng.integers(0, max_gilts + 1))
+    first_year, years = int(rng.integers(1995, 2070)), int(rng.integers(1, 4))
+    dates = []
+    for _ in range(n):
+        kind = rng.random()
+        year = first_year + int(rng.integers(0, years))
+        if kind < 0.05:
+            date = None  # missing redemption date
+        elif kind < 0.2:
+            date = datetime.date(year, 1, 1) if rng.random() < 0.5 else datetime.date(year, 12, 31)
+        elif kind < 0.25 and year % 4 == 0:
+            date = datetime.date(year, 2, 29)
+        elif kind < 0.45 and any(dates):
+            date = rng.choice([d for d in dates if d is not None])  # same-day redemption
+        elif kind < 0.6 and any(dates):
+            same = rng.choice([d for d in dates if d is not None])  # same month
+            date = same.replace(day=int(rng.integers(1, 29)))
+        else:
+            date = datetime.date(year, 1, 1) + datetime.timedelta(days=int(rng.integers(0, 365)))
+        dates.append(date)
+
+    amounts = rng.choice([size, size, size - 0.001, size + 0.001, 2 * size, size / 2, 0.0, np.nan], n)
+    amounts = np.where(rng.random(n) < 0.3, np.round(rng.normal(size, size / 4, n), 3), amounts)
+    isins = [f'GB{i:010d}' for i in range(n)]
+
+    if n and ruleset is not DEFAULT_RULESET and rng.random() < 0.5:
+        as_of = np.datetime64(AS_OF)
+        exclusions = []
+        for isin in rng.choice(isins, int(rng.integers(1, min(n, 3) + 1)), replace=False):
+            start = str(as_of + int(rng.integers(-400, 400))) if rng.random() < 0.5 else None
+            end = str(as_of + int(rng.integers(-400, 400))) if rng.random() < 0.5 else None
+            exclusions.append(Exclusion(str(isin), start, end))
+        ruleset = replace(ruleset, exclusions=tuple(exclusions))
+
+    return Case(tuple(isins), tuple(None if d is None else d.isoformat() for d in dates),
+                tuple(float(a) for a in amounts), ruleset)
+
+
+def fuzz_grid(case):
+    """
+    Every day from the year before the case's first redemption to the year after its last,
+    plus far-off maturities and a NaT.
+    """
+    years = [int(d[:4]) for d in case.dates if d is not None] or [2030]
+    start = np.datetime64(f'{min(years) - 1}-01-01')
+    stop = np.datetime64(f'{max(years) + 2}-01-01')
+    return np.concatenate([np.arange(start, stop, dtype='datetime64[D]'),
+                           np.array(['1900-01-01', '2199-12-31', 'NaT'], dtype='datetime64[D]')])
+
+
+# ---- Engines ----
+@dataclass(frozen=True)
+class Engine:
+    """
+    An implementation under test. kind says which maturities it is checked on: 'batch' (the
+    whole grid), 'scalar' (a sample), 'slow' (a smaller sample) or 'pool' (the whole grid, on
+    every pool_every-th case). unique says which reading of ties it follows (see
+    reference_benchmark). run(case, df, maturities) returns a dict with 'dates' and optionally
+    'rules' (codes into RULE_NAMES) and 'isins'.
+    """
+    kind: str
+    unique: bool
+    run: object
+
+
+def _frame_result(frame):
+    return {'dates': frame['BENCHMARK_REDEMPTION_DATE'].to_numpy().astype('datetime64[D]'),
+            'rules': frame['RULE'].cat.codes.to_numpy(),
+            'isins': frame['BENCHMARK_ISIN'].astype(object).where(frame['BENCHMARK_ISIN'].notna(), None).to_numpy()}
+
+
+def _row_result(case, rows):
+    """Result from gilt row ids (-1 for none)."""
+    dates = np.append(np.array(case.dates, dtype='datetime64[D]'), np.datetime64('NaT'))
+    return {'dates': dates[rows], 'isins': np.append(np.array(case.isins, dtype=object), None)[rows]}
+
+
+def _timestamps(values):
+    return {'dates': np.array([np.datetime64('NaT') if v is None else np.datetime64(v, 'D') for v in values],
+                              dtype='datetime64[D]')}
+
+
+def _get_icma_benchmark(case, df, maturities):
+    return _timestamps([re.get_icma_benchmark(df, m, ruleset=case.ruleset) for m in maturities])
+
+
+def _get_icma_benchmark_universe(case, df, maturities):
+    universe = GiltUniverse.from_dataframe(df, case.ruleset)
+    return _timestamps([re.get_icma_benchmark(universe, m) for m in maturities])
+
+
+def _index_resolve(case, df, maturities):
+    index = BenchmarkIndex.from_dataframe(df, case.ruleset)
+    positions, rules = np.array([index.resolve(m) for m in maturities], dtype=np.int64).reshape(-1, 2).T
+    return {'dates': np.append(index.dates, np.datetime64('NaT'))[positions], 'rules': rules,
+            'isins': np.append(index.isins, None)[positions]}
+
+
+def _get_icma_benchmarks(case, df, maturities):
+    return _frame_result(re.get_icma_benchmarks(df, maturities, ruleset=case.ruleset))
+
+
+def _get_icma_benchmarks_universe(case, df, maturities):
+    return _frame_result(re.get_icma_benchmarks(GiltUniverse.from_dataframe(df, case.ruleset), maturities))
+
+
+def _cliff_edges(case, df, maturities):
+    edges = BenchmarkIndex.from_dataframe(df, case.ruleset).cliff_edges()
+    positions, rules = edges.resolve_many(maturities)
+    return {'dates': np.append(edges.index.dates, np.datetime64('NaT'))[positions], 'rules': rules,
+            'isins': np.append(edges.index.isins, None)[positions]}
+
+
+def _incremental(case, df, maturities):
+    # Start with every gilt's amount flipped across the threshold and every other gilt's
+    # exclusion toggled, then put them back one event at a time. After each event the
+    # intervals and index must equal a fresh build of the same state.
+    size = case.ruleset.benchmark_size
+    flipped = df.copy()
+    flipped['TOTAL_AMOUNT_IN_ISSUE'] = np.where(df['TOTAL_AMOUNT_IN_ISSUE'] >= size, 0.0, 2 * size)
+    benchmarks = IncrementalBenchmarks(flipped, case.ruleset)
+    appropriate = benchmarks.appropriate.copy()
+    events = [(benchmarks.set_appropriate, i, not appropriate[i]) for i in range(0, len(case), 2)]
+    events += [(benchmarks.set_amount, i, amount) for i, amount in enumerate(case.amounts)]
+    events += [(benchmarks.set_appropriate, i, appropriate[i]) for i in range(0, len(case), 2)]
+    for update, gilt, value in events:
+        update(case.isins[gilt], value)
+        ab = benchmarks._is_ab()
+        fresh = BenchmarkIndex(benchmarks.dates[ab], np.flatnonzero(ab), case.ruleset)
+        edges = fresh.cliff_edges()
+        if not (np.array_equal(benchmarks.index.dates, fresh.dates) and
+                np.array_equal(benchmarks.index._month_offsets, fresh._month_offsets) and
+                np.array_equal(benchmarks.starts, edges.starts) and
+                np.array_equal(benchmarks.ids, benchmarks._gilt_ids(fresh, edges.positions)) and
+                np.array_equal(benchmarks.rules, edges.rules)):
+            raise AssertionError(f"Incremental map differs from a fresh build after {update.__name__}"
+                                 f"({case.isins[gilt]!r}, {value!r})")
+    return _row_result(case, benchmarks.resolve_many(maturities))
+
+
+def _scenario_base(case, df, maturities):
+    return _row_result(case, BaseUniverse(df, case.ruleset).benchmark_rows(maturities))
+
+
+def _shared_memory_mapped(pid):
+    """Names of the shared memory blocks process pid maps (unlinked ones included), or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/maps") as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    return {os.path.basename(line.split(None, 5)[5].removesuffix(" (deleted)"))
+            for line in lines if len(line.split(None, 5)) == 6 and line.split(None, 5)[5].startswith("/dev/shm/psm_")}
+
+
+def _sweep(case, df, maturities):
+    # Once a sweep returns, no worker may still map its buffers: an unlinked block has gone from
+    # the /dev/shm listing but its memory stays allocated while any process maps it
+    with SweepExecutor(df, processes=2, chunk_size=max(1, len(maturities) // 3), ruleset=case.ruleset) as executor:
+        result = _frame_result(executor.benchmarks(maturities))
+        universe_blocks = {shm.name.lstrip("/") for shm in executor._blocks}
+        for pid in executor._executor._processes:
+            mapped = _shared_memory_mapped(pid)
+            if mapped is not None and mapped - universe_blocks:
+                raise AssertionError(f"Worker {pid} still maps {sorted(mapped - universe_blocks)} after the sweep")
+        return result
+
+
+def _http(url, body=None):
+    """(status, parsed JSON body) of a GET, or of a POST if body is given."""
+    request = urllib.request.Request(url, data=None if body is None else json.dumps(body).encode())
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, json.load(e)
+
+
+def _service(case, df, maturities):
+    # Served over HTTP from a D1A file, with the exclusions left to the service's date. The date
+    # moves to AS_OF between requests, so the answers must follow it without the file changing.
+    # Maturities that are not dates must be rejected with 400.
+    dates = np.full(len(maturities), np.datetime64('NaT'), dtype='datetime64[D]')
+    rules = np.full(len(maturities), RULE_NAMES.index('None'))
+    isins = np.full(len(maturities), None, dtype=object)
+    if not len(case):
+        return {'dates': dates, 'rules': rules, 'isins': isins}  # An empty file is never loaded
+    as_of = datetime.date.fromisoformat(AS_OF)
+    with tempfile.TemporaryDirectory() as path:
+        xml_file_path = os.path.join(path, "dmo_data.xml")
+        d1a = df.reindex(columns=dmoxml.D1A_COLUMNS)
+        d1a['CLOSE_OF_BUSINESS_DATE'] = pd.Timestamp(as_of)
+        write_d1a_xml(d1a, xml_file_path)
+        ruleset = replace(case.ruleset, as_of=None)
+        with BenchmarkService(xml_file_path, port=0, poll_interval=3600, ruleset=ruleset) as service:
+            service.today = lambda: as_of - datetime.timedelta(days=400)
+            _http(service.url + "/benchmark?maturity=2030-01-07")
+            service.today = lambda: as_of
+            for text in ["", "NaT", "not-a-date"]:
+                status, _ = _http(service.url + "/benchmark?maturity=" + text)
+                if status != 400:
+                    raise AssertionError(f"/benchmark?maturity={text} returned {status}, not 400")
+            dated = ~np.isnat(maturities)
+            status, body = _http(service.url + "/benchmarks",
+                                 {'maturities': [str(m) for m in maturities[dated]]})
+    if status != 200:
+        raise AssertionError(f"/benchmarks returned {status}: {body}")
+    answers = body['results']
+    dates[dated] = [np.datetime64('NaT') if a['benchmark_redemption_date'] is None
+                    else np.datetime64(a['benchmark_redemption_date'], 'D') for a in answers]
+    rules[dated] = [RULE_NAMES.index(a['rule']) for a in answers]
+    isins[dated] = [a['benchmark_isin'] for a in answers]
+    return {'dates': dates, 'rules': rules, 'isins': isins}
+
+
+def _result_cache(case, df, maturities):
+    # Resolve the first half of the grid, then all of it, so the second pass extends a cached range
+    with tempfile.TemporaryDirectory() as path:
+        cache = ResultCache(path)
+        cache.resolve(df, maturities[:len(maturities) // 2], case.ruleset)
+        return _frame_result(cache.benchmarks(df, maturities, case.ruleset))
+
+
+def _rule_matrices(case, df, maturities):
+    selected = re.get_rule_matrices(df, maturities, ruleset=case.ruleset)['ICMA_BENCHMARK']
+    dates = np.array(case.dates, dtype='datetime64[D]')
+    return {'dates': np.array([dates[column].max() if column.any() else np.datetime64('NaT')
+                               for column in selected.T], dtype='datetime64[D]')}
+
+
+def _apply_rules(case, df, maturities):
+    results = []
+    for m in maturities:
+        flagged = re.apply_rules(df.copy(), m, ruleset=case.ruleset)
+        flagged = flagged[flagged['ICMA_BENCHMARK']]
+        results.append(flagged['REDEMPTION_DATE'].max() if len(flagged) else None)
+    return _timestamps(results)
+
+
+ENGINES = {
+    'get_icma_benchmark': Engine('scalar', False, _get_icma_benchmark),
+    'get_icma_benchmark[universe]': Engine('scalar', False, _get_icma_benchmark_universe),
+    'BenchmarkIndex.resolve': Engine('scalar', False, _index_resolve),
+    'get_icma_benchmarks': Engine('batch', False, _get_icma_benchmarks),
+    'get_icma_benchmarks[universe]': Engine('batch', False, _get_icma_benchmarks_universe),
+    'cliff_edges': Engine('batch', False, _cliff_edges),
+    'IncrementalBenchmarks': Engine('batch', False, _incremental),
+    'BaseUniverse.benchmark_rows': Engine('batch', False, _scenario_base),
+    'SweepExecutor': Engine('pool', False, _sweep),
+    'ResultCache': Engine('batch', False, _result_cache),
+    'BenchmarkService': Engine('pool', False, _service),
+    'get_rule_matrices': Engine('batch', True, _rule_matrices),
+    'apply_rules': Engine('slow', True, _apply_rules),
+}
+
+
+# ---- Checking ----
+class _Reference:
+    """reference_benchmark over a case's maturities, memoised per (maturities, unique)."""
+
+    def __init__(self, case):
+        self.case = case
+        self.gilts = case.gilts()
+        self.ab_isins = {}  # redemption date -> ISINs of the ABs redeeming on it
+        excluded = set(case.ruleset.excluded_isins())
+        for isin, date, amount in self.gilts:
+            if date is not None and amount >= case.ruleset.benchmark_size and isin not in excluded:
+                self.ab_isins.setdefault(date, set()).add(isin)
+        self._memo = {}
+
+    def __call__(self, maturities, unique):
+        """
+        Returns:
+            tuple: (np.ndarray of benchmark redemption dates, NaT for none, np.ndarray of rule codes).
+        """
+        key = (maturities.tobytes(), unique)
+        if key not in self._memo:
+            results = [reference_benchmark(self.gilts, m, self.case.ruleset, unique)
+                       for m in maturities.astype(object)]  # datetime.date, None for NaT
+            self._memo[key] = (np.array([date for date, _ in results], dtype='datetime64[D]'),
+                               np.array([RULE_NAMES.index(rule) for _, rule in results]))
+        return self._memo[key]
+
+
+def _first_mismatch(reference, name, result, maturities):
+    """The first maturity where an engine's result disagrees with the reference, as a failure dict."""
+    engine = ENGINES[name]
+    dates, rules = reference(maturities, engine.unique)
+    got_dates = np.asarray(result['dates'], dtype='datetime64[D]')
+    bad = ~((got_dates == dates) | (np.isnat(got_dates) & np.isnat(dates)))
+    if 'rules' in result:
+        bad |= np.asarray(result['rules']) != rules
+    if 'isins' in result:
+        # With same-day ties any of the tied ABs is a right answer
+        bad |= [not (isin is None if np.isnat(d) else isin in reference.ab_isins.get(d.astype(object), ()))
+                for isin, d in zip(result['isins'], got_dates)]
+    if not bad.any():
+        return None
+    i = int(np.flatnonzero(bad)[0])
+    return {
+        'engine': name,
+        'maturity': str(maturities[i]),
+        'expected': [str(dates[i]), RULE_NAMES[rules[i]]],
+        'got': [str(got_dates[i]), RULE_NAMES[result['rules'][i]] if 'rules' in result else None,
+                result['isins'][i] if 'isins' in result else None],
+    }
+
+
+def check_engine(case, name, maturities, reference=None, df=None):
+    """
+    Run one engine on a case and compare it with the reference.
+
+    Parameters:
+        case (Case): The universe and ruleset.
+        name (str): Key of ENGINES.
+        maturities (array-like): Maturities to check.
+
+    Returns:
+        dict or None: The first failure ('engine', 'maturity', 'expected', 'got'), or None if the
+        engine agrees with the reference everywhere.
+    """
+    maturities = np.asarray(maturities, dtype='datetime64[D]')
+    reference = reference or _Reference(case)
+    df = case.to_frame() if df is None else df
+    try:
+        result = ENGINES[name].run(case, df, maturities)
+    except Exception as e:
+        return {'engine': name, 'maturity': str(maturities[0]) if len(maturities) else None,
+                'expected': None, 'got': f"{type(e).__name__}: {e}"}
+    return _first_mismatch(reference, name, result, maturities)
+
+
+def check_case(case, rng, engines=tuple(ENGINES), sample=16, slow_sample=3, pool=False):
+    """
+    Check every engine on one case over its fuzz_grid (scalar engines on a random sample of it).
+
+    Returns:
+        tuple: (dict engine -> maturities checked, list of failures, number of grid maturities where the
+        two readings of ties (unique or not) disagree).
+    """
+    grid = fuzz_grid(case)
+    dated = grid[~np.isnat(grid)]
+    reference = _Reference(case)
+    df = case.to_frame()
+    samples = {'batch': grid, 'pool': grid,
+               'scalar': rng.choice(dated, min(sample, len(dated)), replace=False),
+               'slow': rng.choice(dated, min(slow_sample, len(dated)), replace=False)}
+
+    checked, failures = {}, []
+    for name in engines:
+        kind = ENGINES[name].kind
+        if kind == 'pool' and not pool:
+            continue
+        maturities = samples[kind]
+        failure = check_engine(case, name, maturities, reference, df)
+        checked[name] = len(maturities)
+        if failure is not None:
+            failures.append(failure)
+
+    first, unique = reference(grid, False)[0], reference(grid, True)[0]
+    divergent = int((~((first == unique) | (np.isnat(first) & np.isnat(unique)))).sum())
+    return checked, failures, divergent
+
+
+# ---- Shrinking ----
+def _simplifications(case):
+    """Smaller or plainer variants of a case, most aggressive first."""
+    for i in range(len(case)):
+        keep = [j for j in range(len(case)) if j != i]
+        yield replace(case, isins=tuple(case.isins[j] for j in keep), dates=tuple(case.dates[j] for j in keep),
+                      amounts=tuple(case.amounts[j] for j in keep))
+    size = case.ruleset.benchmark_size
+    for i, amount in enumerate(case.amounts):
+        plain = 2 * size if amount >= size else 0.0
+        if amount != plain:
+            yield replace(case, amounts=case.amounts[:i] + (plain,) + case.amounts[i + 1:])
+    for i in range(len(case.ruleset.exclusions)):
+        exclusions = case.ruleset.exclusions[:i] + case.ruleset.exclusions[i + 1:]
+        yield replace(case, ruleset=replace(case.ruleset, exclusions=exclusions))
+    if case.ruleset.branches != DEFAULT_RULESET.branches:
+        yield replace(case, ruleset=replace(case.ruleset, branches=DEFAULT_RULESET.branches))
+
+
+def shrink(case, failure, max_attempts=500):
+    """
+    Greedily simplify a failing case (drop gilts, round amounts, drop exclusions, restore the
+    default branch order) while the engine keeps failing the same way (wrong answer or error)
+    at the same maturity.
+
+    Parameters:
+        case (Case): The failing case.
+        failure (dict): Its failure, from check_engine.
+        max_attempts (int): Most candidate cases to try.
+
+    Returns:
+        tuple: (minimal Case, its failure).
+    """
+    maturity = [np.datetime64(failure['maturity'], 'D')]
+    attempts, progress = 0, True
+    while progress and attempts < max_attempts:
+        progress = False
+        for candidate in _simplifications(case):
+            attempts += 1
+            candidate_failure = check_engine(candidate, failure['engine'], maturity)
+            if candidate_failure is not None and (candidate_failure['expected'] is None) == (failure['expected'] is None):
+                case, failure, progress = candidate, candidate_failure, True
+                break
+            if attempts >= max_attempts:
+                break
+    return case, failure
+
+
+def reproducer(case, failure):
+    """Python source that replays a failure."""
+    return (f"import fuzz\n"
+            f"case = fuzz.Case.from_dict({json.dumps(case.to_dict())})\n"
+            f"print(fuzz.check_engine(case, {failure['engine']!r}, [{failure['maturity']!r}]))\n"
+            f"# expected {failure['expected']}, got {failure['got']}\n")
+
+
+# ---- Runner ----
+def _fuzz_chunk(seed, n_cases, engines, sample, slow_sample, pool_every):
+    """Check n_cases random cases. Returns (checks per engine, failures with their cases, divergent maturities)."""
+    rng = np.random.default_rng(seed)
+    checked, failures, divergent = dict.fromkeys(engines, 0), [], 0
+    for i in range(n_cases):
+        case = random_case(rng)
+        pool = bool(pool_every) and i % pool_every == 0
+        case_checked, case_failures, case_divergent = check_case(case, rng, engines, sample, slow_sample, pool)
+        for name, count in case_checked.items():
+            checked[name] += count
+        failures += [(case, failure) for failure in case_failures]
+        divergent += case_divergent
+    return checked, failures, divergent
+
+
+def run_fuzz(n_cases=1_000, seed=0, processes=None, chunk_size=50, engines=tuple(ENGINES), sample=16,
+             slow_sample=3, pool_every=100, max_shrink=5, log=print):
+    """
+    Fuzz every engine against the reference and shrink what fails.
+
+    Cases are drawn in fixed-size chunks, each from its own child of np.random.SeedSequence(seed),
+    so a run is reproducible for a given seed whatever the number of processes.
+
+    Parameters:
+        n_cases (int): Random universes to draw.
+        seed (int): Seed for the random number generator.
+        processes (int): Worker processes; defaults to os.cpu_count(). Use 1 to run in-process.
+        chunk_size (int): Cases per task.
+        engines (list of str): Keys of ENGINES to check.
+        sample (int): Maturities per case for the scalar engines.
+        slow_sample (int): Maturities per case for apply_rules.
+        pool_every (int): Check the process-pool engines on every pool_every-th case of a chunk (0 never).
+        max_shrink (int): Most failures to shrink (one per engine).
+        log (callable): Progress output.
+
+    Returns:
+        dict: 'cases', 'checks' (engine -> maturities checked), 'divergent' (grid maturities where
+        find_ICMA_benchmark's unique reading of ties differs from get_icma_benchmark's), 'seconds'
+        and 'failures' (list of {'failure', 'case', 'reproducer'}, shrunk).
+    """
+    start = time.perf_counter()
+    chunks = [min(chunk_size, n_cases - i) for i in range(0, n_cases, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = [(s, n, tuple(engines), sample, slow_sample, pool_every) for s, n in zip(seeds, chunks)]
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(chunks) == 1:
+        results = [_fuzz_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(min(processes, len(chunks))) as executor:
+            results = list(executor.map(_fuzz_chunk, *zip(*args)))
+
+    checks, failures, divergent = dict.fromkeys(engines, 0), [], 0
+    for chunk_checked, chunk_failures, chunk_divergent in results:
+        for name, count in chunk_checked.items():
+            checks[name] += count
+        failures += chunk_failures
+        divergent += chunk_divergent
+
+    # Shrink the first failure of each engine
+    shrunk, seen = [], set()
+    for case, failure in failures:
+        if failure['engine'] in seen or len(shrunk) >= max_shrink:
+            continue
+        seen.add(failure['engine'])
+        log(f"Shrinking {failure['engine']} failure at {failure['maturity']} ({len(case)} gilts)...")
+        case, failure = shrink(case, failure)
+        shrunk.append({'failure': failure, 'case': case.to_dict(), 'reproducer': reproducer(case, failure)})
+
+    return {'cases': n_cases, 'checks': checks, 'divergent': divergent, 'failing_cases': len(failures),
+            'seconds': time.perf_counter() - start, 'failures': shrunk}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the benchmark engines against a reference.")
+    parser.add_argument("--cases", type=int, default=1_000, help="Random universes to draw.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=0, help="Worker processes (0 for one per CPU).")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--sample", type=int, default=16, help="Maturities per case for the scalar engines.")
+    parser.add_argument("--pool-every", type=int, default=100, help="Check SweepExecutor on every Nth case.")
+    parser.add_argument("--output", default=os.path.join(FUZZ_DIR, "failures.json"),
+                        help="Where to write shrunk failures, if any.")
+    args = parser.parse_args(argv)
+
+    results = run_fuzz(args.cases, args.seed, args.processes or None, engines=args.engines, sample=args.sample,
+                       pool_every=args.pool_every)
+    total = sum(results['checks'].values())
+    print(f"{results['cases']:,} cases, {total:,} maturity checks in {results['seconds']:.1f}s "
+          f"({total / max(results['seconds'], 1e-9):,.0f} checks/s)")
+    for name, count in results['checks'].items():
+        print(f"  {name:<32} {count:>12,}")
+    print(f"Maturities where tie readings differ (apply_rules vs get_icma_benchmark): {results['divergent']:,}")
+
+    if not results['failures']:
+        print("No differences from the reference.")
+        return 0
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results['failures'], file, indent=2, default=str)
+    print(f"{results['failing_cases']:,} failing cases; shrunk reproducers saved to {args.output}:")
+    for shrunk in results['failures']:
+        print(shrunk['reproducer'])
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import data_processing as dp
+from benchmark_index import BenchmarkIndex
+from dmoxml import D1A_COLUMNS
+from ruleset import get_ruleset
+
+STORE_DIR = os.path.join("data", "store")
+
+# Dictionary-encoded text columns (int32 codes, -1 for missing)
+TEXT_COLUMNS = ["INSTRUMENT_TYPE", "MATURITY_BRACKET", "INSTRUMENT_NAME", "DIVIDEND_DATES"]
+# Date columns stored as int32 days since 1970-01-01 (NAT_DAY for missing)
+DATE_COLUMNS = ["REDEMPTION_DATE", "FIRST_ISSUE_DATE", "CURRENT_EX_DIV_DATE"]
+FLOAT_COLUMNS = ["TOTAL_AMOUNT_IN_ISSUE", "TOTAL_AMOUNT_INCLUDING_IL_UPLIFT", "BASE_RPI_87"]
+
+NAT_DAY = np.iinfo(np.int32).min
+UNSEEN = -2  # Code of a string not in the dictionary, when encoding must not add it
+
+# Binary column files, one entry per stored gilt version. Alongside these the store keeps
+# MANIFEST_ISIN (ISIN codes of each snapshot in D1A order), SNAPSHOT_DATE and SNAPSHOT_END
+# (one entry per snapshot, the end offset of its manifest).
+ROW_DTYPES = {
+    "VALID_FROM": np.int32,
+    "ISIN_CODE": np.int32,
+    **{col: np.int32 for col in TEXT_COLUMNS},
+    **{col: np.int32 for col in DATE_COLUMNS},
+    **{col: np.float64 for col in FLOAT_COLUMNS},
+}
+
+
+def _encode_days(values):
+    """Convert datetime-like values to int32 days since epoch, NaT -> NAT_DAY."""
+    days = np.asarray(pd.to_datetime(values)).astype('datetime64[D]')
+    out = days.astype(np.int64)
+    out[np.isnat(days)] = NAT_DAY
+    return out.astype(np.int32)
+
+
+def _decode_days(days):
+    """Inverse of _encode_days, returning datetime64[s] (NaT where missing)."""
+    out = days.astype(np.int64).astype('datetime64[D]')
+    out[days == NAT_DAY] = np.datetime64('NaT', 'D')
+    return out.astype('datetime64[s]')
+
+
+class GiltStore:
+    """
+    Append-only history of D1A snapshots keyed by close-of-business date.
+
+    Each column lives in its own flat binary file under the store directory and is
+    read back with np.memmap, so opening the store does not parse anything. A gilt
+    is only written again when one of its fields changes between snapshots; every
+    snapshot keeps a manifest (the ISINs in issue, in D1A order) so the full gilt
+    universe for any date can be rebuilt from the latest version of each ISIN.
+
+    Text columns are dictionary-encoded; the dictionaries and row counts live in
+    meta.json, which is replaced atomically after the column files are appended.
+    Anything beyond the counts in meta.json (e.g. from an interrupted append) is
+    ignored and truncated on the next append.
+    """
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self._index_cache = {}
+        os.makedirs(path, exist_ok=True)
+        self._load_meta()
+
+    # ---- Storage ----
+    def _load_meta(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as file:
+                self.meta = json.load(file)
+        else:
+            self.meta = {
+                "rows": 0,
+                "manifest": 0,
+                "snapshots": 0,
+                "dictionaries": {col: [] for col in ["ISIN_CODE"] + TEXT_COLUMNS},
+            }
+        self._lookups = {col: {value: code for code, value in enumerate(values)}
+                         for col, values in self.meta["dictionaries"].items()}
+
+    def _save_meta(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.meta, file)
+        os.replace(tmp_path, meta_path)
+
+    def _column(self, name, dtype, count):
+        """Memory-map the first count entries of a column file (read-only)."""
+        file_path = os.path.join(self.path, f"{name}.bin")
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=(count,))
+
+    def _append(self, name, dtype, count, values):
+        """Append values to a column file after dropping anything past the committed count."""
+        file_path = os.path.join(self.path, f"{name}.bin")
+        with open(file_path, "ab") as file:
+            file.truncate(count * np.dtype(dtype).itemsize)
+            file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+    def _encode(self, col, values, add=True):
+        """Dictionary-encode strings, adding unseen values to the dictionary (or coding them UNSEEN if not add)."""
+        lookup = self._lookups[col]
+        dictionary = self.meta["dictionaries"][col]
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if pd.isna(value):
+                codes[i] = -1
+                continue
+            code = lookup.get(value)
+            if code is None:
+                if not add:
+                    codes[i] = UNSEEN
+                    continue
+                code = lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes[i] = code
+        return codes
+
+    def _encode_frame(self, df, add=True):
+        """The stored columns of a D1A report (VALID_FROM aside), encoded as by _encode."""
+        return {
+            "ISIN_CODE": self._encode("ISIN_CODE", df["ISIN_CODE"].values, add),
+            **{col: self._encode(col, df[col].values, add) for col in TEXT_COLUMNS},
+            **{col: _encode_days(df[col].values) for col in DATE_COLUMNS},
+            **{col: pd.to_numeric(df[col], errors="coerce").values.astype(np.float64) for col in FLOAT_COLUMNS},
+        }
+
+    def rows(self):
+        """Return all stored gilt versions as a dict of memory-mapped column arrays."""
+        return {name: self._column(name, dtype, self.meta["rows"]) for name, dtype in ROW_DTYPES.items()}
+
+    # ---- Snapshots ----
+    def snapshot_dates(self):
+        """
+        Returns:
+            pd.DatetimeIndex: Close-of-business dates held in the store, in ascending order.
+        """
+        days = self._column("SNAPSHOT_DATE", np.int32, self.meta["snapshots"])
+        return pd.DatetimeIndex(_decode_days(np.asarray(days)))
+
+    def _snapshot_position(self, date):
+        """Position of the latest snapshot on or before date, or -1 if there is none."""
+        days = self._column("SNAPSHOT_DATE", np.int32, self.meta["snapshots"])
+        return int(np.searchsorted(days, _encode_days([date])[0], side="right")) - 1
+
+    def append_snapshot(self, df):
+        """
+        Add one D1A snapshot to the store. Only gilts that are new or have a changed
+        field since their last stored version are written.
+
+        Parameters:
+            df (pd.DataFrame): A single D1A report, as returned by dmoxml.process_dmo_xml().
+
+        Returns:
+            int: Number of gilt versions written (0 if every gilt was unchanged).
+
+        Raises:
+            ValueError: If df spans several close-of-business dates, or is older than the
+                latest snapshot already in the store (the store is append-only).
+        """
+        cob_dates = pd.to_datetime(df["CLOSE_OF_BUSINESS_DATE"]).dropna().unique()
+        if len(cob_dates) != 1:
+            raise ValueError(f"Expected a single CLOSE_OF_BUSINESS_DATE, found {len(cob_dates)}")
+        cob_day = _encode_days(cob_dates)[0]
+
+        # Checked before encoding, so a rejected report leaves the dictionaries untouched
+        snapshot_days = self._column("SNAPSHOT_DATE", np.int32, self.meta["snapshots"])
+        if len(snapshot_days) and cob_day <= snapshot_days[-1]:
+            if cob_day == snapshot_days[-1]:
+                same = self._encode_frame(df, add=False)
+                if np.array_equal(self._manifest(-1), same["ISIN_CODE"]) and not self._changed(same).any():
+                    return 0  # Re-running the same report is a no-op
+            raise ValueError(f"Snapshot {pd.Timestamp(cob_dates[0]).date()} is not newer than the latest "
+                             f"snapshot in the store; the store is append-only")
+
+        new = self._encode_frame(df)
+        changed = self._changed(new)
+        new["VALID_FROM"] = np.full(len(df), cob_day, dtype=np.int32)
+
+        meta = self.meta
+        for name, dtype in ROW_DTYPES.items():
+            self._append(name, dtype, meta["rows"], new[name][changed])
+        self._append("MANIFEST_ISIN", np.int32, meta["manifest"], new["ISIN_CODE"])
+        self._append("SNAPSHOT_DATE", np.int32, meta["snapshots"], [cob_day])
+        self._append("SNAPSHOT_END", np.int64, meta["snapshots"], [meta["manifest"] + len(df)])
+
+        meta["rows"] += int(changed.sum())
+        meta["manifest"] += len(df)
+        meta["snapshots"] += 1
+        self._save_meta()
+        return int(changed.sum())
+
+    def append_batches(self, batches):
+        """
+        Append snapshots from a stream of D1A batches, such as dmoxml.iter_dmo_xml() over an
+        archive of daily reports. A batch may hold part of a report or span several reports;
+        rows are regrouped by close-of-business date, so at most one report is held in memory.
+
+        Parameters:
+            batches (iterable of pd.DataFrame): D1A batches in close-of-business date order.
+
+        Returns:
+            int: Number of gilt versions written.
+        """
+        written = 0
+        pending, pending_date = [], None
+        for batch in batches:
+            for cob_date, group in batch.groupby("CLOSE_OF_BUSINESS_DATE", sort=False, observed=True):
+                if pending and cob_date != pending_date:
+                    written += self.append_snapshot(pd.concat(pending, ignore_index=True))
+                    pending = []
+                pending.append(group)
+                pending_date = cob_date
+        if pending:
+            written += self.append_snapshot(pd.concat(pending, ignore_index=True))
+        return written
+
+    def _manifest(self, position):
+        """ISIN codes of the snapshot at position, in D1A order."""
+        ends = self._column("SNAPSHOT_END", np.int64, self.meta["snapshots"])
+        position = position % len(ends)
+        start = ends[position - 1] if position > 0 else 0
+        return self._column("MANIFEST_ISIN", np.int32, self.meta["manifest"])[start:ends[position]]
+
+    def _latest_rows(self, count):
+        """For every ISIN code, the position of its latest version among the first count rows (-1 if none)."""
+        isin = np.asarray(self._column("ISIN_CODE", np.int32, self.meta["rows"])[:count])
+        latest = np.full(len(self.meta["dictionaries"]["ISIN_CODE"]), -1, dtype=np.int64)
+        codes, first_reversed = np.unique(isin[::-1], return_index=True)
+        latest[codes] = count - 1 - first_reversed
+        return latest
+
+    def _changed(self, new):
+        """Boolean mask of the rows in new that differ from (or have no) stored version."""
+        rows = self.rows()
+        latest = self._latest_rows(self.meta["rows"])[new["ISIN_CODE"]]
+        changed = latest < 0
+        existing = np.where(changed, 0, latest)
+        if self.meta["rows"] == 0:
+            return changed
+
+        for col in TEXT_COLUMNS + DATE_COLUMNS:
+            changed |= rows[col][existing] != new[col]
+        for col in FLOAT_COLUMNS:
+            old, value = rows[col][existing], new[col]
+            changed |= ~((old == value) | (np.isnan(old) & np.isnan(value)))
+        return changed
+
+    # ---- As-of Queries ----
+    def as_of(self, date):
+        """
+        Return the gilt universe as published in the latest snapshot on or before date.
+
+        Parameters:
+            date (str | pd.Timestamp): The as-of date.
+
+        Returns:
+            pd.DataFrame or None: D1A-shaped DataFrame (same columns and dtypes as
+            dmoxml.load_df_from_csv), or None if date is before the first snapshot.
+        """
+        position = self._snapshot_position(date)
+        if position < 0:
+            return None
+
+        snapshot_day = self._column("SNAPSHOT_DATE", np.int32, self.meta["snapshots"])[position]
+        manifest = self._manifest(position)
+
+        # Versions are stored in date order, so those visible at this snapshot are a prefix
+        valid_from = self._column("VALID_FROM", np.int32, self.meta["rows"])
+        visible = int(np.searchsorted(valid_from, snapshot_day, side="right"))
+        selected = self._latest_rows(visible)[manifest]
+
+        rows = self.rows()
+        dictionaries = self.meta["dictionaries"]
+        data = {"CLOSE_OF_BUSINESS_DATE": _decode_days(np.full(len(selected), snapshot_day, dtype=np.int32))}
+        for col in ["ISIN_CODE"] + TEXT_COLUMNS:
+            values = np.array(dictionaries[col] + [np.nan], dtype=object)
+            data[col] = values[rows[col][selected]]  # code -1 picks the trailing NaN
+        for col in DATE_COLUMNS:
+            data[col] = _decode_days(rows[col][selected])
+        for col in FLOAT_COLUMNS:
+            data[col] = np.array(rows[col][selected])
+        return pd.DataFrame(data)[D1A_COLUMNS]
+
+    def index_as_of(self, date, ruleset=None):
+        """
+        Return a BenchmarkIndex over the conventional gilts in issue as of date.
+        Unless the ruleset sets as_of, its exclusions are those in force on the snapshot's
+        close-of-business date (see Ruleset.for_data). Indexes are cached per snapshot and
+        ruleset, so repeated queries do not rebuild them.
+
+        Parameters:
+            date (str | pd.Timestamp): The as-of date.
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+        Returns:
+            BenchmarkIndex or None: None if date is before the first snapshot.
+        """
+        position = self._snapshot_position(date)
+        if position < 0:
+            return None
+        ruleset = get_ruleset(ruleset)
+        # The snapshot fixes the close-of-business date the exclusions are evaluated at, so the
+        # position and the ruleset decide the index and the cache grows with snapshots, not query dates
+        key = (position, ruleset.fingerprint)
+        if key not in self._index_cache:
+            df = dp.filter_conventional_gilts(self.as_of(date))
+            self._index_cache[key] = BenchmarkIndex.from_dataframe(df, ruleset)
+        return self._index_cache[key]
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+from benchmark_index import BenchmarkIndex, NO_BENCHMARK
+from ruleset import get_ruleset
+
+_END_OF_TIME = np.datetime64('9999-12-31', 'D')
+
+
+class IncrementalBenchmarks:
+    """
+    Maturity -> benchmark map that is kept up to date as single gilts change.
+
+    The map is held as intervals (start date, benchmark gilt id, rule), as in
+    BenchmarkIndex.cliff_edges(). A gilt maturing in year Y only influences maturities in
+    year Y (R7.4(a)/(c)) and in the years after Y up to the next year with an appropriate
+    benchmark (R7.4(b)), so a change only recomputes that span and splices it in.
+
+    Changes that leave the gilt's appropriate-benchmark status alone (e.g. a tap that keeps
+    it under the benchmark size) cannot change any benchmark and return straight away.
+    Otherwise the gilt is spliced into (or out of) the BenchmarkIndex in place.
+    """
+
+    def __init__(self, df, ruleset=None):
+        """
+        Parameters:
+            df (pd.DataFrame): Conventional gilts with 'ISIN_CODE', 'REDEMPTION_DATE' and 'TOTAL_AMOUNT_IN_ISSUE'.
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+        """
+        self.ruleset = get_ruleset(ruleset).for_data(df)
+        self.isins = df['ISIN_CODE'].to_numpy(dtype=object)
+        self.dates = np.asarray(df['REDEMPTION_DATE'].values, dtype='datetime64[D]')
+        self.amounts = df['TOTAL_AMOUNT_IN_ISSUE'].to_numpy(dtype=np.float64).copy()
+        self.appropriate = self.ruleset.is_appropriate(self.isins)
+        self.positions = {isin: i for i, isin in enumerate(self.isins)}
+
+        ab = self._is_ab()
+        self.index = BenchmarkIndex(self.dates[ab], np.flatnonzero(ab), self.ruleset)
+        edges = self.index.cliff_edges()
+        self.starts = edges.starts
+        self.ids = self._gilt_ids(self.index, edges.positions)
+        self.rules = edges.rules
+
+    def _is_ab(self):
+        return self.ruleset.is_benchmark(self.amounts) & self.appropriate & ~np.isnat(self.dates)
+
+    def _gilt_is_ab(self, gilt):
+        """_is_ab() for one gilt."""
+        return bool(self.ruleset.is_benchmark(self.amounts[gilt]) and self.appropriate[gilt]
+                    and not np.isnat(self.dates[gilt]))
+
+    @staticmethod
+    def _gilt_ids(index, positions):
+        """Map positions in index.dates to gilt ids (-1 for no benchmark)."""
+        return np.append(index.isins, -1).astype(np.int64)[positions]
+
+    # ---- Queries ----
+    def resolve_many(self, maturities):
+        """
+        Parameters:
+            maturities (array-like): New issue maturity dates.
+
+        Returns:
+            np.ndarray: Gilt id of the benchmark for each maturity (-1 if none).
+        """
+        m = np.asarray(pd.to_datetime(np.asarray(maturities).ravel())).astype('datetime64[D]')
+        i = np.searchsorted(self.starts, m, side='right') - 1
+        i[np.isnat(m)] = -1
+        return np.append(self.ids, -1)[i]
+
+    def lookup(self, maturity):
+        """
+        Returns:
+            pd.Timestamp or None: The Redemption_Date of the ICMA Benchmark, if found.
+        """
+        gilt = self.resolve_many([maturity])[0]
+        return None if gilt < 0 else pd.Timestamp(self.dates[gilt])
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: The current intervals with columns 'START', 'END', 'BENCHMARK_ISIN' and
+            'BENCHMARK_REDEMPTION_DATE', as in CliffEdgeMap.to_frame().
+        """
+        ends = np.empty_like(self.starts)
+        ends[:-1] = self.starts[1:] - 1
+        ends[-1:] = np.datetime64('NaT', 'D')
+        return pd.DataFrame({
+            'START': self.starts.astype('datetime64[s]'),
+            'END': ends.astype('datetime64[s]'),
+            'BENCHMARK_ISIN': np.append(self.isins, None)[self.ids],
+            'BENCHMARK_REDEMPTION_DATE': np.append(self.dates, np.datetime64('NaT', 'D'))[self.ids].astype('datetime64[s]'),
+        })
+
+    # ---- Updates ----
+    def set_amount(self, isin, amount):
+        """
+        Update a gilt's TOTAL_AMOUNT_IN_ISSUE (e.g. after an auction).
+
+        Returns:
+            pd.DataFrame: Changed maturity ranges, see _diff().
+        """
+        gilt = self._position(isin)
+        was_ab = self._gilt_is_ab(gilt)
+        self.amounts[gilt] = amount
+        return self._update(gilt, was_ab)
+
+    def set_appropriate(self, isin, appropriate):
+        """
+        Add a gilt to (appropriate=False) or remove it from the exclusion list.
+
+        Returns:
+            pd.DataFrame: Changed maturity ranges, see _diff().
+        """
+        gilt = self._position(isin)
+        was_ab = self._gilt_is_ab(gilt)
+        self.appropriate[gilt] = appropriate
+        return self._update(gilt, was_ab)
+
+    def _position(self, isin):
+        if isin not in self.positions:
+            raise ValueError(f"Unknown ISIN: {isin}")
+        return self.positions[isin]
+
+    def _update(self, gilt, was_ab):
+        if self._gilt_is_ab(gilt) == was_ab:
+            return self._diff([], [], [], [])
+        if was_ab:
+            self.index.remove(self.dates[gilt], gilt)
+        else:
+            self.index.insert(self.dates[gilt], gilt)
+
+        # Affected maturities: the gilt's calendar year up to the next year with another AB
+        dates = self.index.dates
+        lo = self.dates[gilt].astype('datetime64[Y]').astype('datetime64[D]')
+        next_year = (self.dates[gilt].astype('datetime64[Y]') + 1).astype('datetime64[D]')
+        later = np.searchsorted(dates, next_year, side='left')
+        hi = dates[later].astype('datetime64[Y]').astype('datetime64[D]') if later < len(dates) else _END_OF_TIME
+
+        # Re-derive the intervals inside [lo, hi) from the ABs in that span only
+        d = dates[np.searchsorted(dates, lo, side='left'):np.searchsorted(dates, hi, side='left')]
+        months = d.astype('datetime64[M]')
+        candidates = np.unique(np.concatenate([
+            [lo, next_year], d, d + 1, months.astype('datetime64[D]'), (months + 1).astype('datetime64[D]'),
+        ]))
+        candidates = candidates[(candidates >= lo) & (candidates < hi)]
+        positions, rules = self.index._resolve_days(candidates)
+        ids = self._gilt_ids(self.index, positions)
+
+        # Splice: old intervals before lo, new ones in [lo, hi), then the old value resumes at hi
+        old_starts, old_ids, old_rules = self.starts, self.ids, self.rules
+        before, after = old_starts < lo, old_starts >= hi
+        resume = np.searchsorted(old_starts, hi, side='right') - 1
+        tail_starts, tail_ids, tail_rules = old_starts[after], old_ids[after], old_rules[after]
+        if hi < _END_OF_TIME and (not len(tail_starts) or tail_starts[0] != hi):
+            tail_starts = np.concatenate([[hi], tail_starts])
+            tail_ids = np.concatenate([[old_ids[resume] if resume >= 0 else -1], tail_ids])
+            tail_rules = np.concatenate([[old_rules[resume] if resume >= 0 else NO_BENCHMARK], tail_rules])
+
+        starts = np.concatenate([old_starts[before], candidates, tail_starts])
+        new_ids = np.concatenate([old_ids[before], ids, tail_ids])
+        new_rules = np.concatenate([old_rules[before], rules, tail_rules]).astype(np.int8)
+
+        # As in cliff_edges(), the map starts on 1 January of the first AB's year (maturities
+        # before the first interval have no benchmark), and equal neighbours are merged
+        first = dates[0].astype('datetime64[Y]').astype('datetime64[D]') if len(dates) else _END_OF_TIME
+        in_map = starts >= first
+        starts, new_ids, new_rules = starts[in_map], new_ids[in_map], new_rules[in_map]
+        keep = np.ones(len(starts), dtype=bool)
+        keep[1:] = (new_ids[1:] != new_ids[:-1]) | (new_rules[1:] != new_rules[:-1])
+        self.starts, self.ids, self.rules = starts[keep], new_ids[keep], new_rules[keep]
+
+        return self._diff(*self._changed_ranges(old_starts, old_ids, lo, hi))
+
+    def _changed_ranges(self, old_starts, old_ids, lo, hi):
+        """Compare the old and new maps on [lo, hi) and return the ranges that differ."""
+        in_range = lambda s: s[(s >= lo) & (s < hi)]
+        points = np.unique(np.concatenate([[lo], in_range(old_starts), in_range(self.starts)]))
+        ends = np.append(points[1:], hi) - 1
+
+        def value(starts, ids):
+            i = np.searchsorted(starts, points, side='right') - 1
+            return np.append(ids, -1)[i]
+
+        old, new = value(old_starts, old_ids), value(self.starts, self.ids)
+        changed = old != new
+        # Merge neighbouring ranges with the same (old, new) pair
+        first = changed.copy()
+        first[1:] &= ~(changed[:-1] & (old[1:] == old[:-1]) & (new[1:] == new[:-1]))
+        group = np.cumsum(first)[changed] - 1
+        starts = points[first]
+        last = np.zeros(len(starts), dtype=int)
+        last[group] = np.flatnonzero(changed)
+        return starts, ends[last], old[first], new[first]
+
+    def _diff(self, starts, ends, old_ids, new_ids):
+        """
+        Returns:
+            pd.DataFrame: One row per changed maturity range with columns 'START', 'END'
+            (inclusive, NaT if open-ended), 'OLD_ISIN', 'OLD_REDEMPTION_DATE', 'NEW_ISIN'
+            and 'NEW_REDEMPTION_DATE'.
+        """
+        isins = np.append(self.isins, None)
+        dates = np.append(self.dates, np.datetime64('NaT', 'D'))
+        ends = np.asarray(ends, dtype='datetime64[D]')
+        ends = np.where(ends >= _END_OF_TIME - 1, np.datetime64('NaT', 'D'), ends)
+        old_ids, new_ids = np.asarray(old_ids, dtype=np.int64), np.asarray(new_ids, dtype=np.int64)
+        return pd.DataFrame({
+            'START': np.asarray(starts, dtype='datetime64[D]').astype('datetime64[s]'),
+            'END': ends.astype('datetime64[s]'),
+            'OLD_ISIN': isins[old_ids],
+            'OLD_REDEMPTION_DATE': dates[old_ids].astype('datetime64[s]'),
+            'NEW_ISIN': isins[new_ids],
+            'NEW_REDEMPTION_DATE': dates[new_ids].astype('datetime64[s]'),
+        })
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from benchmark_index import RULE_NAMES, _to_day
+from ruleset import get_ruleset
+from universe import GiltUniverse
+
+# The light core: resolving benchmarks from a cached universe only needs numpy and the
+# stdlib. pandas (ingestion), requests (fetching) and matplotlib (plotting) are imported
+# only when the cache has to be rebuilt or by the modules that need them.
+DATA_DIR = "data"
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# Bump whenever GiltUniverse's fields change, so caches written by older code are not reused
+UNIVERSE_VERSION = 2
+
+
+def _file_hash(file_path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_universe(xml_file_path=None, use_cache=True, ruleset=None):
+    """
+    Load the conventional gilts as a GiltUniverse.
+
+    The universe is cached under data/cache, keyed on the XML content hash, the ruleset
+    fingerprint and UNIVERSE_VERSION. A cache hit is read with numpy alone; on a miss the
+    XML is parsed with data_processing (which imports pandas) and the cache is written for
+    next time.
+
+    Parameters:
+        xml_file_path (str): Optional path to the XML file. Defaults to the standard location.
+        use_cache (bool): Set False to always re-parse the XML.
+        ruleset (Ruleset | str): Ruleset (or path to a JSON ruleset); defaults to DEFAULT_RULESET.
+
+    Returns:
+        GiltUniverse or None: None if the XML file cannot be read.
+    """
+    if xml_file_path is None:
+        xml_file_path = os.path.join(DATA_DIR, "dmo_data.xml")
+    if not os.path.exists(xml_file_path):
+        print(f"XML file not found at {xml_file_path}. Please fetch or manually download the file.")
+        return None
+
+    # Dated exclusions without an as_of are evaluated at the file's close-of-business date, which
+    # the content hash already pins down, so the key needs no date of its own
+    ruleset = get_ruleset(ruleset)
+    cache_path = os.path.join(CACHE_DIR, f"universe-{_file_hash(xml_file_path)[:32]}-{ruleset.fingerprint}"
+                                         f"-v{UNIVERSE_VERSION}.npz")
+    if use_cache and os.path.exists(cache_path):
+        try:
+            return GiltUniverse.load(cache_path)[0]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable cache file {cache_path}: {e}")
+
+    import data_processing as dp
+
+    df = dp.load_conventional_gilts(xml_file_path, use_cache)
+    if df is None:
+        return None
+    universe = GiltUniverse.from_dataframe(df, ruleset)
+    if use_cache:
+        universe.save(cache_path)
+    return universe
+
+
+def lookup(universe, maturities):
+    """
+    Resolve the ICMA benchmark for a few maturities, without pandas.
+
+    Parameters:
+        universe (GiltUniverse): Conventional gilts, e.g. from load_universe().
+        maturities (list): New issue maturity dates ('YYYY-MM-DD' strings need no pandas).
+
+    Returns:
+        list of dict: One per maturity with 'maturity', 'benchmark_redemption_date',
+        'benchmark_isin' and 'rule' (None/'None' if no benchmark is found).
+    """
+    index = universe.benchmark_index()
+    results = []
+    for maturity in maturities:
+        day = _to_day(maturity)
+        position, rule = index.resolve(day)
+        found = position >= 0
+        results.append({
+            'maturity': str(day),
+            'benchmark_redemption_date': str(index.dates[position]) if found else None,
+            'benchmark_isin': str(index.isins[position]) if found else None,
+            'rule': RULE_NAMES[rule],
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up ICMA benchmarks for new issue maturities.")
+    parser.add_argument("maturities", nargs="+", help="New issue maturities, e.g. 2030-01-07.")
+    parser.add_argument("--xml", default=None, help="D1A XML file (default data/dmo_data.xml).")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per maturity.")
+    parser.add_argument("--ruleset", default=None, help="JSON ruleset (default: the Dec 2023 Handbook rules).")
+    args = parser.parse_args(argv)
+
+    universe = load_universe(args.xml, ruleset=args.ruleset)
+    if universe is None:
+        return 1
+    for result in lookup(universe, args.maturities):
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(result['maturity'], result['benchmark_redemption_date'], result['benchmark_isin'], result['rule'])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
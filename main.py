@@ -1,6 +1,5 @@
 import data_processing as dp
 import rules_engine as re
-import visualisation as vis
 from rules_engine import get_icma_benchmark
 
 
@@ -13,8 +12,10 @@ def main():
 
     nim = '2030-01-07' # New Issue Maturity
     print('Test get_icma_benchmark')
-    print(get_icma_benchmark(df, nim))
-    df = re.apply_rules(df, nim)
+    print(get_icma_benchmark(df, nim, verbose=True))
+    df = re.apply_rules(df, nim, verbose=True)
+
+    import visualisation as vis  # matplotlib is only needed for the chart
 
     vis.show_gilts(df, nim)
 
@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import data_processing as dp
+from benchmark_index import BenchmarkIndex
+
+
+# ---- Readers and Writers ----
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def _pyarrow():
+    """Import pyarrow, which is only needed for Parquet files. Returns (pyarrow, pyarrow.parquet)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet files need pyarrow: pip install pyarrow")
+    return pa, pq
+
+
+def read_chunks(path, chunk_size, dtype=None):
+    """
+    Yield the rows of a CSV or Parquet file as DataFrames of at most chunk_size rows.
+
+    Parameters:
+        path (str): Input file; '.parquet'/'.pq' files are read as Parquet, anything else as CSV.
+        chunk_size (int): Rows per chunk.
+        dtype (type): For CSV files, read every column as this type (e.g. str) rather than inferring
+            it per chunk.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the file.
+    """
+    if _is_parquet(path):
+        for batch in _pyarrow()[1].ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+
+
+RESULT_COLUMNS = ['BENCHMARK_REDEMPTION_DATE', 'BENCHMARK_ISIN', 'RULE']
+
+
+def output_schema(input_path):
+    """
+    The pyarrow schema of a resolved Parquet file, declared up front rather than inferred from
+    the first chunk (where e.g. a column of no benchmarks would come out as the null type).
+
+    Parameters:
+        input_path (str): CSV or Parquet input file. CSV columns are strings, as resolve_file
+            reads them as text when writing Parquet.
+
+    Returns:
+        pa.Schema: The input columns then BENCHMARK_REDEMPTION_DATE (timestamp[s]),
+        BENCHMARK_ISIN and RULE (strings).
+    """
+    pa, pq = _pyarrow()
+    if _is_parquet(input_path):
+        schema = pq.ParquetFile(input_path).schema_arrow
+        index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+        fields = [field for field in schema if field.name not in index_columns]
+    else:
+        fields = [pa.field(name, pa.string()) for name in pd.read_csv(input_path, nrows=0).columns]
+    fields = [field for field in fields if field.name not in RESULT_COLUMNS]
+    return pa.schema(fields + [pa.field('BENCHMARK_REDEMPTION_DATE', pa.timestamp('s')),
+                               pa.field('BENCHMARK_ISIN', pa.string()), pa.field('RULE', pa.string())])
+
+
+class ChunkWriter:
+    """Append result chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path, schema=None):
+        """
+        Parameters:
+            path (str): Output file; '.parquet'/'.pq' files are written as Parquet, anything else as CSV.
+            schema (pa.Schema): Schema of a Parquet file (see output_schema). The file is created
+                here, so it exists with this schema even if no chunk arrives.
+        """
+        self.path = path
+        self.schema = schema
+        self._parquet_writer = None
+        self._first = True
+        if _is_parquet(path):
+            if schema is None:
+                raise ValueError("Parquet output needs a schema: see output_schema")
+            self._parquet_writer = _pyarrow()[1].ParquetWriter(path, schema)
+
+    def write(self, chunk):
+        if self._parquet_writer is not None:
+            pa, _ = _pyarrow()
+            self._parquet_writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+        else:
+            chunk.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+# ---- Resolution ----
+# Set once per worker process by _init_worker
+_worker_index = None
+_worker_column = None
+_worker_date_format = None
+
+
+def _init_worker(index, column, date_format):
+    global _worker_index, _worker_column, _worker_date_format
+    _worker_index, _worker_column, _worker_date_format = index, column, date_format
+
+
+def _resolve_chunk(chunk):
+    """Add the benchmark columns to one chunk, using the worker's shared index."""
+    maturities = pd.to_datetime(chunk[_worker_column], errors='coerce', format=_worker_date_format)
+    result = _worker_index.lookup_many(maturities.values)
+    chunk['BENCHMARK_REDEMPTION_DATE'] = result['BENCHMARK_REDEMPTION_DATE'].values
+    # Plain strings rather than per-chunk categoricals, so every chunk has the same output schema
+    chunk['BENCHMARK_ISIN'] = result['BENCHMARK_ISIN'].astype(object).values
+    chunk['RULE'] = result['RULE'].astype(object).values
+    return chunk
+
+
+def _ordered_map(executor, chunks, max_pending):
+    """executor.map over chunks, in order, with at most max_pending chunks in flight."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_resolve_chunk, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def resolve_file(input_path, output_path, index, maturity_column='MATURITY', date_format='ISO8601',
+                 chunk_size=100_000, processes=1, progress=sys.stderr):
+    """
+    Stream a pipeline file through the benchmark index, chunk by chunk.
+
+    Every input column is kept and BENCHMARK_REDEMPTION_DATE, BENCHMARK_ISIN and RULE are
+    added. Unparseable maturities get no benchmark (RULE 'None'). At most a few chunks per
+    process are held at once, so memory does not grow with the size of the input.
+
+    Parameters:
+        input_path (str): CSV or Parquet file of candidate new issues.
+        output_path (str): CSV or Parquet file to write.
+        index (BenchmarkIndex): Prebuilt index, shared by every chunk (and shipped once to each worker).
+        maturity_column (str): Name of the new issue maturity column.
+        date_format (str): strftime format of the maturities, 'ISO8601', or None to infer per chunk.
+        chunk_size (int): Rows per chunk.
+        processes (int): Worker processes; 1 resolves in-process.
+        progress (file): Where progress lines go (None for silence).
+
+    Returns:
+        int: Number of rows written.
+    """
+    index._day_table()  # build once here rather than in every worker
+    if _is_parquet(output_path):
+        # CSV columns are read as text, so their Parquet types do not depend on what each chunk holds
+        writer, dtype = ChunkWriter(output_path, output_schema(input_path)), str
+    else:
+        writer, dtype = ChunkWriter(output_path), None
+    rows, start = 0, time.perf_counter()
+    chunks = read_chunks(input_path, chunk_size, dtype)
+
+    if processes == 1:
+        _init_worker(index, maturity_column, date_format)
+        executor, results = None, map(_resolve_chunk, chunks)
+    else:
+        executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(index, maturity_column, date_format))
+        results = _ordered_map(executor, chunks, 2 * processes)
+
+    try:
+        for chunk in results:
+            writer.write(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                print(f"{rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)", file=progress)
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve ICMA benchmarks for every row of a pipeline file.")
+    parser.add_argument("input", help="CSV or Parquet file with a maturity column.")
+    parser.add_argument("output", help="CSV or Parquet file to write (chosen by extension).")
+    parser.add_argument("--maturity-column", default="MATURITY")
+    parser.add_argument("--date-format", default="ISO8601", help="Maturity format, e.g. %%d/%%m/%%Y.")
+    parser.add_argument("--xml", default=None, help="D1A XML file (default data/dmo_data.xml).")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (0 for one per CPU).")
+    parser.add_argument("--ruleset", default=None, help="JSON ruleset (default: the Dec 2023 Handbook rules).")
+    args = parser.parse_args(argv)
+
+    df = dp.load_conventional_gilts(args.xml)
+    if df is None:
+        return 1
+    index = BenchmarkIndex.from_dataframe(df, args.ruleset)
+
+    try:
+        start = time.perf_counter()
+        rows = resolve_file(args.input, args.output, index, args.maturity_column, args.date_format,
+                            args.chunk_size, args.processes or os.cpu_count())
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error resolving {args.input}: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows:,} rows to {args.output} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import os
+import tempfile
+import numpy as np
+from benchmark_index import BenchmarkIndex, NO_BENCHMARK, RULE_NAMES, _to_days
+from universe import GiltUniverse
+
+# Benchmarks depend only on the universe, the ruleset and the maturity, so repeated sweeps
+# of the same D1A snapshot are kept on disk and only maturities not seen before are
+# resolved. Like the universe cache, reading it needs numpy alone.
+RESULT_DIR = os.path.join("data", "cache", "results")
+
+# Bump whenever the stored layout changes, so files written by older code are not reused
+RESULT_VERSION = 1
+
+UNKNOWN = -1  # Rule code of a day not resolved yet
+
+
+def _universe(universe, ruleset=None):
+    """universe as a GiltUniverse with its R7.3 flags set by ruleset (by default a universe keeps its own)."""
+    if not isinstance(universe, GiltUniverse):
+        return GiltUniverse.from_dataframe(universe, ruleset)
+    if ruleset is not None and ruleset != universe.ruleset:
+        return universe.with_ruleset(ruleset)
+    return universe
+
+
+class ResultCache:
+    """
+    On-disk memo of benchmark sweeps.
+
+    Each (universe fingerprint, ruleset fingerprint) pair has one .npz file of dense daily
+    columns over the span of maturities resolved so far: the benchmark row id into the
+    universe and the rule code for every day from first_day, with rule UNKNOWN on days
+    not resolved yet. A sweep resolves only its unknown days, so extending a grid computes
+    just the new dates, and writes the widened columns back. Once the files total more
+    than max_bytes the least recently used are deleted.
+
+        cache = ResultCache()
+        rows, rules = cache.resolve(universe, maturities)
+        report = cache.coverage(universe, maturities)
+    """
+
+    def __init__(self, path=RESULT_DIR, max_bytes=64 << 20):
+        """
+        Parameters:
+            path (str): Directory of the cache files.
+            max_bytes (int): Size the cache is trimmed to after each write.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0  # Maturities served from the cache
+        self.misses = 0  # Maturities resolved
+
+    def _entry_path(self, universe):
+        return os.path.join(self.path, f"results-{universe.fingerprint}-{universe.ruleset.fingerprint}"
+                                       f"-v{RESULT_VERSION}.npz")
+
+    def _load(self, path):
+        """
+        (first day ordinal, rows, rules) from a cache file, or None if there is no usable file.
+        An unreadable file is treated as missing: the sweep recomputes and its write replaces it.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return int(data['first_day']), data['rows'], data['rules']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, path, first_day, rows, rules):
+        os.makedirs(self.path, exist_ok=True)
+        # A temporary file of its own per writer, so concurrent sweeps never write into the same file
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".results-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, first_day=first_day, rows=rows, rules=rules)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        """Delete the least recently used files (never keep) until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.startswith("results-") and name.endswith(".npz"):
+                file_path = os.path.join(self.path, name)
+                stat = os.stat(file_path)
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if file_path != keep:
+                os.remove(file_path)
+                total -= size
+
+    @property
+    def nbytes(self):
+        """Bytes on disk used by the cache files."""
+        if not os.path.isdir(self.path):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path)
+                   if name.startswith("results-") and name.endswith(".npz"))
+
+    def clear(self):
+        """Delete every cache file."""
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                if name.startswith("results-") and name.endswith(".npz"):
+                    os.remove(os.path.join(self.path, name))
+
+    # ---- Lookups ----
+    def resolve(self, universe, maturities, ruleset=None):
+        """
+        Resolve every maturity, from the cache where possible.
+
+        Parameters:
+            universe (GiltUniverse | pd.DataFrame): Conventional gilts.
+            maturities (array-like): New issue maturity dates (NaT is allowed).
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET (or the
+                universe's own ruleset).
+
+        Returns:
+            tuple: (np.ndarray of benchmark row ids into the universe or -1, np.ndarray of rule codes
+            indexing RULE_NAMES), as SweepExecutor.resolve.
+        """
+        universe = _universe(universe, ruleset)
+        days = _to_days(maturities)
+        rows = np.full(len(days), -1, dtype=np.int32)
+        rules = np.full(len(days), NO_BENCHMARK, dtype=np.int8)
+        dated = ~np.isnat(days)
+        ordinals = days[dated].astype(np.int64)
+        if not len(ordinals):
+            return rows, rules
+
+        # Widen the cached span to cover the requested days
+        path = self._entry_path(universe)
+        entry = self._load(path)
+        if entry is None:
+            entry = (int(ordinals.min()), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8))
+        first_day, cached_rows, cached_rules = entry
+        start = min(first_day, int(ordinals.min()))
+        stop = max(first_day + len(cached_rules), int(ordinals.max()) + 1)
+        span_rows = np.full(stop - start, -1, dtype=np.int32)
+        span_rules = np.full(stop - start, UNKNOWN, dtype=np.int8)
+        span_rows[first_day - start:first_day - start + len(cached_rows)] = cached_rows
+        span_rules[first_day - start:first_day - start + len(cached_rules)] = cached_rules
+
+        offsets = ordinals - start
+        unknown = span_rules[offsets] == UNKNOWN
+        self.misses += int(unknown.sum())
+        self.hits += int((~unknown).sum())
+        if unknown.any():
+            missing = np.unique(offsets[unknown])
+            dates, _, ab_rows = universe.appropriate_benchmarks()
+            positions, span_rules[missing] = BenchmarkIndex(dates, ab_rows, universe.ruleset).resolve_many(
+                (missing + start).astype('datetime64[D]'))
+            span_rows[missing] = np.append(ab_rows, -1).astype(np.int32)[positions]
+            self._save(path, start, span_rows, span_rules)
+        else:
+            os.utime(path)  # Most recently used
+
+        rows[dated], rules[dated] = span_rows[offsets], span_rules[offsets]
+        return rows, rules
+
+    def benchmarks(self, universe, maturities, ruleset=None):
+        """
+        Cached equivalent of rules_engine.get_icma_benchmarks.
+
+        Returns:
+            pd.DataFrame: As rules_engine.get_icma_benchmarks.
+        """
+        universe = _universe(universe, ruleset)
+        days = _to_days(maturities)
+        rows, rules = self.resolve(universe, days)
+        return universe.benchmark_frame(days, rows, rules)
+
+    def coverage(self, universe, maturities, ruleset=None):
+        """
+        Parameters:
+            universe (GiltUniverse | pd.DataFrame): Conventional gilts.
+            maturities (array-like): New issue maturity dates, e.g. every day to 2030.
+            ruleset (Ruleset): As for resolve.
+
+        Returns:
+            CoverageReport: Benchmark usage over the maturities.
+        """
+        universe = _universe(universe, ruleset)
+        rows, rules = self.resolve(universe, maturities)
+        return CoverageReport(universe, rows, rules)
+
+
+# ---- Reporting ----
+class CoverageReport:
+    """
+    How a maturity grid uses the gilts (the analysis in tests.py): the share of maturities
+    with no ICMA benchmark, and which gilts are used, i.e. redeem on the redemption date of
+    some maturity's benchmark. Computed from the resolved columns alone; rows line up with
+    the universe (and so with the DataFrame it was built from).
+    """
+
+    def __init__(self, universe, rows, rules):
+        self.universe = universe
+        self.rows = rows
+        self.rules = rules
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def no_benchmark(self):
+        """Number of maturities with no ICMA benchmark."""
+        return int((self.rows < 0).sum())
+
+    @property
+    def no_benchmark_share(self):
+        """Fraction of the maturities with no ICMA benchmark."""
+        return self.no_benchmark / len(self) if len(self) else 0.0
+
+    def rule_counts(self):
+        """
+        Returns:
+            dict: Rule name -> number of maturities it decided.
+        """
+        counts = np.bincount(self.rules, minlength=len(RULE_NAMES))
+        return {name: int(count) for name, count in zip(RULE_NAMES, counts)}
+
+    def benchmark_counts(self):
+        """
+        Returns:
+            np.ndarray: Number of maturities each gilt is the benchmark for.
+        """
+        return np.bincount(self.rows[self.rows >= 0], minlength=len(self.universe))
+
+    @property
+    def used(self):
+        """Boolean mask of the gilts redeeming on a benchmark redemption date."""
+        benchmark_days = self.universe.days[np.unique(self.rows[self.rows >= 0])]
+        return np.isin(self.universe.days, benchmark_days)
+
+    def used_gilts(self):
+        """The used gilts, as a GiltUniverse."""
+        return self.universe[self.used]
+
+    def unused_gilts(self):
+        """The gilts never used, as a GiltUniverse."""
+        return self.universe[~self.used]
+
+    def summary(self):
+        """
+        Returns:
+            dict: 'maturities', 'no_benchmark', 'no_benchmark_share', 'used_gilts', 'unused_gilts'
+            and 'rules' (see rule_counts).
+        """
+        used = self.used
+        return {'maturities': len(self), 'no_benchmark': self.no_benchmark,
+                'no_benchmark_share': self.no_benchmark_share, 'used_gilts': int(used.sum()),
+                'unused_gilts': int((~used).sum()), 'rules': self.rule_counts()}
@@ -1,14 +1,19 @@
+import time
+import numpy as np
 import pandas as pd
+import tracing
+from benchmark_index import BenchmarkIndex
+from ruleset import BRANCHES, RULE_NAMES, Bounds, get_ruleset
+from universe import GiltUniverse, IS_BENCHMARK, IS_APPROPRIATE
 
 # ---- Benchmark and Appropriateness Rules ----
-def benchmark(gilt):
-    """Return True if a gilt is benchmark size (>=10bn out)."""
-    return gilt['TOTAL_AMOUNT_IN_ISSUE'] >= 10_000
+def benchmark(gilt, ruleset=None):
+    """Return True if a gilt is benchmark size (>= ruleset.benchmark_size, 10bn by default)."""
+    return gilt['TOTAL_AMOUNT_IN_ISSUE'] >= get_ruleset(ruleset).benchmark_size
 
-def appropriate(gilt):
-    """Return True if a gilt is appropriate based on ISIN exclusion list."""
-    inappropriate_gilts = []  # Define exclusions if needed
-    return gilt['ISIN_CODE'] not in inappropriate_gilts
+def appropriate(gilt, ruleset=None):
+    """Return True if a gilt is appropriate based on the ruleset's ISIN exclusion list."""
+    return gilt['ISIN_CODE'] not in get_ruleset(ruleset).for_data(gilt).excluded_isins()
 
 # ---- Date Matching Rules ----
 def same_year(row, input_date_str):
@@ -70,7 +75,22 @@ def find_nearest_longer_cal_yr(df, input_date_str):
     return df
 
 # ---- ICMA Benchmark Selection ----
-def find_ICMA_benchmark(df, verbose=True):
+# The flag column whose AB count is traced as each branch's candidates
+BRANCH_FLAGS = {'R7.4(a)': 'SAME_YEAR', 'R7.4(b)': 'NEAREST_SHORTER', 'R7.4(c)(i)': 'SAME_YEAR_AND_MONTH',
+                'R7.4(c)(ii)': 'NEAREST_SHORTER_CAL_YR', 'R7.4(c)(iii)': 'NEAREST_LONGER_CAL_YR'}
+
+# find_ICMA_benchmark's reading of each ruleset branch over the flag columns:
+# (flag, count) - the branch applies when that many ABs have the flag set - and the flag
+# marking its benchmark, which must then be unique.
+FLAG_BRANCHES = {
+    'R7.4(a)': ('SAME_YEAR', 1, 'SAME_YEAR'),
+    'R7.4(b)': ('SAME_YEAR', 0, 'NEAREST_SHORTER'),
+    'R7.4(c)(i)': ('SAME_YEAR_AND_MONTH', 1, 'SAME_YEAR_AND_MONTH'),
+    'R7.4(c)(ii)': ('NEAREST_SHORTER_CAL_YR', 1, 'NEAREST_SHORTER_CAL_YR'),
+    'R7.4(c)(iii)': ('NEAREST_LONGER_CAL_YR', 1, 'NEAREST_LONGER_CAL_YR'),
+}
+
+def find_ICMA_benchmark(df, verbose=False, maturity=None, ruleset=None):
     """
     Returns a DataFrame with a new column marking the gilt that should be selected
     as the benchmamk consistent with ICMA Pricing Rules
@@ -84,180 +104,361 @@ def find_ICMA_benchmark(df, verbose=True):
         'SAME_YEAR_AND_MONTH'
         'NEAREST_SHORTER_CAL_YR'
         'NEAREST_LONGER_CAL_YR'
-    input_date_str (str): Date string in 'YYYY-MM-DD' format.
+    verbose (bool): Print the rules engine's reasoning step by step.
+    maturity (str): The new issue maturity the flags were computed for, reported to the active tracer.
+    ruleset (Ruleset): The R7.4 branches to walk through, in order; defaults to DEFAULT_RULESET.
 
     Returns:
     pd.DataFrame: The updated DataFrame with a new 'ICMA_BENCHMARK' column.
     """
+    ruleset = get_ruleset(ruleset)
+    tracer = tracing.active
+    if tracer is None:
+        return _select_ICMA_benchmark(df, verbose, ruleset)[0]
+
+    start = time.perf_counter_ns()
+    df, rule, tested = _select_ICMA_benchmark(df, verbose, ruleset)
+    elapsed_ns = time.perf_counter_ns() - start
+    ab = df['IS_AB'] == True
+    evaluated = [(branch, int((ab & df[BRANCH_FLAGS[branch]]).sum())) for branch in tested]
+    tracing.report_selection(tracer, 'find_ICMA_benchmark', maturity, evaluated, rule, elapsed_ns)
+    return df
+
+def _select_ICMA_benchmark(df, verbose, ruleset):
+    """
+    find_ICMA_benchmark without instrumentation.
+
+    Returns:
+        tuple: (df, name of the rule that fired, names of the branches tested in order).
+    """
     # R7.3 Only consider appropriate benchmarks
-    ab_df = df[df['IS_AB'] == True].copy()
+    ab_df = df[df['IS_AB'] == True]
 
     if verbose:
         g_count = len(df)
         ab_count = len(ab_df)
         print(f'Count of Conventional Gilts in issue: {g_count}')
-        print(f'First, we must eliminate all below Benchmark size (<£10bn) as well as those deemed inappropriate')
+        print(f'First, we must eliminate all below Benchmark size (<£{ruleset.benchmark_size / 1000:g}bn) '
+              f'as well as those deemed inappropriate')
         print(f'Removed {g_count - ab_count}, leaving {ab_count} Appropriate Benchmarks (ABs)')
+        print(f'Count of ABs maturing in same calendar year as New Issue Bond Maturity: {ab_df["SAME_YEAR"].sum()}\n')
+        print(f'ICMA RULES ENGINE ({ruleset.name})')
 
     df['ICMA_BENCHMARK'] = False
-    same_year_df = ab_df[ab_df['SAME_YEAR'] == True]
-    sy_count = len(same_year_df)
-
-    if verbose:
-        print(f'Count of ABs maturing in same calendar year as New Issue Bond Maturity: {sy_count}\n')
-        print(f'ICMA RULES ENGINE')
-        print(f'R7.4(a) If only one benchmark maturing in the same calendar year, take that benchmark.')
-    # R7.4(a) If only one benchmark maturing in the same calendar year, that benchmark.
-    if len(same_year_df) == 1:
-        if verbose: print(f'>>#ABs is 1, therefore we have found the benchmark.')
-        df.loc[df['REDEMPTION_DATE'] == same_year_df['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
-        return df
-
-    # R7.4(b) If there are none maturing in the calendar year, then the nearest shorter
-    if verbose:
-        print(f'#ABs is not 1, therefore proceeding to next rule R7.4(b).\n')
-        print(f'R7.4(b) If there are no ABs maturing in the calendar year, then take the nearest shorter AB')
 
-    if len(same_year_df) == 0:
-        if verbose:
-            print(f'>>#ABs is 0, therefore we take the nearest shorter AB. Benchmark identified.')
-        nearest_shorter = ab_df[ab_df['NEAREST_SHORTER'] == True]
-        if len(nearest_shorter) == 1:
-            df.loc[df['REDEMPTION_DATE'] == nearest_shorter['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
-        return df
-
-    if verbose:
-        print(f'#ABs is not 0, therefore proceeding to next rule R7.4(c).\n')
-        print(f'R7.4(c) If there is more than one AB maturing in the calendar year, then:')
-        print(f'    R7.4(c)(i) First use an AB maturing in the same month if one exists, otherwise')
-        print(f'    R7.4(c)(ii) Take the nearest shorter AB in the same calendar year')
-        print(f'    R7.4(c)(iii) Take the nearest longer AB in the same calendar year\n')
-
-    # R7.4(c) If there are more than one maturing in the calendar year then....
-    if len(same_year_df) > 1:
-
-        # R7.4(c)(i) First use a bond maturing in the same month, if it exists
-        same_month_df = ab_df[ab_df['SAME_YEAR_AND_MONTH'] == True]
-        if len(same_month_df) == 1:
-            if verbose: print(f'>>R7.4(c)(i) satisfied. Benchmark identified.')
-            df.loc[df['REDEMPTION_DATE'] == same_month_df['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
-            return df
-
-        # R7.4(c)(ii) If nothing maturing in same month, find nearest shorter in calendar year
-        if verbose: print(f'R7.4(c)(i) not satisfied, proceeding to R7.4(c)(ii): nearest shorter AB.')
-        nearest_shorter_cal_yr_df = ab_df[ab_df['NEAREST_SHORTER_CAL_YR'] == True]
-        if len(nearest_shorter_cal_yr_df) == 1:
-            if verbose: print(f'>>R7.4(c)(ii) satisfied. Benchmark identified.')
-            df.loc[df['REDEMPTION_DATE'] == nearest_shorter_cal_yr_df['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
-            return df
-
-        # R7.4(c)(iii) If nothing shorter in calendar year, then nearest longest in calendar year
-        if verbose: print(f'R7.4(c)(ii) not satisfied, proceeding to R7.4(c)(iii): nearest longer AB.')
-        nearest_longer_cal_yr_df = ab_df[ab_df['NEAREST_LONGER_CAL_YR'] == True]
-        if len(nearest_longer_cal_yr_df) == 1:
-            if verbose: print(f'>>R7.4(c)(iii) satisfied. Benchmark identified.')
-            df.loc[df['REDEMPTION_DATE'] == nearest_longer_cal_yr_df['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
-            return df
-
-        else: # no rules satisfied
-            print(f"No ICMA Rules satisfied!?! Check the code...")
-            df['ICMA_BENCHMARK'] = False # Return all False
-            return df
-
-
-import pandas as pd
-
-def apply_rules(df, new_issue_maturity):
+    # R7.4 The first branch that applies decides, in the ruleset's order
+    tested = []
+    for rule in ruleset.branches:
+        tested.append(rule)
+        applies_flag, count, benchmark_flag = FLAG_BRANCHES[rule]
+        if verbose: print(f'{rule} {BRANCHES[rule].description}')
+        if ab_df[applies_flag].sum() != count:
+            if verbose: print(f'#ABs flagged {applies_flag} is not {count}, therefore proceeding to the next rule.\n')
+            continue
+
+        selected = ab_df[ab_df[benchmark_flag] == True]
+        if len(selected) != 1:
+            if verbose: print(f'>>{rule} applies but there is no single AB to take: no benchmark.')
+            return df, 'None', tested
+        if verbose: print(f'>>{rule} satisfied. Benchmark identified.')
+        df.loc[df['REDEMPTION_DATE'] == selected['REDEMPTION_DATE'].iloc[0], 'ICMA_BENCHMARK'] = True
+        return df, rule, tested
+
+    # no rules satisfied, e.g. several ABs in the year, none in the month and all maturing on the day itself
+    if verbose: print('No ICMA Rules satisfied: no benchmark.')
+    return df, 'None', tested
+
+
+def apply_rules(df, new_issue_maturity, verbose=False, ruleset=None):
     """
     Apply all rules in sequence to prepare the DataFrame for benchmark selection.
 
     Parameters:
         df (pd.DataFrame): The input DataFrame.
         new_issue_maturity (str): The input maturity date as a string ('YYYY-MM-DD').
+        verbose (bool): Print the rules engine's reasoning step by step.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
 
     Returns:
         pd.DataFrame: The updated DataFrame with all rule columns added.
     """
 
-    # Create columns for BENCHMARK, APPROPRIATE, and combined criteria
-    df['IS_BENCHMARK'] = df.apply(benchmark, axis=1)
-    df['IS_APPROPRIATE'] = df.apply(appropriate, axis=1)
-    df['IS_AB'] = df['IS_BENCHMARK'] & df['IS_APPROPRIATE']
+    # Every rule column is computed column-wise in one pass (see get_rule_matrices)
+    rule_matrices = get_rule_matrices(df, [new_issue_maturity], ruleset)
+    for col, matrix in rule_matrices.items():
+        if col != 'ICMA_BENCHMARK':
+            df[col] = matrix[:, 0]
+
+    # Apply ICMA benchmark selection rule
+    df = find_ICMA_benchmark(df, verbose, new_issue_maturity, ruleset)
+
+    return df
+
+
+# ---- Multi-Maturity Rule Matrices ----
+RULE_COLUMNS = ['IS_BENCHMARK', 'IS_APPROPRIATE', 'IS_AB',
+                'SAME_YEAR',
+                'UNIQUE_SAME_YEAR',
+                'NEAREST_SHORTER',
+                'SAME_YEAR_AND_MONTH', 'NEAREST_SHORTER_CAL_YR', 'NEAREST_LONGER_CAL_YR',
+                'ICMA_BENCHMARK']
+
+def _flag_nearest(redemption, candidates, use_max):
+    """
+    For each maturity (column), mark every gilt sharing the redemption date of the
+    latest (use_max) or earliest candidate gilt in that column.
+    """
+    fill = np.iinfo(np.int64).min if use_max else np.iinfo(np.int64).max
+    masked = np.where(candidates, redemption[:, None], fill)
+    target = masked.max(axis=0, initial=fill) if use_max else masked.min(axis=0, initial=fill)
+    return (redemption[:, None] == target[None, :]) & candidates.any(axis=0)[None, :]
+
+def _universe(df, ruleset=None):
+    """df as a GiltUniverse with its R7.3 flags set by ruleset (by default a universe keeps its own)."""
+    if isinstance(df, GiltUniverse):
+        return df if ruleset is None or ruleset == df.ruleset else df.with_ruleset(ruleset)
+    return GiltUniverse.from_dataframe(df, ruleset)
+
+def get_rule_matrices(df, maturities, ruleset=None):
+    """
+    Evaluate every rule column of apply_rules for many maturities at once.
+
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Original DataFrame before any rule columns are created.
+        maturities (array-like): New issue maturity dates.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET (or a
+            universe's own ruleset).
+
+    Returns:
+        dict: Maps each name in RULE_COLUMNS to a boolean np.ndarray of shape
+        (number of gilts, number of maturities). ICMA_BENCHMARK follows find_ICMA_benchmark.
+    """
+    maturities = pd.to_datetime(np.asarray(maturities).ravel())
+    universe = _universe(df, ruleset)
+    n_gilts, n_maturities = len(universe), len(maturities)
+
+    # Per-gilt rules, broadcast (without copying) across the maturities
+    is_benchmark = universe.has(IS_BENCHMARK)  # Benchmark size
+    is_appropriate = universe.has(IS_APPROPRIATE)  # No inappropriate gilts
+    is_ab = is_benchmark & is_appropriate
+
+    # Dates as integer days; missing dates never match a real date
+    redemption_dates = universe.redemption_dates
+    valid = ~np.isnat(redemption_dates)
+    redemption = np.where(valid, universe.days.astype(np.int64), np.iinfo(np.int64).min)
+    maturity = maturities.values.astype('datetime64[D]').astype(np.int64)
+    red_months = redemption_dates.astype('datetime64[M]').astype(np.int64)
+    red_year = np.where(valid, red_months // 12 + 1970, -1)
+    red_month = np.where(valid, red_months % 12 + 1, -1)
 
     # Date-based rules
-    df['SAME_YEAR'] = df.apply(lambda row: same_year(row, new_issue_maturity), axis=1)
-    df['SAME_YEAR_AND_MONTH'] = df.apply(lambda row: same_year_and_month(row, new_issue_maturity), axis=1)
+    same_year = red_year[:, None] == np.asarray(maturities.year)[None, :]
+    same_year_and_month = same_year & (red_month[:, None] == np.asarray(maturities.month)[None, :])
+    before = valid[:, None] & (redemption[:, None] < maturity[None, :])
+    after = valid[:, None] & (redemption[:, None] > maturity[None, :])
 
     # Nearest gilt selection rules
-    df = find_unique_same_year(df, new_issue_maturity)
-    df = find_nearest_shorter(df, new_issue_maturity)
-    df = find_nearest_shorter_cal_yr(df, new_issue_maturity)
-    df = find_nearest_longer_cal_yr(df, new_issue_maturity)
+    ab = is_ab[:, None]
+    ab_same_year = ab & same_year
+    ab_same_year_count = ab_same_year.sum(axis=0)
+    unique_same_year = _flag_nearest(redemption, ab_same_year, True) & (ab_same_year_count == 1)[None, :]
+    nearest_shorter = _flag_nearest(redemption, ab & before, True)
+    nearest_shorter_cal_yr = _flag_nearest(redemption, ab_same_year & before, True)
+    nearest_longer_cal_yr = _flag_nearest(redemption, ab_same_year & after, False)
+
+    # ICMA benchmark selection, branch by branch in the ruleset's order as in find_ICMA_benchmark:
+    # rule -> (where the branch applies, the benchmark it then selects)
+    def unique_ab(flags):
+        return ((flags & ab).sum(axis=0) == 1)[None, :]
+
+    ab_same_month = ab & same_year_and_month
+    branches = {
+        'R7.4(a)': ((ab_same_year_count == 1)[None, :], unique_same_year),
+        'R7.4(b)': ((ab_same_year_count == 0)[None, :], nearest_shorter & unique_ab(nearest_shorter)),
+        'R7.4(c)(i)': (unique_ab(ab_same_month), _flag_nearest(redemption, ab_same_month, True)),
+        'R7.4(c)(ii)': (unique_ab(nearest_shorter_cal_yr), nearest_shorter_cal_yr),
+        'R7.4(c)(iii)': (unique_ab(nearest_longer_cal_yr), nearest_longer_cal_yr),
+    }
+    order = universe.ruleset.branches
+    icma_benchmark = np.select([np.broadcast_to(branches[rule][0], (n_gilts, n_maturities)) for rule in order],
+                               [branches[rule][1] for rule in order], default=False)
+
+    shape = (n_gilts, n_maturities)
+    return {
+        'IS_BENCHMARK': np.broadcast_to(is_benchmark[:, None], shape),
+        'IS_APPROPRIATE': np.broadcast_to(is_appropriate[:, None], shape),
+        'IS_AB': np.broadcast_to(ab, shape),
+        'SAME_YEAR': same_year,
+        'UNIQUE_SAME_YEAR': unique_same_year,
+        'NEAREST_SHORTER': nearest_shorter,
+        'SAME_YEAR_AND_MONTH': same_year_and_month,
+        'NEAREST_SHORTER_CAL_YR': nearest_shorter_cal_yr,
+        'NEAREST_LONGER_CAL_YR': nearest_longer_cal_yr,
+        'ICMA_BENCHMARK': icma_benchmark,
+    }
+
+def get_rule_frame(df, maturities, ruleset=None):
+    """
+    Long-form version of get_rule_matrices: one row per (maturity, gilt).
 
-    # Apply ICMA benchmark selection rule
-    df = find_ICMA_benchmark(df)
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Original DataFrame before any rule columns are created.
+        maturities (array-like): New issue maturity dates.
+        ruleset (Ruleset): As for get_rule_matrices.
 
-    return df
+    Returns:
+        pd.DataFrame: Columns 'MATURITY', 'ISIN_CODE', 'REDEMPTION_DATE' and every name in RULE_COLUMNS.
+    """
+    maturities = pd.to_datetime(np.asarray(maturities).ravel())
+    rule_matrices = get_rule_matrices(df, maturities, ruleset)
+    n_gilts, n_maturities = len(df), len(maturities)
+
+    if isinstance(df, GiltUniverse):
+        isins, redemption_dates = df.isins, df.redemption_dates.astype('datetime64[s]')
+    else:
+        isins, redemption_dates = df['ISIN_CODE'].values, df['REDEMPTION_DATE'].values
+
+    long_df = pd.DataFrame({
+        'MATURITY': np.repeat(maturities.values, n_gilts),
+        'ISIN_CODE': np.tile(isins, n_maturities),
+        'REDEMPTION_DATE': np.tile(redemption_dates, n_maturities),
+    })
+    for col in RULE_COLUMNS:
+        long_df[col] = rule_matrices[col].T.ravel()
+    return long_df
 
 
 # SINGLE OPTIMISED FUNCTION
-def get_icma_benchmark(df, maturity_str: str) -> pd.Timestamp:
+def get_icma_benchmark(df, maturity_str: str, verbose=False, ruleset=None) -> pd.Timestamp:
     """
     Given a maturity date, applies all ICMA benchmark selection rules and returns
     the Redemption_Date of the selected benchmark.
 
     Parameters:
-        df (pd.DataFrame): Original DataFrame before any rule columns are created.
+        df (pd.DataFrame | GiltUniverse): Original DataFrame before any rule columns are created.
         maturity_str (str): The input maturity date as a string ('YYYY-MM-DD').
+        verbose (bool): Print the candidate counts and the rule that fired.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET (or a
+            universe's own ruleset).
 
     Returns:
         pd.Timestamp or None: The Redemption_Date of the ICMA Benchmark, if found.
     """
+    tracer = tracing.active
+    if tracer is not None:
+        start = time.perf_counter_ns()
+
     maturity_date = pd.to_datetime(maturity_str)
 
-    # Apply filtering to find appropriate benchmarks (ABs)
-    ab_df = df[
-        (df['TOTAL_AMOUNT_IN_ISSUE'] >= 10_000) &  # Benchmark size
-        (~df['ISIN_CODE'].isin([]))  # No inappropriate gilts (define exclusions if needed)
-    ].copy()
+    # Sorted redemption dates of the appropriate benchmarks (ABs)
+    if isinstance(df, GiltUniverse):
+        universe = _universe(df, ruleset)
+        ruleset = universe.ruleset
+        dates, months, _ = universe.appropriate_benchmarks()
+    else:
+        ruleset = get_ruleset(ruleset).for_data(df)
+        is_ab = (ruleset.is_benchmark(df['TOTAL_AMOUNT_IN_ISSUE']) &  # Benchmark size
+                 ruleset.is_appropriate(df['ISIN_CODE'].to_numpy(dtype=object)))  # No inappropriate gilts
+        dates = np.asarray(df['REDEMPTION_DATE'].values, dtype='datetime64[D]')[is_ab]
+        dates = np.sort(dates[~np.isnat(dates)])
+        months = dates.astype('datetime64[M]').astype(np.int32)
+
+    # Where the maturity falls among them: every branch's candidates are a slice of dates
+    bounds = _bounds(dates, months, maturity_date)
+    same_year = bounds.year_hi - bounds.year_lo
+    same_month = bounds.month_hi - bounds.month_lo
+    nearest_shorter = bounds.shorter
+    nearest_shorter_cal_yr = max(bounds.shorter - bounds.year_lo, 0)
+    nearest_longer_cal_yr = max(bounds.year_hi - bounds.longer, 0)
 
-    # Get same-year, same-month, and nearest-shorter/longer bonds
-    same_year = ab_df[ab_df['REDEMPTION_DATE'].dt.year == maturity_date.year]
-    same_month = same_year[same_year['REDEMPTION_DATE'].dt.month == maturity_date.month]
+    if verbose:
+        print(f"Processing date: {maturity_str}")
+        print(f"Same year count: {same_year}")
+        print(f"Same month count: {same_month}")
+        print(f"Nearest shorter count: {nearest_shorter}")
+        print(f"Nearest shorter in calendar year count: {nearest_shorter_cal_yr}")
+        print(f"Nearest longer in calendar year count: {nearest_longer_cal_yr}")
 
-    nearest_shorter = ab_df[ab_df['REDEMPTION_DATE'] < maturity_date]
-    nearest_shorter_cal_yr = same_year[same_year['REDEMPTION_DATE'] < maturity_date]
-    nearest_longer_cal_yr = same_year[same_year['REDEMPTION_DATE'] > maturity_date]
+    # Apply ICMA rules in sequence
+    table = ruleset.compile()
+    position, code = table.select(bounds)
+    rule = RULE_NAMES[code]
+    result = pd.Timestamp(dates[position]) if position >= 0 else None
+    if verbose:
+        if result is None:
+            print("No benchmark found")
+        else:
+            print(f"Rule {rule} satisfied: {BRANCHES[rule].description} {result}")
 
-    print(f"Processing date: {maturity_str}")
-    print(f"Same year count: {len(same_year)}")
-    print(f"Same month count: {len(same_month)}")
-    print(f"Nearest shorter count: {len(nearest_shorter)}")
-    print(f"Nearest shorter in calendar year count: {len(nearest_shorter_cal_yr)}")
-    print(f"Nearest longer in calendar year count: {len(nearest_longer_cal_yr)}")
+    if tracer is not None:
+        candidates = {'R7.4(a)': same_year, 'R7.4(b)': nearest_shorter, 'R7.4(c)(i)': same_month,
+                      'R7.4(c)(ii)': nearest_shorter_cal_yr, 'R7.4(c)(iii)': nearest_longer_cal_yr}
+        evaluated = [(branch, candidates[branch]) for branch in table.tested(bounds)]
+        tracing.report_selection(tracer, 'get_icma_benchmark', maturity_date, evaluated, rule,
+                                 time.perf_counter_ns() - start)
+    return result
 
-    # Apply ICMA rules in sequence
-    if len(same_year) == 1:
-        print("Rule R7.4(a) satisfied: Single gilt in same year")
-        return same_year['REDEMPTION_DATE'].iloc[0]
-
-    if same_year.empty and not nearest_shorter.empty:
-        print("Rule R7.4(b) satisfied: No gilt in same year, using nearest shorter")
-        return nearest_shorter['REDEMPTION_DATE'].max()
-
-    if len(same_month) == 1:
-        print("Rule R7.4(c)(i) satisfied: Single gilt in same month")
-        return same_month['REDEMPTION_DATE'].iloc[0]
-
-    if not nearest_shorter_cal_yr.empty:
-        nearest_shorter_cal_yr_date = nearest_shorter_cal_yr['REDEMPTION_DATE'].max()
-        print(f"Rule R7.4(c)(ii) satisfied: Using max nearest shorter gilt in same calendar year: {nearest_shorter_cal_yr_date}")
-        return nearest_shorter_cal_yr_date
-
-    if not nearest_longer_cal_yr.empty:
-        nearest_longer_cal_yr_date = nearest_longer_cal_yr['REDEMPTION_DATE'].min()
-        print(f"Rule R7.4(c)(iii) satisfied: Using min nearest longer gilt in same calendar year: {nearest_longer_cal_yr_date}")
-        return nearest_longer_cal_yr_date
-
-    print("No benchmark found")
-    return None  # No benchmark found
+
+def _bounds(dates, months, maturity_date):
+    """
+    Bounds of a maturity among sorted AB redemption dates (with their months since 1970-01
+    as int32), for the ruleset's DecisionTable.
+    """
+    m = np.datetime64(maturity_date, 'D')
+    month = (maturity_date.year - 1970) * 12 + maturity_date.month - 1
+    year_month = month - month % 12
+
+    year_lo, year_hi = np.searchsorted(months, [year_month, year_month + 12])
+    month_lo, month_hi = np.searchsorted(months, [month, month + 1])
+    shorter = np.searchsorted(dates, m, side='left')  # ABs strictly before m
+    longer = np.searchsorted(dates, m, side='right')  # First AB strictly after m
+    return Bounds(int(year_lo), int(year_hi), int(month_lo), int(month_hi), int(shorter), int(longer))
+
+
+def _benchmark_index(df, ruleset=None):
+    """BenchmarkIndex over a DataFrame or GiltUniverse."""
+    if isinstance(df, GiltUniverse):
+        return _universe(df, ruleset).benchmark_index()
+    return BenchmarkIndex.from_dataframe(df, ruleset)
+
+
+# BATCH FUNCTION
+def get_icma_benchmarks(df, maturities, ruleset=None):
+    """
+    Vectorised equivalent of get_icma_benchmark for many maturities at once.
+
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Original DataFrame before any rule columns are created.
+        maturities (array-like or pd.Series): New issue maturity dates.
+        ruleset (Ruleset): As for get_icma_benchmark.
+
+    Returns:
+        pd.DataFrame: One row per maturity with columns 'MATURITY', 'BENCHMARK_REDEMPTION_DATE',
+        'BENCHMARK_ISIN' and 'RULE' (the R7.4 branch that fired, 'None' if no benchmark found).
+    """
+    tracer = tracing.active
+    if tracer is None:
+        return _benchmark_index(df, ruleset).lookup_many(maturities)
+
+    start = time.perf_counter_ns()
+    results = _benchmark_index(df, ruleset).lookup_many(maturities)
+    elapsed_ns = time.perf_counter_ns() - start
+    rule_counts = results['RULE'].value_counts(sort=False)
+    tracer.batch_resolved('get_icma_benchmarks', rule_counts[rule_counts > 0].to_dict(), elapsed_ns)
+    return results
+
+
+def get_cliff_edges(df, ruleset=None):
+    """
+    Returns the maturity intervals over which the ICMA benchmark is constant, i.e. the
+    cliff-edges where the reference gilt flips.
+
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Original DataFrame before any rule columns are created.
+        ruleset (Ruleset): As for get_icma_benchmark.
+
+    Returns:
+        pd.DataFrame: One row per interval with columns 'START', 'END', 'BENCHMARK_REDEMPTION_DATE',
+        'BENCHMARK_ISIN' and 'RULE' (the R7.4 branch responsible for that interval).
+    """
+    return _benchmark_index(df, ruleset).cliff_edges().to_frame()
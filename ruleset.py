@@ -0,0 +1,343 @@
+import json
+import hashlib
+from functools import lru_cache
+from dataclasses import dataclass, asdict, replace
+from typing import NamedTuple
+import numpy as np
+
+# A declarative description of the ICMA R7.3/R7.4 rules: the benchmark size threshold,
+# the ISINs excluded as not appropriate (each with optional effective dates) and the
+# ordered R7.4 selection branches. A Ruleset compiles into a DecisionTable, the one
+# evaluator behind BenchmarkIndex and get_icma_benchmark, so a Handbook amendment is a
+# change of ruleset rather than of code. Only numpy is imported here.
+
+# ---- Rule Codes ----
+# Integer codes for the R7.4 branch that selected the benchmark, in Handbook order.
+NO_BENCHMARK = 0
+R7_4_A = 1
+R7_4_B = 2
+R7_4_C_I = 3
+R7_4_C_II = 4
+R7_4_C_III = 5
+
+RULE_NAMES = ['None', 'R7.4(a)', 'R7.4(b)', 'R7.4(c)(i)', 'R7.4(c)(ii)', 'R7.4(c)(iii)']
+
+
+# ---- Selection Branches ----
+class Bounds(NamedTuple):
+    """
+    Where a maturity falls among the appropriate benchmarks (ABs), as positions in their
+    sorted redemption dates: the ABs in its calendar year are [year_lo, year_hi), those in
+    its month [month_lo, month_hi), those strictly before it [0, shorter) and those strictly
+    after it [longer, n). Fields are ints for one maturity or arrays for many.
+    """
+    year_lo: object
+    year_hi: object
+    month_lo: object
+    month_hi: object
+    shorter: object
+    longer: object
+
+
+class Branch(NamedTuple):
+    """
+    One R7.4 selection branch. When applies(bounds) holds the branch decides the outcome:
+    the AB at position(bounds) if found(bounds), otherwise no benchmark.
+    """
+    applies: object
+    found: object
+    position: object
+    description: str
+
+
+def _one_in_year(b):
+    return b.year_hi - b.year_lo == 1
+
+
+def _none_in_year(b):
+    return b.year_hi == b.year_lo
+
+
+def _one_in_month(b):
+    return b.month_hi - b.month_lo == 1
+
+
+def _any_shorter(b):
+    return b.shorter > 0
+
+
+def _shorter_in_year(b):
+    return b.shorter > b.year_lo
+
+
+def _longer_in_year(b):
+    return b.longer < b.year_hi
+
+
+def _always(b):
+    return True
+
+
+def _year_lo(b):
+    return b.year_lo
+
+
+def _month_lo(b):
+    return b.month_lo
+
+
+def _nearest_shorter(b):
+    return b.shorter - 1
+
+
+def _nearest_longer(b):
+    return b.longer
+
+
+# Every branch a Ruleset can use, keyed by the rule name it reports
+BRANCHES = {
+    'R7.4(a)': Branch(_one_in_year, _always, _year_lo,
+                      'If only one benchmark is maturing in the same calendar year, that benchmark.'),
+    'R7.4(b)': Branch(_none_in_year, _any_shorter, _nearest_shorter,
+                      'If no benchmark is maturing in that calendar year, the nearest shorter benchmark.'),
+    'R7.4(c)(i)': Branch(_one_in_month, _always, _month_lo,
+                         'The benchmark maturing in the same month.'),
+    'R7.4(c)(ii)': Branch(_shorter_in_year, _always, _nearest_shorter,
+                          'The nearest shorter benchmark in the calendar year.'),
+    'R7.4(c)(iii)': Branch(_longer_in_year, _always, _nearest_longer,
+                           'The nearest longer benchmark in the calendar year.'),
+}
+
+
+class DecisionTable:
+    """
+    The ordered branches of a Ruleset, compiled for evaluation. The first branch that
+    applies decides; if none applies there is no benchmark. select() walks the table for
+    one maturity and select_many() evaluates every row at once with np.select.
+    """
+
+    def __init__(self, branches):
+        """
+        Parameters:
+            branches (list of str): Names of BRANCHES, in evaluation order.
+        """
+        self.names = list(branches)
+        self.rules = [RULE_NAMES.index(name) for name in self.names]
+        self.branches = [BRANCHES[name] for name in self.names]
+
+    def select(self, bounds):
+        """
+        Parameters:
+            bounds (Bounds): Int positions for one maturity.
+
+        Returns:
+            tuple: (position of the benchmark among the ABs or -1, rule code).
+        """
+        for rule, branch in zip(self.rules, self.branches):
+            if branch.applies(bounds):
+                if branch.found(bounds):
+                    return branch.position(bounds), rule
+                return -1, NO_BENCHMARK
+        return -1, NO_BENCHMARK
+
+    def tested(self, bounds):
+        """
+        Parameters:
+            bounds (Bounds): Int positions for one maturity.
+
+        Returns:
+            list: Names of the branches select() evaluates, in order: up to and including the first
+            that applies (all of them if none does).
+        """
+        names = []
+        for name, branch in zip(self.names, self.branches):
+            names.append(name)
+            if branch.applies(bounds):
+                break
+        return names
+
+    def select_many(self, bounds):
+        """
+        Parameters:
+            bounds (Bounds): Int64 array positions, one element per maturity.
+
+        Returns:
+            tuple: (np.ndarray of positions or -1, np.ndarray of int8 rule codes).
+        """
+        applies, positions, rules = [], [], []
+        for rule, branch in zip(self.rules, self.branches):
+            found = branch.found(bounds)
+            applies.append(np.broadcast_to(branch.applies(bounds), np.shape(bounds.shorter)))
+            positions.append(np.where(found, branch.position(bounds), -1))
+            rules.append(np.where(found, rule, NO_BENCHMARK))
+        return (np.select(applies, positions, default=-1).astype(np.int64),
+                np.select(applies, rules, default=NO_BENCHMARK).astype(np.int8))
+
+
+@lru_cache(maxsize=None)
+def _compile(branches):
+    return DecisionTable(branches)
+
+
+# ---- Rulesets ----
+def _day(value):
+    """An ISO date string (or None) as numpy datetime64[D]."""
+    return None if value is None else np.datetime64(value, 'D')
+
+
+@dataclass(frozen=True)
+class Exclusion:
+    """
+    A gilt deemed not appropriate (R7.3) from start up to, but not including, end.
+    Either date may be None for an open-ended exclusion.
+    """
+    isin: str
+    start: str = None
+    end: str = None
+    reason: str = ''
+
+    def in_force(self, day):
+        """True if the exclusion applies on day (np.datetime64[D])."""
+        return ((self.start is None or _day(self.start) <= day) and
+                (self.end is None or day < _day(self.end)))
+
+
+@dataclass(frozen=True)
+class Ruleset:
+    """
+    The configurable parts of the ICMA Chapter 7 rules.
+
+    Attributes:
+        name (str): Human readable name, e.g. the Handbook edition.
+        version (str): Identifies the ruleset in caches and reports; change it with any rule.
+        benchmark_size (float): R7.3 threshold, £m nominal outstanding.
+        exclusions (tuple of Exclusion): Gilts deemed not appropriate, with effective dates.
+        branches (tuple of str): R7.4 branches (keys of BRANCHES) in evaluation order.
+        as_of (str): Date the exclusions are evaluated at. None means the close-of-business date
+            of the data the rules are applied to (see for_data), never the day the code runs.
+    """
+    name: str
+    version: str
+    benchmark_size: float = 10_000
+    exclusions: tuple = ()
+    branches: tuple = tuple(BRANCHES)
+    as_of: str = None
+
+    def __post_init__(self):
+        object.__setattr__(self, 'exclusions', tuple(
+            e if isinstance(e, Exclusion) else Exclusion(**e) for e in self.exclusions))
+        object.__setattr__(self, 'branches', tuple(self.branches))
+        unknown = [name for name in self.branches if name not in BRANCHES]
+        if unknown:
+            raise ValueError(f"Unknown R7.4 branches {unknown}; expected some of {list(BRANCHES)}")
+        if not self.branches or len(set(self.branches)) != len(self.branches):
+            raise ValueError(f"Ruleset branches must be a non-empty list without repeats: {list(self.branches)}")
+
+    # ---- Serialisation ----
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Ruleset from a dict with the same keys as its fields (e.g. parsed JSON)."""
+        return cls(**data)
+
+    def to_dict(self):
+        data = asdict(self)
+        data['exclusions'] = [asdict(e) for e in self.exclusions]
+        data['branches'] = list(self.branches)
+        return data
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """Read a ruleset from a JSON file."""
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @property
+    def fingerprint(self):
+        """Short hash of every field, for cache keys."""
+        return hashlib.sha256(self.to_json().encode()).hexdigest()[:16]
+
+    # ---- R7.3 Appropriate Benchmarks ----
+    @property
+    def dated(self):
+        """True if any exclusion has an effective date, so which are in force depends on as_of."""
+        return any(e.start or e.end for e in self.exclusions)
+
+    def on(self, as_of):
+        """The same rules with exclusions evaluated at as_of (any date numpy can parse)."""
+        return replace(self, as_of=None if as_of is None else str(np.datetime64(as_of, 'D')))
+
+    def for_data(self, df):
+        """
+        The ruleset to apply to D1A data. If as_of is not set and the exclusions are dated, they
+        are evaluated at the data's latest CLOSE_OF_BUSINESS_DATE, so results (and the fingerprint
+        caches key on) depend on the data alone.
+
+        Parameters:
+            df (pd.DataFrame | pd.Series): D1A gilts, or a single gilt's row.
+
+        Returns:
+            Ruleset: self, or self.on(close-of-business date).
+        """
+        if self.as_of is not None or not self.dated or 'CLOSE_OF_BUSINESS_DATE' not in df:
+            return self
+        days = np.atleast_1d(np.asarray(df['CLOSE_OF_BUSINESS_DATE'], dtype='datetime64[D]'))
+        days = days[~np.isnat(days)]
+        return self.on(days.max()) if len(days) else self
+
+    def excluded_isins(self, as_of=None):
+        """
+        Parameters:
+            as_of (str | np.datetime64): Date to evaluate the exclusions at; defaults to self.as_of.
+
+        Returns:
+            list: ISINs of the exclusions in force on that date.
+
+        Raises:
+            ValueError: If the exclusions are dated and neither as_of nor self.as_of is set.
+        """
+        as_of = as_of if as_of is not None else self.as_of
+        if as_of is None and self.dated:
+            raise ValueError(f"Ruleset {self.version!r} has dated exclusions: give the date to evaluate them at, "
+                             f"e.g. ruleset.on(date) or ruleset.for_data(df)")
+        day = _day(as_of)
+        return [e.isin for e in self.exclusions if e.in_force(day)]
+
+    def is_benchmark(self, amounts):
+        """Boolean mask of benchmark size (>= benchmark_size) amounts."""
+        return np.asarray(amounts, dtype=np.float64) >= self.benchmark_size
+
+    def is_appropriate(self, isins, as_of=None):
+        """Boolean mask of the ISINs not excluded on as_of (see excluded_isins)."""
+        isins = np.asarray(isins, dtype=object)
+        appropriate = np.ones(len(isins), dtype=bool)
+        for isin in self.excluded_isins(as_of):
+            appropriate &= isins != isin
+        return appropriate
+
+    # ---- R7.4 Selection ----
+    def compile(self):
+        """
+        Returns:
+            DecisionTable: The ordered R7.4 branches, ready to evaluate.
+        """
+        return _compile(self.branches)
+
+
+# The rules as in the December 2023 Handbook: £10bn, no named exclusions (7.3A was removed)
+DEFAULT_RULESET = Ruleset('ICMA Primary Market Handbook, Chapter 7 (December 2023)', '2023-12')
+
+
+def get_ruleset(ruleset=None):
+    """ruleset, or DEFAULT_RULESET if None; a str is read as a path to a JSON ruleset."""
+    if ruleset is None:
+        return DEFAULT_RULESET
+    if isinstance(ruleset, str):
+        return Ruleset.load(ruleset)
+    return ruleset
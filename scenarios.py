@@ -0,0 +1,196 @@
+import os
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from benchmark_index import BenchmarkIndex
+from ruleset import get_ruleset
+from universe import GiltUniverse, IS_APPROPRIATE
+
+
+# ---- Scenario Events ----
+@dataclass(frozen=True)
+class Auction:
+    """Add amount (£m nominal) to an existing gilt: an auction, syndication or re-opening."""
+    isin: str
+    amount: float
+
+
+@dataclass(frozen=True)
+class NewGilt:
+    """Launch a new gilt. If no ISIN is given, one is made up from the scenario position."""
+    redemption_date: str
+    amount: float
+    isin: str = None
+
+
+@dataclass(frozen=True)
+class MarkInappropriate:
+    """Exclude a gilt from the appropriate benchmarks (R7.3)."""
+    isin: str
+
+
+def _redemption_dates(new_gilts):
+    """Redemption dates of NewGilt events as a datetime64[D] array."""
+    return np.array([pd.to_datetime(g.redemption_date) for g in new_gilts], dtype='datetime64[D]')
+
+
+# ---- Base Universe ----
+class BaseUniverse:
+    """
+    The handful of gilt fields the R7.4 selection needs, held as arrays. Scenarios are
+    applied as overlays on these arrays; the base DataFrame is never copied.
+    """
+
+    def __init__(self, df, ruleset=None):
+        """
+        Parameters:
+            df (pd.DataFrame | GiltUniverse): Conventional gilts with 'ISIN_CODE', 'REDEMPTION_DATE'
+                and 'TOTAL_AMOUNT_IN_ISSUE'.
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET (or a
+                universe's own ruleset).
+        """
+        if isinstance(df, GiltUniverse):
+            if ruleset is not None and ruleset != df.ruleset:
+                df = df.with_ruleset(ruleset)
+            self.ruleset = df.ruleset
+            self.isins, self.dates, self.amounts = df.isins, df.redemption_dates, df.amounts
+            self.appropriate = df.has(IS_APPROPRIATE)
+            self.positions = {isin: i for i, isin in enumerate(self.isins)}
+            return
+        self.isins = df['ISIN_CODE'].to_numpy(dtype=object)
+        self.dates = np.asarray(df['REDEMPTION_DATE'].values, dtype='datetime64[D]')
+        self.amounts = df['TOTAL_AMOUNT_IN_ISSUE'].to_numpy(dtype=np.float64)
+        self.ruleset = get_ruleset(ruleset).for_data(df)
+        self.appropriate = self.ruleset.is_appropriate(self.isins)
+        self.positions = {isin: i for i, isin in enumerate(self.isins)}
+
+    def __len__(self):
+        return len(self.isins)
+
+    def index(self, events=()):
+        """
+        Build the BenchmarkIndex for the universe after applying scenario events in order.
+        Arrays are only copied when an event changes them. The index's isins hold row ids
+        (base gilts first, then each NewGilt in event order) rather than ISIN codes.
+
+        Parameters:
+            events (list): Auction, NewGilt and MarkInappropriate events.
+
+        Returns:
+            BenchmarkIndex: Index over the appropriate benchmarks of the scenario universe.
+        """
+        dates, amounts, appropriate = self.dates, self.amounts, self.appropriate
+        positions = self.positions
+        new_gilts = [event for event in events if isinstance(event, NewGilt)]
+
+        if new_gilts:
+            dates = np.concatenate([dates, _redemption_dates(new_gilts)])
+            amounts = np.concatenate([amounts, [g.amount for g in new_gilts]])
+            appropriate = np.concatenate([appropriate, np.ones(len(new_gilts), dtype=bool)])
+            positions = dict(positions)
+            for j, gilt in enumerate(new_gilts):
+                if gilt.isin is not None:
+                    positions[gilt.isin] = len(self) + j
+        amounts_copied = appropriate_copied = bool(new_gilts)
+
+        for event in events:
+            if isinstance(event, NewGilt):
+                continue
+            if event.isin not in positions:
+                raise ValueError(f"Unknown ISIN in scenario event: {event.isin}")
+            row = positions[event.isin]
+            if isinstance(event, Auction):
+                if not amounts_copied:
+                    amounts, amounts_copied = amounts.copy(), True
+                amounts[row] += event.amount
+            elif isinstance(event, MarkInappropriate):
+                if not appropriate_copied:
+                    appropriate, appropriate_copied = appropriate.copy(), True
+                appropriate[row] = False
+            else:
+                raise ValueError(f"Unknown scenario event: {event!r}")
+
+        is_ab = self.ruleset.is_benchmark(amounts) & appropriate
+        return BenchmarkIndex(dates[is_ab], np.flatnonzero(is_ab), self.ruleset)
+
+    def benchmark_rows(self, maturities, events=()):
+        """Row id of the ICMA benchmark for every maturity (-1 if none) under a scenario."""
+        index = self.index(events)
+        positions, _ = index.resolve_many(maturities)
+        row_ids = np.append(index.isins, -1).astype(np.int64)
+        return row_ids[positions]
+
+
+# ---- Parallel Evaluation ----
+# Set once per worker process by _init_worker, so each task only ships its scenario
+_worker_universe = None
+_worker_maturities = None
+_worker_base_rows = None
+
+
+def _init_worker(universe, maturities, base_rows):
+    global _worker_universe, _worker_maturities, _worker_base_rows
+    _worker_universe, _worker_maturities, _worker_base_rows = universe, maturities, base_rows
+
+
+def _evaluate_scenario(events):
+    """Return (positions of changed maturities, new benchmark row ids) for one scenario."""
+    rows = _worker_universe.benchmark_rows(_worker_maturities, events)
+    changed = np.flatnonzero(rows != _worker_base_rows)
+    return changed, rows[changed]
+
+
+def evaluate_scenarios(df, scenarios, maturities, processes=None, ruleset=None):
+    """
+    Evaluate many issuance scenarios against a maturity grid and report, for each, the
+    maturities whose ICMA benchmark differs from the base universe.
+
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Conventional gilts (the base universe).
+        scenarios (list of list): Each scenario is a list of Auction, NewGilt and
+            MarkInappropriate events, applied in order.
+        maturities (array-like): New issue maturity dates to check.
+        processes (int): Worker processes; defaults to os.cpu_count(). Use 1 to run in-process.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+    Returns:
+        pd.DataFrame: One row per changed (scenario, maturity) with columns 'SCENARIO' (position
+        in scenarios), 'MATURITY', 'BASE_ISIN', 'BASE_REDEMPTION_DATE', 'SCENARIO_ISIN' and
+        'SCENARIO_REDEMPTION_DATE'. Scenarios that change nothing have no rows.
+    """
+    universe = BaseUniverse(df, ruleset)
+    maturities = np.asarray(pd.to_datetime(np.asarray(maturities).ravel())).astype('datetime64[D]')
+    base_rows = universe.benchmark_rows(maturities)
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(scenarios) < 2:
+        _init_worker(universe, maturities, base_rows)
+        results = [_evaluate_scenario(events) for events in scenarios]
+    else:
+        chunksize = max(1, len(scenarios) // (processes * 4))
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(universe, maturities, base_rows)) as executor:
+            results = list(executor.map(_evaluate_scenario, scenarios, chunksize=chunksize))
+
+    frames = []
+    for i, (changed, rows) in enumerate(results):
+        if not len(changed):
+            continue
+        new_gilts = [event for event in scenarios[i] if isinstance(event, NewGilt)]
+        isins = np.concatenate([universe.isins, [g.isin or f'NEW-{i}-{j}' for j, g in enumerate(new_gilts)], [None]])
+        dates = np.concatenate([universe.dates, _redemption_dates(new_gilts), [np.datetime64('NaT', 'D')]])
+        base = base_rows[changed]
+        frames.append(pd.DataFrame({
+            'SCENARIO': i,
+            'MATURITY': maturities[changed].astype('datetime64[s]'),
+            'BASE_ISIN': isins[base],
+            'BASE_REDEMPTION_DATE': dates[base].astype('datetime64[s]'),
+            'SCENARIO_ISIN': isins[rows],
+            'SCENARIO_REDEMPTION_DATE': dates[rows].astype('datetime64[s]'),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=['SCENARIO', 'MATURITY', 'BASE_ISIN', 'BASE_REDEMPTION_DATE',
+                                     'SCENARIO_ISIN', 'SCENARIO_REDEMPTION_DATE'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+import dmoxml
+import data_processing as dp
+from benchmark_index import BenchmarkIndex, RULE_NAMES
+from ruleset import get_ruleset
+
+DEFAULT_PORT = 8765
+
+
+class _Snapshot:
+    """
+    An immutable, query-ready view of one D1A file: the index's per-day table plus the
+    answer strings, so a lookup is an array index and no date formatting.
+    """
+
+    def __init__(self, df, xml_file_path, signature, ruleset=None, day=None):
+        self.df = df
+        self.day = day  # Date the dated exclusions were evaluated at, or None if the answers do not depend on it
+        self.index = BenchmarkIndex.from_dataframe(df, ruleset)
+        start, self.positions, self.rules = self.index._day_table()
+        self.start = int(start.astype(np.int64))
+        self.last = len(self.positions) - 1
+        self.dates = [str(d) for d in self.index.dates] + [None]
+        self.isins = [str(isin) for isin in self.index.isins] + [None]
+        self.xml_file_path = xml_file_path
+        self.signature = signature
+        self.close_of_business_date = str(pd.to_datetime(df['CLOSE_OF_BUSINESS_DATE']).max().date()) \
+            if 'CLOSE_OF_BUSINESS_DATE' in df and len(df) else None
+        self.loaded_at = time.time()
+
+    def answer(self, day):
+        """Benchmark for a datetime64[D] maturity as a JSON-ready dict."""
+        i = min(max(int(day.astype(np.int64)) - self.start, 0), self.last)
+        position = self.positions[i]
+        return {
+            'maturity': str(day),
+            'benchmark_redemption_date': self.dates[position],
+            'benchmark_isin': self.isins[position],
+            'rule': RULE_NAMES[self.rules[i]],
+        }
+
+    def answer_many(self, days):
+        positions, rules = self.index.resolve_many(days)
+        return [{'maturity': str(day), 'benchmark_redemption_date': self.dates[p], 'benchmark_isin': self.isins[p],
+                 'rule': RULE_NAMES[r]} for day, p, r in zip(days, positions, rules)]
+
+    def info(self):
+        return {'xml_file_path': self.xml_file_path, 'close_of_business_date': self.close_of_business_date,
+                'exclusions_as_of': self.index.ruleset.as_of, 'appropriate_benchmarks': len(self.index),
+                'loaded_at': self.loaded_at}
+
+
+def _parse_day(text):
+    """Parse a maturity, fast for ISO dates. Raises ValueError if it is not a date (including NaT)."""
+    try:
+        day = np.datetime64(text, 'D')
+    except ValueError:
+        value = pd.to_datetime(text, errors='coerce')
+        day = np.datetime64('NaT', 'D') if pd.isna(value) else np.datetime64(value, 'D')
+    if np.isnat(day):
+        raise ValueError(f"Not a date: {text!r}")
+    return day
+
+
+class LatencyMetrics:
+    """Request counts and server-side latencies over a ring buffer of recent requests."""
+
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._latencies = np.zeros(window)
+        self._count = 0
+        self.errors = 0
+        self.maturities = 0
+        self.started = time.time()
+
+    def record(self, seconds, maturities=1, error=False):
+        with self._lock:
+            self._latencies[self._count % len(self._latencies)] = seconds
+            self._count += 1
+            self.maturities += maturities
+            self.errors += error
+
+    def summary(self):
+        with self._lock:
+            latencies = self._latencies[:min(self._count, len(self._latencies))].copy()
+            count, maturities, errors = self._count, self.maturities, self.errors
+        uptime = time.time() - self.started
+        summary = {'requests': count, 'errors': errors, 'maturities': maturities, 'uptime_s': uptime,
+                   'requests_per_s': count / uptime if uptime else 0.0,
+                   'maturities_per_s': maturities / uptime if uptime else 0.0}
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e6
+            summary.update({'latency_us': {'p50': p50, 'p90': p90, 'p99': p99, 'max': latencies.max() * 1e6,
+                                           'window': len(latencies)}})
+        return summary
+
+
+class BenchmarkService:
+    """
+    Keeps a BenchmarkIndex for the current D1A file in memory and answers lookups over
+    local HTTP. A watcher thread polls the file and, when it changes, builds a new
+    snapshot off to the side and swaps it in with a single assignment, so in-flight
+    requests finish on the snapshot they started with and none are dropped.
+
+    The service answers for today: a ruleset's dated exclusions (unless it sets as_of) are
+    those in force on today's date, and the snapshot is rebuilt when the date changes.
+
+    Endpoints (JSON responses):
+        GET  /benchmark?maturity=2030-01-07
+        GET  /benchmarks?maturity=2030-01-07&maturity=2031-06-30
+        POST /benchmarks with body {"maturities": ["2030-01-07", ...]}
+        GET  /metrics
+        GET  /health
+    """
+
+    def __init__(self, xml_file_path=None, host="127.0.0.1", port=DEFAULT_PORT, poll_interval=1.0, ruleset=None):
+        """
+        Parameters:
+            xml_file_path (str): D1A XML file to serve and watch. Defaults to the standard location.
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+            poll_interval (float): Seconds between checks of the XML file.
+            ruleset (Ruleset | str): Ruleset (or path to a JSON ruleset) to serve; defaults to DEFAULT_RULESET.
+        """
+        self.xml_file_path = xml_file_path or os.path.join(dp.DATA_DIR, "dmo_data.xml")
+        self.ruleset = get_ruleset(ruleset)
+        self.poll_interval = poll_interval
+        self.metrics = LatencyMetrics()
+        self.reloads = 0
+        self.reload_error = None
+        self.snapshot = None
+        self._failed_signature = None  # (mtime, size) of a file that failed to load, not retried until it changes
+        self._reload_lock = threading.Lock()
+        self.today = datetime.date.today  # Date the dated exclusions are evaluated at (replaceable, e.g. in tests)
+        self._stop = threading.Event()
+        self._watcher = None
+        self.reload()
+
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_GET(self):
+                service._handle(self, "GET")
+
+            def do_POST(self):
+                service._handle(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._server_thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ---- Snapshots ----
+    def _signature(self):
+        try:
+            stat = os.stat(self.xml_file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ruleset_on(self, day):
+        """(ruleset, day) to serve on day: dated exclusions without an as_of of their own are evaluated at it."""
+        if self.ruleset.as_of is not None or not self.ruleset.dated:
+            return self.ruleset, None
+        return self.ruleset.on(day), day
+
+    def reload(self):
+        """
+        Load the XML file if it changed since the current snapshot and swap the new index in.
+        On failure the current snapshot keeps serving, the error is reported in /metrics and the
+        file is not parsed again until it changes. If the snapshot's exclusions were evaluated at
+        an earlier date, it is rebuilt for today from the data it already holds.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        with self._reload_lock:
+            today = self.today()
+            current = self.snapshot
+            signature = self._signature()
+            if current is not None and current.day not in (None, today) and \
+                    signature in (None, current.signature, self._failed_signature):
+                self.snapshot = _Snapshot(current.df, current.xml_file_path, current.signature,
+                                          *self._ruleset_on(today))
+                self.reloads += 1
+                return True
+            if signature is None or signature == self._failed_signature or \
+                    (current is not None and current.signature == signature):
+                return False
+            try:
+                # Stream-parse straight to a DataFrame: no CSV round trip, so data/dmo_data.csv is left alone
+                batches = list(dmoxml.iter_dmo_xml(self.xml_file_path))
+                if not batches:
+                    raise ValueError(f"No gilts found in {self.xml_file_path}")
+                df = dp.filter_conventional_gilts(pd.concat(batches, ignore_index=True))
+                snapshot = _Snapshot(df, self.xml_file_path, signature, *self._ruleset_on(today))
+            except Exception as e:
+                self.reload_error = f"{type(e).__name__}: {e}"
+                self._failed_signature = signature
+                print(f"Reload failed, still serving the previous snapshot: {self.reload_error}")
+                return False
+            self.snapshot = snapshot
+            self.reloads += 1
+            self.reload_error = None
+            self._failed_signature = None
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+
+    # ---- Requests ----
+    def _handle(self, handler, method):
+        start = time.perf_counter()
+        snapshot = self.snapshot  # one consistent snapshot per request
+        if snapshot is not None and snapshot.day is not None and snapshot.day != self.today():
+            self.reload()  # The date changed since the exclusions were evaluated: rebuild before answering
+            snapshot = self.snapshot
+        url = urlsplit(handler.path)
+        query = parse_qs(url.query)
+        maturities, status = 1, 200
+        try:
+            if snapshot is None and url.path in ("/benchmark", "/benchmarks"):
+                status, body = 503, {'error': f"No D1A data loaded from {self.xml_file_path}"}
+            elif url.path == "/benchmark" and method == "GET":
+                body = snapshot.answer(_parse_day(query['maturity'][0]))
+            elif url.path == "/benchmarks":
+                if method == "POST":
+                    length = int(handler.headers.get("Content-Length", 0))
+                    texts = json.loads(handler.rfile.read(length) or b"{}").get('maturities', [])
+                else:
+                    texts = query.get('maturity', [])
+                maturities = len(texts)
+                days = np.array([_parse_day(text) for text in texts], dtype='datetime64[D]')
+                body = {'results': snapshot.answer_many(days)}
+            elif url.path == "/metrics":
+                body = self.metrics_summary()
+            elif url.path == "/health":
+                body = {'status': 'ok' if snapshot is not None else 'no data'}
+            else:
+                status, body = 404, {'error': f"Unknown endpoint: {url.path}"}
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            status, body = 400, {'error': f"Bad request: {e}"}
+
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+        if url.path not in ("/metrics", "/health"):
+            self.metrics.record(time.perf_counter() - start, maturities, status != 200)
+
+    def metrics_summary(self):
+        summary = self.metrics.summary()
+        summary.update({'reloads': self.reloads, 'reload_error': self.reload_error,
+                        'snapshot': self.snapshot.info() if self.snapshot is not None else None})
+        return summary
+
+    # ---- Lifecycle ----
+    def start(self):
+        """Serve and watch in background threads."""
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+        self._server_thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._server_thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._watcher.join()
+        self._server_thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ICMA benchmark lookups over local HTTP.")
+    parser.add_argument("--xml", default=None, help="D1A XML file to serve (default data/dmo_data.xml).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between checks for a new file.")
+    parser.add_argument("--ruleset", default=None, help="JSON ruleset (default: the Dec 2023 Handbook rules).")
+    args = parser.parse_args(argv)
+
+    service = BenchmarkService(args.xml, args.host, args.port, args.poll, args.ruleset).start()
+    print(f"Serving ICMA benchmarks for {service.xml_file_path} at {service.url}")
+    try:
+        service._stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
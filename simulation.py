@@ -0,0 +1,165 @@
+import os
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from benchmark_index import BenchmarkIndex
+from scenarios import BaseUniverse
+
+
+@dataclass(frozen=True)
+class IssuanceModel:
+    """
+    Illustrative model of DMO conventional gilt supply. Auctions and syndications arrive
+    as Poisson processes and each picks a gilt in proportion to its weight; sizes are
+    Gamma distributed with the given mean (£m nominal) and coefficient of variation.
+
+    The defaults are round numbers in line with a ~£250bn/yr conventional remit; set them
+    from the current DMO remit and auction calendar for real use.
+    """
+    auctions_per_year: float = 60.0
+    auction_size_mean: float = 4_000.0
+    auction_size_cv: float = 0.25
+    syndications_per_year: float = 6.0
+    syndication_size_mean: float = 6_000.0
+    syndication_size_cv: float = 0.3
+    weights: dict = None  # ISIN -> relative weight; default is equal weight for every gilt in issue
+
+
+def _gamma_params(mean, cv):
+    """Gamma (shape, scale) with the given mean and coefficient of variation."""
+    shape = 1.0 / cv ** 2
+    return shape, mean / shape
+
+
+def _simulate_crossings(seed, n_paths, rates, amounts, model, years, benchmark_size):
+    """
+    Simulate n_paths issuance paths for the sub-benchmark gilts and count how often each
+    set of threshold crossings occurs.
+
+    Only gilts below benchmark_size can change the appropriate benchmark set, so each path
+    reduces to a boolean row saying which of them crossed. With Poisson arrivals split by
+    weight, the auctions landing on each gilt are independent Poisson counts, and the sum of
+    k Gamma(a, s) sizes is Gamma(k * a, s), so a path costs a few draws per gilt.
+
+    Returns:
+        tuple: (unique crossing rows (bool array), number of paths with each row).
+    """
+    rng = np.random.default_rng(seed)
+    added = np.zeros((n_paths, len(amounts)))
+    for per_year, mean, cv in [(model.auctions_per_year, model.auction_size_mean, model.auction_size_cv),
+                               (model.syndications_per_year, model.syndication_size_mean, model.syndication_size_cv)]:
+        shape, scale = _gamma_params(mean, cv)
+        counts = rng.poisson(per_year * years * rates, size=added.shape)
+        added += rng.gamma(counts * shape, scale)
+    crossed = amounts + added >= benchmark_size
+    return np.unique(crossed, axis=0, return_counts=True)
+
+
+def simulate_benchmark_changes(df, maturities, pricing_date, model=None, n_paths=1_000_000, seed=0,
+                               processes=None, chunk_size=100_000, ruleset=None):
+    """
+    Monte Carlo distribution of the ICMA benchmark on pricing_date for each maturity, given
+    random auctions and syndications between the data's close-of-business date and then.
+
+    Gilts redeeming on or before pricing_date drop out of every path. Paths are simulated in
+    fixed-size chunks, each with its own child of np.random.SeedSequence(seed), so results
+    are reproducible for a given seed whatever the number of processes.
+
+    Parameters:
+        df (pd.DataFrame): Conventional gilts, with 'CLOSE_OF_BUSINESS_DATE'.
+        maturities (array-like): New issue maturity dates.
+        pricing_date (str | pd.Timestamp): Expected pricing date of the new issue.
+        model (IssuanceModel): Issuance assumptions; defaults to IssuanceModel().
+        n_paths (int): Number of simulated paths.
+        seed (int): Seed for the random number generator.
+        processes (int): Worker processes; defaults to os.cpu_count(). Use 1 to run in-process.
+        chunk_size (int): Paths per task.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+    Returns:
+        pd.DataFrame: One row per (maturity, possible benchmark) with columns 'MATURITY',
+        'BENCHMARK_ISIN', 'BENCHMARK_REDEMPTION_DATE', 'PROBABILITY' and 'IS_CURRENT'
+        (True for today's benchmark). See change_probabilities().
+
+    Raises:
+        ValueError: If n_paths is below 1, or no gilt in issue at pricing has any auction
+            weight (e.g. model.weights names none of the ISINs in df).
+    """
+    if n_paths < 1:
+        raise ValueError(f"n_paths must be at least 1, got {n_paths}")
+    model = model or IssuanceModel()
+    universe = BaseUniverse(df, ruleset)
+    as_of = np.datetime64(pd.to_datetime(df['CLOSE_OF_BUSINESS_DATE']).max(), 'D')
+    pricing_day = np.datetime64(pd.to_datetime(pricing_date), 'D')
+    years = max((pricing_day - as_of).astype(np.int64), 0) / 365.25
+    maturities = np.asarray(pd.to_datetime(np.asarray(maturities).ravel())).astype('datetime64[D]')
+
+    # Auction weights over the gilts still in issue at pricing
+    in_issue = ~(universe.dates <= pricing_day)
+    weights = np.where(in_issue, 1.0, 0.0)
+    if model.weights is not None:
+        weights = in_issue * np.array([model.weights.get(isin, 0.0) for isin in universe.isins])
+    if not weights.sum() > 0:
+        raise ValueError("No gilt in issue at pricing has any auction weight")
+    rates = weights / weights.sum()
+
+    base_ab = universe.ruleset.is_benchmark(universe.amounts) & universe.appropriate
+    candidates = np.flatnonzero(~base_ab & universe.appropriate & in_issue)
+
+    # Simulate which sub-benchmark gilts cross the threshold, chunk by chunk
+    chunks = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = [(s, n, rates[candidates], universe.amounts[candidates], model, years, universe.ruleset.benchmark_size)
+            for s, n in zip(seeds, chunks)]
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(chunks) == 1:
+        results = [_simulate_crossings(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(min(processes, len(chunks))) as executor:
+            results = list(executor.map(_simulate_crossings, *zip(*args)))
+
+    all_rows = np.concatenate([rows for rows, _ in results])
+    all_counts = np.concatenate([n for _, n in results])
+    outcomes, inverse = np.unique(all_rows, axis=0, return_inverse=True)
+    counts = np.bincount(inverse.ravel(), weights=all_counts, minlength=len(outcomes))
+
+    # Resolve the ladder once per distinct outcome, and once for today's universe
+    def benchmark_rows(ab):
+        index = BenchmarkIndex(universe.dates[ab], np.flatnonzero(ab), universe.ruleset)
+        positions, _ = index.resolve_many(maturities)
+        return np.append(index.isins, -1).astype(np.int64)[positions]
+
+    current = benchmark_rows(base_ab)
+    frames = []
+    for crossed, count in zip(outcomes, counts):
+        ab = base_ab & in_issue
+        ab[candidates[crossed]] = True
+        frames.append(pd.DataFrame({'MATURITY': np.arange(len(maturities)), 'ROW': benchmark_rows(ab),
+                                    'PROBABILITY': count / n_paths}))
+    outcome_df = pd.concat(frames).groupby(['MATURITY', 'ROW'], as_index=False)['PROBABILITY'].sum()
+
+    rows = outcome_df['ROW'].values
+    isins = np.append(universe.isins, None)
+    dates = np.append(universe.dates, np.datetime64('NaT', 'D'))
+    return pd.DataFrame({
+        'MATURITY': maturities[outcome_df['MATURITY'].values].astype('datetime64[s]'),
+        'BENCHMARK_ISIN': isins[rows],
+        'BENCHMARK_REDEMPTION_DATE': dates[rows].astype('datetime64[s]'),
+        'PROBABILITY': outcome_df['PROBABILITY'].values,
+        'IS_CURRENT': rows == current[outcome_df['MATURITY'].values],
+    })
+
+
+def change_probabilities(outcomes):
+    """
+    Probability that the benchmark on the pricing date differs from today's, per maturity.
+
+    Parameters:
+        outcomes (pd.DataFrame): Output of simulate_benchmark_changes().
+
+    Returns:
+        pd.Series: P(change) indexed by maturity.
+    """
+    unchanged = outcomes['PROBABILITY'].where(outcomes['IS_CURRENT'], 0.0)
+    return (1.0 - unchanged.groupby(outcomes['MATURITY']).sum()).clip(lower=0.0).rename('P_CHANGE')
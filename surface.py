@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from benchmark_index import BenchmarkIndex
+from ruleset import get_ruleset
+
+
+class BenchmarkSurface:
+    """
+    ICMA benchmark for every (pricing date, maturity) pair.
+
+    The universe only changes when a gilt is first issued or redeemed (or an exclusion starts
+    or ends), so the surface is stored by "epoch" (a run of pricing dates with the same
+    universe): epoch_rows holds one row of benchmark gilt ids per epoch and epochs maps each
+    pricing date to its epoch.
+    Gilt ids index into isins and redemption_dates; -1 means no benchmark.
+    """
+
+    def __init__(self, pricing_dates, maturities, epochs, epoch_rows, isins, redemption_dates):
+        self.pricing_dates = pricing_dates
+        self.maturities = maturities
+        self.epochs = epochs
+        self.epoch_rows = epoch_rows
+        self.isins = isins
+        self.redemption_dates = redemption_dates
+
+    @property
+    def rows(self):
+        """Dense (pricing dates x maturities) array of benchmark gilt ids."""
+        return self.epoch_rows[self.epochs]
+
+    def isin_matrix(self):
+        """Dense (pricing dates x maturities) array of benchmark ISINs (None where no benchmark)."""
+        return np.append(self.isins, None)[self.rows]
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: Long form, one row per (pricing date, maturity) with columns
+            'PRICING_DATE', 'MATURITY', 'BENCHMARK_ISIN' and 'BENCHMARK_REDEMPTION_DATE'.
+        """
+        rows = self.rows.ravel()
+        dates = np.append(self.redemption_dates, np.datetime64('NaT', 'D'))
+        return pd.DataFrame({
+            'PRICING_DATE': np.repeat(self.pricing_dates, len(self.maturities)).astype('datetime64[s]'),
+            'MATURITY': np.tile(self.maturities, len(self.pricing_dates)).astype('datetime64[s]'),
+            'BENCHMARK_ISIN': np.append(self.isins, None)[rows],
+            'BENCHMARK_REDEMPTION_DATE': dates[rows].astype('datetime64[s]'),
+        })
+
+
+def benchmark_surface(df, pricing_dates, maturities, ruleset=None):
+    """
+    Sweep through pricing dates in time order, adding gilts to the appropriate benchmark set
+    on their FIRST_ISSUE_DATE and removing them on their REDEMPTION_DATE, and resolve the
+    maturity grid once per distinct universe. The ruleset's exclusions start and end on
+    their own effective dates, so each pricing date sees the exclusions in force on it.
+
+    Amounts outstanding are taken from df as they stand; the universe before df's
+    close-of-business date is projected from it, so gilts that had already redeemed by
+    then are not known. Ex-dividend dates are not events: they never change the R7.4 selection.
+
+    Parameters:
+        df (pd.DataFrame): Conventional gilts with 'ISIN_CODE', 'REDEMPTION_DATE',
+            'FIRST_ISSUE_DATE' and 'TOTAL_AMOUNT_IN_ISSUE'.
+        pricing_dates (array-like): Pricing dates (sorted and de-duplicated by this function).
+        maturities (array-like): New issue maturity dates.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+    Returns:
+        BenchmarkSurface: Benchmarks over the (pricing date x maturity) grid.
+    """
+    pricing_days = np.unique(np.asarray(pd.to_datetime(np.asarray(pricing_dates).ravel())).astype('datetime64[D]'))
+    maturities = np.asarray(pd.to_datetime(np.asarray(maturities).ravel())).astype('datetime64[D]')
+
+    ruleset = get_ruleset(ruleset)
+    isins = df['ISIN_CODE'].to_numpy(dtype=object)
+    redemption = np.asarray(df['REDEMPTION_DATE'].values, dtype='datetime64[D]')
+    first_issue = np.asarray(df['FIRST_ISSUE_DATE'].values, dtype='datetime64[D]')
+    ab_ids = np.flatnonzero(ruleset.is_benchmark(df['TOTAL_AMOUNT_IN_ISSUE']) & ~np.isnat(redemption))
+
+    # Universe change events, in time order: (day, gilt id, change to the gilt's blockers). A gilt is
+    # an AB while nothing blocks it: it starts blocked (not yet issued), its first issue unblocks it and
+    # its redemption blocks it again, as does each exclusion from its start up to its end. Gilts without
+    # a first issue date are treated as always having been in issue, and exclusions without a start as
+    # always having applied.
+    blockers = np.ones(len(isins), dtype=np.int64)
+    enter = np.where(np.isnat(first_issue[ab_ids]), np.datetime64('0001-01-01', 'D'), first_issue[ab_ids])
+    event_days, event_ids = [enter, redemption[ab_ids]], [ab_ids, ab_ids]
+    event_kinds = [np.full(len(ab_ids), -1), np.full(len(ab_ids), 1)]
+    ab_positions = {isin: gilt for gilt, isin in zip(ab_ids, isins[ab_ids])}
+    for exclusion in ruleset.exclusions:
+        gilt = ab_positions.get(exclusion.isin)
+        if gilt is None:
+            continue
+        for day, kind in [(exclusion.start, 1), (exclusion.end, -1)]:
+            if day is not None:
+                event_days.append([np.datetime64(day, 'D')])
+                event_ids.append([gilt])
+                event_kinds.append([kind])
+        if exclusion.start is None:
+            blockers[gilt] += 1
+    event_days = np.concatenate(event_days).astype('datetime64[D]')
+    event_ids, event_kinds = np.concatenate(event_ids), np.concatenate(event_kinds)
+    order = np.argsort(event_days, kind='stable')
+    event_days, event_ids, event_kinds = event_days[order], event_ids[order], event_kinds[order]
+
+    # Each pricing date falls in the epoch after all events on or before it
+    epoch_of_day = np.searchsorted(event_days, pricing_days, side='right')
+    used_epochs, epochs = np.unique(epoch_of_day, return_inverse=True)
+
+    # Sorted AB redemption dates (and gilt ids) in issue, updated incrementally as events are swept
+    active_dates = np.empty(0, dtype='datetime64[D]')
+    active_ids = np.empty(0, dtype=np.int64)
+    applied = 0
+    epoch_rows = np.empty((len(used_epochs), len(maturities)), dtype=np.int32)
+
+    for e, epoch in enumerate(used_epochs):
+        for gilt, kind in zip(event_ids[applied:epoch], event_kinds[applied:epoch]):
+            blockers[gilt] += kind
+            if blockers[gilt] == 0:
+                position = np.searchsorted(active_dates, redemption[gilt], side='right')
+                active_dates = np.insert(active_dates, position, redemption[gilt])
+                active_ids = np.insert(active_ids, position, gilt)
+            elif blockers[gilt] == 1 and kind > 0:
+                keep = active_ids != gilt
+                active_dates, active_ids = active_dates[keep], active_ids[keep]
+        applied = epoch
+
+        index = BenchmarkIndex(active_dates, active_ids, ruleset)
+        positions, _ = index.cliff_edges().resolve_many(maturities)
+        epoch_rows[e] = np.append(index.isins, -1).astype(np.int64)[positions]
+
+    return BenchmarkSurface(pricing_days, maturities, epochs.astype(np.int32), epoch_rows, isins, redemption)
@@ -0,0 +1,215 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from benchmark_index import BenchmarkIndex, _to_days
+from universe import GiltUniverse
+
+# GiltUniverse arrays published to the workers; the small interned tables are pickled once instead
+UNIVERSE_ARRAYS = ["isin_codes", "days", "amounts", "type_codes", "flags"]
+
+
+# ---- Shared Arrays ----
+def _allocate(shape, dtype):
+    """
+    Create an uninitialised array in a new shared memory block.
+
+    Returns:
+        tuple: (SharedMemory, np.ndarray view, spec) where spec = (name, dtype, shape) lets another
+        process attach.
+    """
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf), (shm.name, dtype.str, shape)
+
+
+def _publish(array):
+    """
+    Copy an array into a new shared memory block.
+
+    Returns:
+        tuple: (SharedMemory, spec) as for _allocate.
+    """
+    array = np.asarray(array)
+    shm, view, spec = _allocate(array.shape, array.dtype)
+    view[...] = array
+    return shm, spec
+
+
+def _attach(spec):
+    """Attach to a published array without copying. Returns (SharedMemory, np.ndarray view)."""
+    name, dtype, shape = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+def _release(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+# ---- Workers ----
+# Set once per worker process by _init_worker
+_worker_blocks = []
+_worker_index = None
+
+
+def _init_worker(specs, isin_table, type_table, ruleset):
+    """Attach to the shared universe and build this worker's index over it."""
+    global _worker_blocks, _worker_index
+    arrays = {}
+    for name, spec in specs.items():
+        shm, arrays[name] = _attach(spec)
+        _worker_blocks.append(shm)
+    universe = GiltUniverse(arrays['isin_codes'], isin_table, arrays['days'], arrays['amounts'],
+                            arrays['type_codes'], type_table, arrays['flags'], ruleset)
+    dates, _, rows = universe.appropriate_benchmarks()
+    _worker_index = BenchmarkIndex(dates, rows, ruleset)  # 'isins' hold row ids into the universe
+    _worker_index._day_table()
+
+
+def _resolve_range(specs, start, stop):
+    """
+    Resolve maturities[start:stop] into the shared rows/rules buffers. The sweep's buffers are
+    attached for this range only, so between sweeps a worker maps nothing but the universe.
+    """
+    blocks, views = zip(*[_attach(spec) for spec in specs])
+    maturities, rows, rules = views
+    positions, rules[start:stop] = _worker_index.resolve_many(maturities[start:stop])
+    rows[start:stop] = np.append(_worker_index.isins, -1).astype(np.int32)[positions]
+    del views, maturities, rows, rules  # drop the views so the blocks can be closed
+    for shm in blocks:
+        shm.close()
+    return stop - start
+
+
+# ---- Executor ----
+class SweepExecutor:
+    """
+    Resolves the ICMA benchmark for large maturity grids across a process pool.
+
+    The universe's column arrays are published once into multiprocessing.shared_memory.
+    Each worker attaches to them without copying and builds its own BenchmarkIndex when
+    the pool starts. A sweep copies the maturities into a shared buffer once. Tasks are
+    then just (start, stop) ranges: each worker resolves its slice and writes the
+    benchmark rows and rule codes straight into shared output buffers, so nothing but
+    the range bounds is pickled per task.
+
+    Use as a context manager, so the pool and shared memory are released:
+        with SweepExecutor(universe, processes=8) as executor:
+            rows, rules = executor.resolve(maturities)
+    """
+
+    def __init__(self, universe, processes=None, chunk_size=1_000_000, ruleset=None):
+        """
+        Parameters:
+            universe (GiltUniverse | pd.DataFrame): Conventional gilts.
+            processes (int): Worker processes; defaults to os.cpu_count().
+            chunk_size (int): Most maturities per task.
+            ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET (or the
+                universe's own ruleset).
+        """
+        if not isinstance(universe, GiltUniverse):
+            universe = GiltUniverse.from_dataframe(universe, ruleset)
+        elif ruleset is not None and ruleset != universe.ruleset:
+            universe = universe.with_ruleset(ruleset)
+        self.universe = universe
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self._blocks, specs = [], {}
+        try:
+            for name in UNIVERSE_ARRAYS:
+                shm, specs[name] = _publish(getattr(universe, name))
+                self._blocks.append(shm)
+            self._executor = ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                                 initargs=(specs, universe.isin_table, universe.type_table,
+                                                           universe.ruleset))
+            # Start the workers now: forked during a sweep, they would inherit its buffers' mappings for good
+            self._executor.submit(int).result()
+        except BaseException:
+            _release(self._blocks)
+            raise
+
+    def resolve(self, maturities):
+        """
+        Resolve every maturity.
+
+        Parameters:
+            maturities (array-like): New issue maturity dates (NaT is allowed).
+
+        Returns:
+            tuple: (np.ndarray of benchmark row ids into the universe or -1, np.ndarray of rule codes
+            indexing RULE_NAMES).
+        """
+        days = _to_days(maturities)
+        n = len(days)
+        if n == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8)
+
+        blocks = []
+        try:
+            shm, specs = _publish(days)
+            blocks.append(shm)
+            specs, outputs = [specs], []
+            for dtype in [np.int32, np.int8]:
+                shm, view, spec = _allocate(n, dtype)
+                blocks.append(shm)
+                outputs.append(view)
+                specs.append(spec)
+
+            # At least one task per worker, at most chunk_size maturities each
+            tasks = max(self.processes, -(-n // self.chunk_size))
+            bounds = np.linspace(0, n, min(tasks, n) + 1).astype(np.int64)
+            futures = [self._executor.submit(_resolve_range, specs, int(start), int(stop))
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            wait(futures)
+            for future in futures:
+                future.result()  # re-raise any worker error
+
+            rows, rules = (output.copy() for output in outputs)
+            del view, outputs  # drop the views so the blocks can be closed
+        finally:
+            _release(blocks)
+        return rows, rules
+
+    def benchmarks(self, maturities):
+        """
+        Parallel equivalent of rules_engine.get_icma_benchmarks.
+
+        Returns:
+            pd.DataFrame: One row per maturity with columns 'MATURITY', 'BENCHMARK_REDEMPTION_DATE',
+            'BENCHMARK_ISIN' (categorical) and 'RULE' (categorical).
+        """
+        days = _to_days(maturities)
+        rows, rules = self.resolve(days)
+        return self.universe.benchmark_frame(days, rows, rules)
+
+    def shutdown(self):
+        self._executor.shutdown()
+        _release(self._blocks)
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def parallel_benchmarks(df, maturities, processes=None, chunk_size=1_000_000, ruleset=None):
+    """
+    One-off parallel sweep: get_icma_benchmarks(df, maturities) across a process pool.
+
+    Parameters:
+        df (pd.DataFrame | GiltUniverse): Conventional gilts.
+        maturities (array-like): New issue maturity dates.
+        processes (int): Worker processes; defaults to os.cpu_count().
+        chunk_size (int): Most maturities per task.
+        ruleset (Ruleset): As for SweepExecutor.
+
+    Returns:
+        pd.DataFrame: As rules_engine.get_icma_benchmarks.
+    """
+    with SweepExecutor(df, processes, chunk_size, ruleset) as executor:
+        return executor.benchmarks(maturities)
@@ -1,43 +1,34 @@
 import pandas as pd
-import rules_engine as re
 import data_processing as dp
+from result_cache import ResultCache
+from universe import GiltUniverse
 
 # Load and filter data
 df = dp.load_data()
 df = dp.filter_conventional_gilts(df)
+universe = GiltUniverse.from_dataframe(df)
 
 # Generate a date range from today to a specified end date
 start_date = pd.to_datetime("today").normalize()
 end_date = pd.to_datetime('2030-01-01').normalize()
 date_range = pd.date_range(start=start_date, end=end_date, freq='D')
 
-# Create a new DataFrame to store results
-benchmark_results = pd.DataFrame({'DATE': date_range})
-icma_benchmarks = []
-
-# Loop through each date and print progress
-for i, date in enumerate(date_range):
-    formatted_date = date.strftime('%Y-%m-%d')
-    benchmark = re.get_icma_benchmark(df, formatted_date)
-
-    # Print progress
-    print(f"Processing {i + 1}/{len(date_range)}: Date = {formatted_date}, ICMA Benchmark = {benchmark}")
-
-    icma_benchmarks.append(benchmark)
-
-# Store results in DataFrame
-benchmark_results['ICMA_BENCHMARK'] = icma_benchmarks
-
-# Count how many dates have None as the ICMA benchmark result
-none_count = benchmark_results['ICMA_BENCHMARK'].isna().sum()
+# Resolve every date, reusing results cached by earlier runs (only new dates are computed)
+cache = ResultCache()
+benchmark_results = cache.benchmarks(universe, date_range).rename(columns={'MATURITY': 'DATE'})
+benchmark_results['ICMA_BENCHMARK'] = benchmark_results['BENCHMARK_REDEMPTION_DATE']
+print(benchmark_results)
 
+# Count dates with no ICMA benchmark and find the gilts used as a benchmark, from the cached columns
+report = cache.coverage(universe, date_range)
+none_count = report.no_benchmark
 
 # Identify which gilts have not been used as a benchmark
-unused_gilts = df[~df['REDEMPTION_DATE'].isin(benchmark_results['ICMA_BENCHMARK'].dropna())]
-used_gilts = df[df['REDEMPTION_DATE'].isin(benchmark_results['ICMA_BENCHMARK'].dropna())]
+unused_gilts = df[~report.used]
+used_gilts = df[report.used]
 # Display results
 print(f"Number of dates with no ICMA benchmark result: {none_count}")
-none_pct = none_count / len(benchmark_results)
+none_pct = report.no_benchmark_share
 print(f'No benchmark found {none_pct} of the time.')
 print(used_gilts.head(20))
-print(unused_gilts.head(20))
\ No newline at end of file
+print(unused_gilts.head(20))
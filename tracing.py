@@ -0,0 +1,179 @@
+import json
+import contextlib
+from collections import Counter, defaultdict
+from benchmark_index import _to_day
+
+# The tracer the rule engine reports to; None (the default) skips all instrumentation
+active = None
+
+
+class Tracer:
+    """
+    Hook protocol for the rule engine. Subclass and override the events of interest;
+    every method here does nothing.
+
+    Events are reported after a selection completes, so tracing never changes the
+    result. 'candidates' is the count the branch condition tests (e.g. the number of
+    ABs in the same calendar year for R7.4(a)) as that entry point computes it.
+    """
+
+    def rule_evaluated(self, entry_point, maturity, rule, candidates):
+        """An R7.4 branch was tested, in order, up to and including the one that fired."""
+
+    def rule_fired(self, entry_point, maturity, rule, elapsed_ns):
+        """A selection finished; rule is 'None' if no benchmark was found."""
+
+    def batch_resolved(self, entry_point, rule_counts, elapsed_ns):
+        """A vectorised lookup finished; rule_counts maps each rule to the number of maturities it decided."""
+
+
+def set_tracer(tracer):
+    """
+    Install tracer for the rule engine (None to switch tracing off).
+
+    Returns:
+        Tracer: The previously installed tracer.
+    """
+    global active
+    previous, active = active, tracer
+    return previous
+
+
+@contextlib.contextmanager
+def tracing(tracer):
+    """Install tracer for the duration of a with block."""
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+
+
+def report_selection(tracer, entry_point, maturity, evaluated, rule, elapsed_ns):
+    """
+    Emit rule_evaluated for each branch tested, then rule_fired.
+
+    Parameters:
+        evaluated (list of tuple): (rule, candidates) for each branch tested, in evaluation order: the
+            ruleset's branches up to and including the one that decided.
+    """
+    for branch, candidates in evaluated:
+        tracer.rule_evaluated(entry_point, maturity, branch, candidates)
+    tracer.rule_fired(entry_point, maturity, rule, elapsed_ns)
+
+
+# ---- Sinks ----
+class MultiTracer(Tracer):
+    """Forwards every event to several tracers, e.g. a CounterSink and a JsonLinesSink."""
+
+    def __init__(self, *tracers):
+        self.tracers = tracers
+
+    def rule_evaluated(self, *args):
+        for tracer in self.tracers:
+            tracer.rule_evaluated(*args)
+
+    def rule_fired(self, *args):
+        for tracer in self.tracers:
+            tracer.rule_fired(*args)
+
+    def batch_resolved(self, *args):
+        for tracer in self.tracers:
+            tracer.batch_resolved(*args)
+
+
+class CounterSink(Tracer):
+    """
+    Aggregates events in memory: how often each branch was evaluated and fired per entry
+    point, with histograms of candidate counts and elapsed time (power-of-two ns buckets).
+    """
+
+    def __init__(self):
+        self.evaluated = Counter()  # (entry_point, rule) -> count
+        self.fired = Counter()  # (entry_point, rule) -> count
+        self.elapsed_ns = Counter()  # (entry_point, rule) -> total ns
+        self.candidates = defaultdict(Counter)  # rule -> {candidate count: occurrences}
+        self.latency = defaultdict(Counter)  # (entry_point, rule) -> {bucket upper bound ns: count}
+        self.batch_ns = Counter()  # entry_point -> total ns spent in vectorised lookups
+
+    def rule_evaluated(self, entry_point, maturity, rule, candidates):
+        self.evaluated[entry_point, rule] += 1
+        self.candidates[rule][candidates] += 1
+
+    def rule_fired(self, entry_point, maturity, rule, elapsed_ns):
+        self.fired[entry_point, rule] += 1
+        self.elapsed_ns[entry_point, rule] += elapsed_ns
+        self.latency[entry_point, rule][1 << int(elapsed_ns).bit_length()] += 1
+
+    def batch_resolved(self, entry_point, rule_counts, elapsed_ns):
+        for rule, count in rule_counts.items():
+            self.fired[entry_point, rule] += count
+        self.batch_ns[entry_point] += elapsed_ns
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: One row per (entry point, rule) with columns 'ENTRY_POINT', 'RULE',
+            'EVALUATED', 'FIRED', 'SHARE' (of the entry point's selections), 'TOTAL_NS' and
+            'MEAN_NS'. Selections made by batch lookups count as fired, but their time is only
+            in batch_ns, so TOTAL_NS/MEAN_NS cover per-maturity calls only.
+        """
+        import pandas as pd
+
+        keys = sorted(set(self.evaluated) | set(self.fired))
+        df = pd.DataFrame({
+            'ENTRY_POINT': [entry_point for entry_point, _ in keys],
+            'RULE': [rule for _, rule in keys],
+            'EVALUATED': [self.evaluated[k] for k in keys],
+            'FIRED': [self.fired[k] for k in keys],
+            'TOTAL_NS': [self.elapsed_ns[k] for k in keys],
+        })
+        df['SHARE'] = df['FIRED'] / df.groupby('ENTRY_POINT')['FIRED'].transform('sum')
+        df['MEAN_NS'] = (df['TOTAL_NS'] / df['FIRED']).where(df['TOTAL_NS'] > 0)
+        return df
+
+
+class JsonLinesSink(Tracer):
+    """
+    Writes one JSON object per event, e.g.
+    {"event": "rule_fired", "entry_point": "get_icma_benchmark", "maturity": "2030-01-07", ...}.
+    """
+
+    def __init__(self, file):
+        """
+        Parameters:
+            file (str | file object): Path to write to (opened for append), or an open text file.
+        """
+        self._owns_file = isinstance(file, str)
+        self.file = open(file, "a", encoding="utf-8") if self._owns_file else file
+
+    def _write(self, **event):
+        maturity = event.get("maturity")
+        if maturity is not None:
+            event["maturity"] = str(_to_day(maturity))
+        self.file.write(json.dumps(event) + "\n")
+
+    def rule_evaluated(self, entry_point, maturity, rule, candidates):
+        self._write(event="rule_evaluated", entry_point=entry_point, maturity=maturity, rule=rule,
+                    candidates=int(candidates))
+
+    def rule_fired(self, entry_point, maturity, rule, elapsed_ns):
+        self._write(event="rule_fired", entry_point=entry_point, maturity=maturity, rule=rule,
+                    elapsed_ns=int(elapsed_ns))
+
+    def batch_resolved(self, entry_point, rule_counts, elapsed_ns):
+        self._write(event="batch_resolved", entry_point=entry_point,
+                    rule_counts={rule: int(count) for rule, count in rule_counts.items()},
+                    elapsed_ns=int(elapsed_ns))
+
+    def close(self):
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,260 @@
+import os
+import json
+import tempfile
+import hashlib
+import numpy as np
+from benchmark_index import BenchmarkIndex, RULE_NAMES
+from ruleset import Ruleset, get_ruleset
+
+# ---- Flags ----
+# Bits of GiltUniverse.flags
+IS_BENCHMARK = 1  # TOTAL_AMOUNT_IN_ISSUE >= ruleset.benchmark_size
+IS_APPROPRIATE = 2  # Not excluded by the ruleset
+IS_CONVENTIONAL = 4  # INSTRUMENT_TYPE is 'Conventional'
+IS_AB = IS_BENCHMARK | IS_APPROPRIATE
+
+NAT_DAY = np.iinfo(np.int32).min  # Day ordinal of a missing date
+
+
+def instrument_types(types):
+    """
+    INSTRUMENT_TYPE values ready to compare, e.g. with 'Conventional'.
+    .strip() is required since DMO leaves a ' ' (space) after Conventional in raw data!
+
+    Parameters:
+        types (pd.Series): Raw INSTRUMENT_TYPE column.
+
+    Returns:
+        pd.Series
+    """
+    return types.str.strip()
+
+
+def _days(values):
+    """Dates as int32 days since 1970-01-01 (NAT_DAY where missing)."""
+    days = np.asarray(values).astype('datetime64[D]').astype(np.int64)
+    days[days == np.iinfo(np.int64).min] = NAT_DAY
+    return days.astype(np.int32)
+
+
+class GiltUniverse:
+    """
+    The gilt fields the rules engine needs, as contiguous NumPy arrays: int32 day ordinals
+    for redemption dates, float64 amounts, int32 codes into an interned table of ISINs
+    (and of instrument types) and a uint8 bitmask of the R7.3 flags (IS_BENCHMARK,
+    IS_APPROPRIATE, as decided by the universe's ruleset) and IS_CONVENTIONAL.
+
+    Names and dividend text are not held, so a universe is a fraction of the size of the
+    D1A DataFrame and filtering it is a single mask over a few arrays. rules_engine's
+    get_rule_matrices, get_icma_benchmark, get_icma_benchmarks and get_cliff_edges accept
+    a GiltUniverse wherever they take a DataFrame.
+    """
+
+    def __init__(self, isin_codes, isin_table, days, amounts, type_codes, type_table, flags, ruleset=None):
+        self.isin_codes = isin_codes
+        self.isin_table = isin_table
+        self.days = days
+        self.amounts = amounts
+        self.type_codes = type_codes
+        self.type_table = type_table
+        self.flags = flags
+        self.ruleset = get_ruleset(ruleset)
+        self._ab = None
+
+    @classmethod
+    def from_dataframe(cls, df, ruleset=None):
+        """
+        Parameters:
+            df (pd.DataFrame): Gilts with 'ISIN_CODE', 'REDEMPTION_DATE' and 'TOTAL_AMOUNT_IN_ISSUE',
+                and optionally 'INSTRUMENT_TYPE'. A float64 amount column is shared, not copied.
+            ruleset (Ruleset): Sets the R7.3 flags and the R7.4 branches; defaults to DEFAULT_RULESET.
+
+        Returns:
+            GiltUniverse: The same gilts, in the same order.
+        """
+        import pandas as pd
+
+        isin_codes, isin_table = pd.factorize(df['ISIN_CODE'], use_na_sentinel=True)
+        amounts = df['TOTAL_AMOUNT_IN_ISSUE'].to_numpy(dtype=np.float64)
+        if 'INSTRUMENT_TYPE' in df:
+            type_codes, type_table = pd.factorize(instrument_types(df['INSTRUMENT_TYPE']))
+        else:
+            type_codes, type_table = np.full(len(df), -1), []
+        type_table = np.asarray(type_table, dtype=object)
+        conventional = np.flatnonzero(type_table == 'Conventional')
+
+        flags = np.zeros(len(df), dtype=np.uint8)
+        flags[np.isin(type_codes, conventional)] |= IS_CONVENTIONAL
+        universe = cls(isin_codes.astype(np.int32), np.asarray(isin_table, dtype=object),
+                       _days(df['REDEMPTION_DATE'].values), amounts, type_codes.astype(np.int8), type_table, flags)
+        return universe.with_ruleset(get_ruleset(ruleset).for_data(df))
+
+    def with_ruleset(self, ruleset=None):
+        """
+        The same gilts with the R7.3 flags (IS_BENCHMARK, IS_APPROPRIATE) set by another ruleset.
+        Only the flags array is new; the other arrays are shared.
+
+        Parameters:
+            ruleset (Ruleset): Defaults to DEFAULT_RULESET. Without an as_of of its own, dated
+                exclusions are evaluated at the date this universe's were.
+
+        Returns:
+            GiltUniverse
+        """
+        ruleset = get_ruleset(ruleset)
+        if ruleset.as_of is None and ruleset.dated:
+            ruleset = ruleset.on(self.ruleset.as_of)
+        flags = self.flags & ~np.uint8(IS_AB)
+        flags[ruleset.is_benchmark(self.amounts)] |= IS_BENCHMARK
+        flags[ruleset.is_appropriate(self.isins)] |= IS_APPROPRIATE
+        return GiltUniverse(self.isin_codes, self.isin_table, self.days, self.amounts,
+                            self.type_codes, self.type_table, flags, ruleset)
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: Columns 'ISIN_CODE' and 'INSTRUMENT_TYPE' (categoricals over the interned
+            tables, so no strings are copied), 'REDEMPTION_DATE' and 'TOTAL_AMOUNT_IN_ISSUE' (the
+            universe's own amount array).
+        """
+        import pandas as pd
+
+        return pd.DataFrame({
+            'INSTRUMENT_TYPE': pd.Categorical.from_codes(self.type_codes, self.type_table),
+            'ISIN_CODE': pd.Categorical.from_codes(self.isin_codes, self.isin_table),
+            'REDEMPTION_DATE': self.redemption_dates.astype('datetime64[s]'),
+            'TOTAL_AMOUNT_IN_ISSUE': self.amounts,
+        }, copy=False)
+
+    def save(self, path, **metadata):
+        """
+        Write the universe to an .npz file (replaced atomically), so later runs can load it
+        with numpy alone.
+
+        Parameters:
+            path (str): File to write.
+            **metadata (str | int): Extra scalars stored alongside, e.g. the source file's signature.
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A temporary file of this writer's own, written through the open file so np.savez adds no suffix
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, isin_codes=self.isin_codes, isin_table=self.isin_table.astype(str), days=self.days,
+                         amounts=self.amounts, type_codes=self.type_codes, type_table=self.type_table.astype(str),
+                         flags=self.flags, ruleset=self.ruleset.to_json(),
+                         **{f"meta_{key}": np.asarray(value) for key, value in metadata.items()})
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a universe written by save().
+
+        Returns:
+            tuple: (GiltUniverse, dict of the metadata passed to save()).
+        """
+        with np.load(path, allow_pickle=False) as data:
+            ruleset = Ruleset.from_dict(json.loads(data['ruleset'].item())) if 'ruleset' in data.files else None
+            universe = cls(data['isin_codes'], data['isin_table'].astype(object), data['days'], data['amounts'],
+                           data['type_codes'], data['type_table'].astype(object), data['flags'], ruleset)
+            metadata = {key[5:]: data[key].item() for key in data.files if key.startswith("meta_")}
+        return universe, metadata
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, rows):
+        """The gilts selected by a boolean mask or array of positions, sharing the interned tables."""
+        return GiltUniverse(self.isin_codes[rows], self.isin_table, self.days[rows], self.amounts[rows],
+                            self.type_codes[rows], self.type_table, self.flags[rows], self.ruleset)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the per-gilt arrays (the interned tables are not counted)."""
+        return sum(a.nbytes for a in [self.isin_codes, self.days, self.amounts, self.type_codes, self.flags])
+
+    @property
+    def fingerprint(self):
+        """Short hash of the gilts (ISINs, redemption dates, amounts and flags), for cache keys."""
+        digest = hashlib.sha256("\n".join(self.isin_table.astype(str)).encode())
+        for array in [self.isin_codes, self.days, self.amounts, self.flags]:
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:16]
+
+    # ---- Fields ----
+    @property
+    def isins(self):
+        """ISIN codes as an object array (None where missing)."""
+        return np.append(self.isin_table, None)[self.isin_codes]
+
+    @property
+    def redemption_dates(self):
+        """Redemption dates as datetime64[D] (NaT where missing)."""
+        dates = self.days.astype('datetime64[D]')
+        dates[self.days == NAT_DAY] = np.datetime64('NaT', 'D')
+        return dates
+
+    def has(self, flag):
+        """Boolean mask of the gilts with every bit of flag set, e.g. universe.has(IS_AB)."""
+        return (self.flags & flag) == flag
+
+    def conventional(self):
+        """The conventional gilts only (as dp.filter_conventional_gilts)."""
+        return self[self.has(IS_CONVENTIONAL)]
+
+    def appropriate_benchmarks(self):
+        """
+        The ABs with a redemption date, as used by every R7.4 branch. Cached.
+
+        Returns:
+            tuple: (redemption dates as datetime64[D], months since 1970-01 as int32, row ids),
+            all sorted by redemption date.
+        """
+        if self._ab is None:
+            rows = np.flatnonzero(self.has(IS_AB) & (self.days != NAT_DAY))
+            rows = rows[np.argsort(self.days[rows], kind='stable')]
+            dates = self.days[rows].astype('datetime64[D]')
+            self._ab = (dates, dates.astype('datetime64[M]').astype(np.int32), rows)
+        return self._ab
+
+    def benchmark_index(self):
+        """
+        Returns:
+            BenchmarkIndex: Index over the appropriate benchmarks (as BenchmarkIndex.from_dataframe).
+        """
+        dates, _, rows = self.appropriate_benchmarks()
+        return BenchmarkIndex(dates, self.isins[rows], self.ruleset)
+
+    def benchmark_frame(self, maturities, rows, rules):
+        """
+        Benchmarks given as row ids into this universe, in the layout of rules_engine.get_icma_benchmarks.
+
+        Parameters:
+            maturities (np.ndarray): New issue maturities as datetime64[D].
+            rows (np.ndarray): Benchmark row id per maturity, -1 for none.
+            rules (np.ndarray): Rule code per maturity, indexing RULE_NAMES.
+
+        Returns:
+            pd.DataFrame: One row per maturity with columns 'MATURITY', 'BENCHMARK_REDEMPTION_DATE',
+            'BENCHMARK_ISIN' (categorical) and 'RULE' (categorical).
+        """
+        import pandas as pd
+
+        dates = np.append(self.redemption_dates, np.datetime64('NaT', 'D'))
+
+        # Same categories as get_icma_benchmarks: the sorted ISINs of the ABs
+        ab_rows = self.appropriate_benchmarks()[2]
+        isin_categories, codes = np.unique(self.isins[ab_rows].astype(str), return_inverse=True)
+        isin_codes = np.full(len(self) + 1, -1, dtype=np.int64)  # row -1 picks the trailing -1
+        isin_codes[ab_rows] = codes
+        return pd.DataFrame({
+            'MATURITY': maturities.astype('datetime64[s]'),
+            'BENCHMARK_REDEMPTION_DATE': dates[rows].astype('datetime64[s]'),
+            'BENCHMARK_ISIN': pd.Categorical.from_codes(isin_codes[rows], isin_categories),
+            'RULE': pd.Categorical.from_codes(rules, RULE_NAMES),
+        })
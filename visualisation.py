@@ -2,8 +2,16 @@ import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import numpy as np
 import pandas as pd
+import os
 import calendar
+import tempfile
+import contextlib
 import re  # For regex-based name processing
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from rules_engine import get_rule_matrices
+from ruleset import get_ruleset
 
 
 def format_gilt_labels(df):
@@ -31,7 +39,7 @@ def format_gilt_labels(df):
 
     return formatted_labels
 
-def show_gilts(df, new_issue_maturity_str):
+def show_gilts(df, new_issue_maturity_str, ruleset=None):
     """
     Plots a bar chart of total amount in issue for each gilt
     and a corresponding table with benchmark rules.
@@ -39,6 +47,7 @@ def show_gilts(df, new_issue_maturity_str):
     Parameters:
         df (pd.DataFrame): DataFrame containing gilt data.
         new_issue_maturity_str (str): New issue maturity date as a string ('YYYY-MM-DD').
+        ruleset (Ruleset): The ruleset the rule columns were computed with (for the benchmark size line).
     """
     gilt_labels = format_gilt_labels(df)
     amounts = df['TOTAL_AMOUNT_IN_ISSUE']
@@ -52,7 +61,7 @@ def show_gilts(df, new_issue_maturity_str):
 
     # ----- Bar Chart -----
     ax_chart.bar(bar_positions, amounts, color=bar_colors, edgecolor='k')
-    ax_chart.axhline(10_000, color='crimson', linestyle='--', linewidth=1)
+    ax_chart.axhline(get_ruleset(ruleset).benchmark_size, color='crimson', linestyle='--', linewidth=1)
     ax_chart.set_xlim(-0.5, len(gilt_labels) - 0.5)
     ax_chart.set_xticks(bar_positions)
     ax_chart.set_xticklabels(gilt_labels, rotation=90, fontsize=8)
@@ -130,4 +139,345 @@ def show_gilts(df, new_issue_maturity_str):
     plt.tight_layout()
     plt.subplots_adjust(hspace=0.7)
     plt.savefig("figures/plot.svg")
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+def show_cliff_edges(cliff_edges):
+    """
+    Plots the ICMA benchmark redemption date against new issue maturity as a step chart,
+    coloured by the R7.4 rule responsible for each interval, with every cliff-edge marked.
+
+    Parameters:
+        cliff_edges (pd.DataFrame): Output of rules_engine.get_cliff_edges().
+    """
+    rule_colors = {
+        'R7.4(a)': 'tab:blue',
+        'R7.4(b)': 'tab:orange',
+        'R7.4(c)(i)': 'tab:green',
+        'R7.4(c)(ii)': 'tab:purple',
+        'R7.4(c)(iii)': 'tab:red',
+    }
+
+    starts = cliff_edges['START']
+    # The last interval is open-ended, so draw it for one year
+    ends = cliff_edges['END'].fillna(starts.iloc[-1] + pd.DateOffset(years=1))
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    labelled = set()
+    for start, end, benchmark_date, rule in zip(starts, ends, cliff_edges['BENCHMARK_REDEMPTION_DATE'],
+                                                cliff_edges['RULE']):
+        if pd.isna(benchmark_date):
+            continue
+        label = rule if rule not in labelled else None
+        labelled.add(rule)
+        ax.hlines(benchmark_date, start, end + pd.Timedelta(days=1), color=rule_colors.get(rule, 'k'),
+                  linewidth=3, label=label)
+        ax.axvline(start, color='grey', linestyle=':', linewidth=0.5)
+
+    ax.set_xlabel("New Issue Maturity")
+    ax.set_ylabel("ICMA Benchmark Redemption Date")
+    ax.grid(linestyle='--', alpha=0.7)
+    ax.legend(title="Rule")
+
+    plt.tight_layout()
+    plt.savefig("figures/cliff_edges.svg")
+    plt.show()
+
+
+# ---- Batch Rendering ----
+TABLE_ROWS = ['IS_BENCHMARK', 'IS_APPROPRIATE', 'IS_AB',
+              'SAME_YEAR',
+              'UNIQUE_SAME_YEAR',
+              'NEAREST_SHORTER',
+              'SAME_YEAR_AND_MONTH', 'NEAREST_SHORTER_CAL_YR', 'NEAREST_LONGER_CAL_YR',
+              'ICMA_BENCHMARK']
+STATIC_ROWS = 3  # IS_BENCHMARK, IS_APPROPRIATE and IS_AB do not depend on the maturity
+
+
+def _cell_style(row, values):
+    """Cell symbols and colours for one table row, as drawn by show_gilts."""
+    if row < STATIC_ROWS:
+        return np.where(values, '✓', '✗'), np.where(values, 'lime', 'red')
+    true_color = 'blue' if TABLE_ROWS[row] == 'ICMA_BENCHMARK' else 'lime'
+    return np.where(values, '•', ''), np.where(values, true_color, 'whitesmoke')
+
+
+class GiltChart:
+    """
+    The show_gilts chart on a headless Agg canvas, built once and then updated per maturity.
+
+    The bars, tick labels and table are created in __init__; update() only moves the
+    benchmark marker and its label, recolours the table cells whose flags changed and
+    sets the title, so rendering a ladder of maturities does not rebuild the figure.
+    """
+
+    def __init__(self, df, maturity, flags, figsize=(12, 8), dpi=100, ruleset=None):
+        """
+        Parameters:
+            df (pd.DataFrame): Conventional gilts (no rule columns needed).
+            maturity (str | pd.Timestamp): First new issue maturity to show.
+            flags (dict): TABLE_ROWS name -> boolean array over df's gilts for that maturity,
+                e.g. one column of rules_engine.get_rule_matrices().
+            figsize (tuple): Figure size in inches.
+            dpi (int): Resolution of raster output.
+            ruleset (Ruleset): The ruleset the flags were computed with (for the benchmark size line).
+        """
+        self.amounts = df['TOTAL_AMOUNT_IN_ISSUE'].to_numpy(dtype=float)
+        gilt_labels = format_gilt_labels(df)
+        bar_positions = np.arange(len(gilt_labels))
+
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        ax_chart, ax_table = self.figure.subplots(2, 1, gridspec_kw={'height_ratios': [3, 1]})
+
+        # ----- Bar Chart (static) -----
+        ax_chart.bar(bar_positions, self.amounts, color=np.where(flags['IS_BENCHMARK'], 'lime', 'crimson'),
+                     edgecolor='k')
+        ax_chart.axhline(get_ruleset(ruleset).benchmark_size, color='crimson', linestyle='--', linewidth=1)
+        ax_chart.set_xlim(-0.5, len(gilt_labels) - 0.5)
+        ax_chart.set_xticks(bar_positions)
+        ax_chart.set_xticklabels(gilt_labels, rotation=90, fontsize=8)
+        ax_chart.set_ylabel("Amount Outstanding (£bn)")
+        ax_chart.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, _: f"£{x / 1000:.0f} bn"))
+        ax_chart.grid(axis='y', linestyle='--', alpha=0.7)
+        ax_chart.set_ylim(0, self.amounts.max() * 1.25 if len(self.amounts) else 1)
+
+        # ----- Per-maturity artists -----
+        self.marker, = ax_chart.plot([], [], linestyle='none', color='blue', marker='v', markersize=10,
+                                     label="New Issue Date")
+        self.label = ax_chart.text(0, 0, "", color='blue', ha='center', fontsize=9)
+        self.title = ax_chart.set_title("")
+
+        # ----- Table -----
+        self._shown = np.array([flags[row] for row in TABLE_ROWS], dtype=bool)
+        styles = [_cell_style(i, values) for i, values in enumerate(self._shown)]
+        ax_table.axis('off')
+        self.table = ax_table.table(
+            cellText=[list(text) for text, _ in styles],
+            cellColours=[list(colors) for _, colors in styles],
+            rowLabels=TABLE_ROWS,
+            cellLoc='center',
+            loc='center'
+        )
+        self.table.auto_set_font_size(False)
+        self.table.set_fontsize(8)
+
+        self.figure.tight_layout()
+        self.figure.subplots_adjust(hspace=0.7)
+        self.update(maturity, flags)
+
+    def update(self, maturity, flags):
+        """
+        Show another maturity.
+
+        Parameters:
+            maturity (str | pd.Timestamp): New issue maturity.
+            flags (dict): As for __init__; the static rows are not redrawn.
+        """
+        new = np.array([flags[row] for row in TABLE_ROWS[STATIC_ROWS:]], dtype=bool)
+        changed = new != self._shown[STATIC_ROWS:]
+        for i, j in zip(*np.nonzero(changed)):
+            row = STATIC_ROWS + i
+            text, color = _cell_style(row, new[i, j:j + 1])
+            cell = self.table[row, j]
+            cell.get_text().set_text(text[0])
+            cell.set_facecolor(color[0])
+        self._shown[STATIC_ROWS:] = new
+
+        new_issue_date = pd.to_datetime(maturity)
+        benchmark = np.flatnonzero(flags['ICMA_BENCHMARK'])
+        if len(benchmark):
+            position = benchmark[0]  # Take the first benchmark (should only be one)
+            self.marker.set_data([position], [self.amounts[position] + 1500])
+            self.label.set_position((position, self.amounts[position] + 3000))
+            self.label.set_text(f"New Issue:\n{new_issue_date.strftime('%b-%y')}")
+        else:
+            self.marker.set_data([], [])
+            self.label.set_text("")
+        self.title.set_text(f"New Issue Maturity {new_issue_date.strftime('%d-%b-%Y')}")
+
+    def save(self, path):
+        """Render the current state to path (format from the extension, e.g. .png or .svg)."""
+        self.figure.savefig(path)
+
+
+def _render_chunk(df, maturities, paths, dpi, ruleset):
+    """Render one worker's share of the frames with a single GiltChart."""
+    matrices = get_rule_matrices(df, maturities, ruleset)
+    chart = None
+    for j, (maturity, path) in enumerate(zip(maturities, paths)):
+        flags = {row: matrices[row][:, j] for row in TABLE_ROWS}
+        if chart is None:
+            chart = GiltChart(df, maturity, flags, dpi=dpi, ruleset=ruleset)
+        else:
+            chart.update(maturity, flags)
+        chart.save(path)
+    return paths
+
+
+def render_maturities(df, maturities, output_dir=os.path.join("figures", "frames"), fmt="png", processes=None,
+                      dpi=100, ruleset=None):
+    """
+    Render the show_gilts chart for every maturity, headlessly and in parallel. Each worker
+    takes a contiguous run of maturities and builds its chart once.
+
+    Parameters:
+        df (pd.DataFrame): Conventional gilts (no rule columns needed).
+        maturities (array-like): New issue maturity dates, one frame each.
+        output_dir (str): Directory for the frames (created if needed).
+        fmt (str): 'png' or 'svg'.
+        processes (int): Worker processes; defaults to os.cpu_count(). Use 1 to run in-process.
+        dpi (int): Resolution of PNG frames.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+    Returns:
+        list of str: Frame paths, in maturity order.
+    """
+    maturities = pd.to_datetime(np.asarray(maturities).ravel())
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f"{i:05d}_{m.strftime('%Y-%m-%d')}.{fmt}") for i, m in enumerate(maturities)]
+    df = df.reset_index(drop=True)
+
+    processes = min(processes or os.cpu_count(), len(maturities))
+    if processes <= 1:
+        return _render_chunk(df, maturities, paths, dpi, ruleset)
+
+    chunks = np.array_split(np.arange(len(maturities)), processes)
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(_render_chunk, df, maturities[chunk], [paths[i] for i in chunk], dpi, ruleset)
+                   for chunk in chunks]
+        return [path for future in futures for path in future.result()]
+
+
+def render_animation(df, maturities, path=os.path.join("figures", "ladder.gif"), fps=4, processes=None, dpi=80,
+                     ruleset=None):
+    """
+    Render the show_gilts chart across maturities (e.g. a ladder, or the same tenor over
+    time) as an animated GIF. Frames are rendered in parallel by render_maturities.
+
+    Parameters:
+        df (pd.DataFrame): Conventional gilts (no rule columns needed).
+        maturities (array-like): New issue maturity dates, one frame each.
+        path (str): Where to save the GIF.
+        fps (float): Frames per second.
+        processes (int): Worker processes; defaults to os.cpu_count().
+        dpi (int): Frame resolution.
+        ruleset (Ruleset): R7.3 criteria and R7.4 branches; defaults to DEFAULT_RULESET.
+
+    Returns:
+        str: path.
+
+    Raises:
+        ValueError: If maturities is empty.
+    """
+    from PIL import Image
+
+    if not len(maturities):
+        raise ValueError("No maturities to animate")
+    with tempfile.TemporaryDirectory() as frame_dir, contextlib.ExitStack() as stack:
+        rendered = render_maturities(df, maturities, frame_dir, "png", processes, dpi, ruleset)
+        frames = [stack.enter_context(Image.open(frame)) for frame in rendered]
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=1000 / fps, loop=0)
+    return path
+
+
+# ---- Benchmark Surface ----
+def _true_runs(mask):
+    """(row, start, stop) of every run of True along the last axis of a 2D boolean array."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(steps == 1)
+    _, stops = np.nonzero(steps == -1)
+    return rows, starts, stops
+
+
+def _surface_boundaries(surface):
+    """
+    Cliff-edges of a BenchmarkSurface as line segments in grid (column, row) coordinates,
+    computed on the per-epoch rows so the cost does not depend on the number of pricing dates.
+
+    Returns:
+        tuple: (cliff-edge segments, epoch start rows). Segments run along a maturity where the
+        benchmark changes within an epoch, and along a pricing date where it changes between epochs.
+    """
+    first = np.searchsorted(surface.epochs, np.arange(len(surface.epoch_rows)))
+    last = np.append(first[1:], len(surface.epochs)) - 1
+    rows = surface.epoch_rows
+
+    epoch, column = np.nonzero(rows[:, 1:] != rows[:, :-1])
+    x = column + 0.5
+    vertical = np.stack([np.stack([x, first[epoch] - 0.5], axis=1),
+                         np.stack([x, last[epoch] + 0.5], axis=1)], axis=1)
+
+    epoch, starts, stops = _true_runs(rows[1:] != rows[:-1])
+    y = first[epoch + 1] - 0.5
+    horizontal = np.stack([np.stack([starts - 0.5, y], axis=1),
+                           np.stack([stops - 0.5, y], axis=1)], axis=1)
+    return np.concatenate([vertical, horizontal]), first[1:]
+
+
+def show_benchmark_surface(surface, path=os.path.join("figures", "surface.png"), max_labels=30, resolution=2000):
+    """
+    Plots a BenchmarkSurface as a categorical heatmap: pricing date up the y-axis, new issue
+    maturity along the x-axis and one colour per benchmark gilt (in redemption order; white
+    where there is no benchmark). Cliff-edges are drawn in black and the pricing dates where
+    a gilt is first issued or redeems (the start of each epoch) as dotted grey lines.
+
+    Colours and boundaries are computed on the surface's per-epoch rows and the heatmap is
+    sampled down to at most resolution cells a side before drawing, so daily x daily grids
+    over decades render in seconds. Boundaries are drawn as lines at full precision.
+
+    Parameters:
+        surface (surface.BenchmarkSurface): Output of surface.benchmark_surface().
+        path (str): Where to save the chart. PNG is recommended: a vector format embeds the full grid.
+        max_labels (int): Most gilts to label on the colour bar.
+        resolution (int): Most heatmap cells drawn along each axis.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import ListedColormap
+
+    # Category codes: 0 for no benchmark, then the benchmark gilts in redemption date order
+    used = np.unique(surface.epoch_rows)
+    used = used[used >= 0]
+    used = used[np.argsort(surface.redemption_dates[used], kind='stable')]
+    codes = np.zeros(len(surface.isins) + 1, dtype=np.int32)
+    codes[used] = np.arange(1, len(used) + 1)
+    # Nearest-cell sample of the grid; -1 (no benchmark) picks the trailing 0 of codes
+    n_rows, n_columns = len(surface.epochs), len(surface.maturities)
+    rows = np.unique(np.linspace(0, n_rows - 1, min(n_rows, resolution)).round().astype(int))
+    columns = np.unique(np.linspace(0, n_columns - 1, min(n_columns, resolution)).round().astype(int))
+    image = codes[surface.epoch_rows[:, columns]][surface.epochs[rows]]
+
+    palette = plt.get_cmap('tab20').colors
+    cmap = ListedColormap(['white'] + [palette[k % len(palette)] for k in range(len(used))])
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    mesh = ax.imshow(image, cmap=cmap, vmin=-0.5, vmax=len(used) + 0.5, origin='lower', aspect='auto',
+                     interpolation='nearest', extent=(-0.5, n_columns - 0.5, -0.5, n_rows - 0.5))
+
+    segments, epoch_starts = _surface_boundaries(surface)
+    ax.add_collection(LineCollection(segments, colors='k', linewidths=0.8))
+    ax.hlines(epoch_starts - 0.5, -0.5, n_columns - 0.5, colors='grey', linestyles=':',
+              linewidth=0.8)
+
+    def date_formatter(dates):
+        def format_date(x, _):
+            i = int(round(x))
+            return pd.Timestamp(dates[i]).strftime('%b-%y') if 0 <= i < len(dates) else ""
+        return ticker.FuncFormatter(format_date)
+
+    ax.xaxis.set_major_formatter(date_formatter(surface.maturities))
+    ax.yaxis.set_major_formatter(date_formatter(surface.pricing_dates))
+    ax.set_xlabel("New Issue Maturity")
+    ax.set_ylabel("Pricing Date")
+    ax.set_title("ICMA Benchmark by Pricing Date and New Issue Maturity")
+
+    step = max(1, -(-len(used) // max_labels))
+    ticks = np.arange(1, len(used) + 1)[::step]
+    colorbar = fig.colorbar(mesh, ax=ax, ticks=ticks, label="ICMA Benchmark")
+    colorbar.ax.set_yticklabels([f"{surface.isins[g]} {pd.Timestamp(surface.redemption_dates[g]).strftime('%b-%y')}"
+                                 for g in used[ticks - 1]], fontsize=7)
+
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.show()